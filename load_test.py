@@ -0,0 +1,446 @@
+"""
+Concurrent-session load test for the Morpho dashboard.
+
+Generates a synthetic dataset in the collector's CSV format, starts one
+headless Streamlit server on it and drives N concurrent sessions over the
+server's websocket, clicking through the app like a browser would:
+
+    list -> pool -> borrower -> back to pool -> back to list
+    list -> curator -> vault -> depositor -> back to vault -> back to list
+
+It reports p50/p95/p99 latency per navigation step, throughput and the
+server's RSS growth. Needs the `websockets` package (bundled with Streamlit).
+
+    python load_test.py --sessions 8 --iterations 5 --markets 300 --vaults 80
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "morpho_dashboard_final.py")
+
+# ======================================================
+# Synthetic Dataset
+# ======================================================
+
+LOAN_SYMBOLS = ["USDC", "USDT", "WETH", "DAI"]
+COLLATERAL_SYMBOLS = ["WSTETH", "CBETH", "PT-sUSDE-25SEP2025", "PT-eUSDE-29MAY2025", "RETH", "PT-USD0++-26JUN2025"]
+TX_TYPES = ["MarketBorrow", "MarketRepay", "MarketSupplyCollateral", "MarketWithdrawCollateral", "MarketSupply"]
+
+def random_hex(rng: np.random.Generator, n_chars: int) -> str:
+    """Random 0x-prefixed hex string (addresses, market keys, hashes)"""
+    return "0x" + "".join(rng.choice(list("0123456789abcdef"), n_chars))
+
+def write_sheet(writer, f, name: str, rows: List[Dict]):
+    """Write one sheet section in the collector's multi-section CSV layout"""
+    headers = list(dict.fromkeys(key for row in rows for key in row))
+    f.write(f"# sheet: {name}\n")
+    writer.writerow(["__sheet"] + headers)
+    for row in rows:
+        writer.writerow([name] + [row.get(h, "") for h in headers])
+    f.write("\n")
+
+def generate_dataset(path: str, n_markets: int = 200, n_vaults: int = 50, n_curators: int = 10,
+                     borrowers_per_market: int = 5, tx_per_borrower: int = 20,
+                     depositors_per_vault: int = 5, history_days: int = 120, seed: int = 0):
+    """Write a synthetic data.csv with every sheet the dashboard reads"""
+    rng = np.random.default_rng(seed)
+    now = int(time.time())
+    users = [random_hex(rng, 40) for _ in range(max(20, n_markets * 2))]
+    sheets = {name: [] for name in (
+        "morpho_markets", "morpho_top_borrowers", "morpho_user_transactions", "morpho_curators",
+        "morpho_vaults", "morpho_vault_top_depositors", "pendle_pt_matches", "pendle_market_data",
+        "pendle_market_history", "pendle_user_positions")}
+
+    for i in range(n_markets):
+        unique_key = random_hex(rng, 64)
+        loan = LOAN_SYMBOLS[i % len(LOAN_SYMBOLS)]
+        collateral = COLLATERAL_SYMBOLS[i % len(COLLATERAL_SYMBOLS)]
+        if i >= len(COLLATERAL_SYMBOLS):
+            collateral += f"-{i}"
+        is_pt = collateral.startswith("PT-")
+        supply = float(rng.lognormal(16, 1.5))
+        utilization = float(rng.uniform(0.3, 0.98))
+        borrow_apy = utilization * 0.08
+        history = [{"x": now - d * 86400, "y": float(max(0.0, rng.normal(borrow_apy, 0.02)))}
+                   for d in range(history_days, 0, -1)]
+
+        sheets["morpho_markets"].append({
+            "uniqueKey": unique_key, "lltv": str(int(rng.choice([0.77, 0.86, 0.915, 0.945]) * 1e18)),
+            "creationTimestamp": now - 2 * history_days * 86400,
+            "loanAsset.symbol": loan, "loanAsset.name": loan, "loanAsset.address": random_hex(rng, 40),
+            "collateralAsset.symbol": collateral, "collateralAsset.name": collateral,
+            "collateralAsset.address": random_hex(rng, 40),
+            "state.borrowApy": borrow_apy, "state.netBorrowApy": borrow_apy, "state.dailyBorrowApy": borrow_apy,
+            "state.totalLiquidityUsd": supply * (1 - utilization), "state.utilization": utilization,
+            "state.borrowAssetsUsd": supply * utilization, "state.supplyAssetsUsd": supply,
+            "state.timestamp": now,
+            "historicalState.dailyNetBorrowApy": json.dumps(history),
+            "supplyingVaults": json.dumps([{"address": random_hex(rng, 40)}]),
+        })
+
+        pendle_address = random_hex(rng, 40) if is_pt else ""
+        sheets["pendle_pt_matches"].append({
+            "marketUniqueKey": unique_key, "morphoPair": f"{loan}/{collateral}", "ptTokenAddress": "",
+            "chainId": 1 if is_pt else "", "pendleMarketAddress": pendle_address,
+            "matched": str(is_pt).lower(), "note": "",
+        })
+        if is_pt:
+            sheets["pendle_market_data"].append({
+                "marketUniqueKey": unique_key, "chainId": 1, "pendleMarketAddress": pendle_address,
+                "marketData.impliedApy": float(rng.uniform(0.05, 0.2)), "marketData.timestamp": now,
+            })
+            for d in range(history_days, 0, -1):
+                apy = float(max(0.0, rng.normal(0.11, 0.03)))
+                sheets["pendle_market_history"].append({
+                    "marketUniqueKey": unique_key, "chainId": 1, "pendleMarketAddress": pendle_address,
+                    "point.timestamp": now - d * 86400 + 3600, "point.apy": apy, "point.impliedApy": apy,
+                    "point.baseApy": apy / 2, "point.maxApy": apy * 2, "point.tvl": supply,
+                })
+
+        for _ in range(borrowers_per_market):
+            user = users[int(rng.integers(len(users)))]
+            borrowed = float(supply * utilization * rng.uniform(0.01, 0.2))
+            collateral_usd = borrowed / float(rng.uniform(0.5, 0.9))
+            sheets["morpho_top_borrowers"].append({
+                "marketUniqueKey": unique_key, "userAddress": user,
+                "healthFactor": collateral_usd * 0.86 / borrowed, "priceVariationToLiquidationPrice": -0.1,
+                "transactions_count": tx_per_borrower,
+                "state.borrowAssetsUsd": borrowed, "state.collateralUsd": collateral_usd,
+                "state.pnlUsd": float(rng.normal(0, 1e4)), "state.marginPnlUsd": float(rng.normal(0, 1e4)),
+                "state.timestamp": now,
+            })
+            for _ in range(tx_per_borrower):
+                amount = float(rng.lognormal(10, 1))
+                sheets["morpho_user_transactions"].append({
+                    "marketUniqueKey": unique_key, "userAddress": user, "hash": random_hex(rng, 64),
+                    "timestamp": int(now - rng.integers(0, history_days * 86400)),
+                    "type": str(rng.choice(TX_TYPES)),
+                    "data.assets": str(int(amount * 1e6)), "data.assetsUsd": amount, "data.shares": "",
+                })
+            if is_pt:
+                positions = [{"chainId": 1, "totalOpen": 1, "openPositions": [{
+                    "marketId": f"1-{pendle_address}",
+                    "pt": {"valuation": float(rng.uniform(0, 1e5)), "balance": "1"},
+                    "yt": {"valuation": float(rng.uniform(0, 1e3)), "balance": "0"},
+                    "lp": {"valuation": float(rng.uniform(0, 1e4)), "balance": "0"},
+                }]}]
+                sheets["pendle_user_positions"].append({
+                    "marketUniqueKey": unique_key, "userAddress": user, "positionsCount": 1,
+                    "raw.positions": json.dumps(positions),
+                })
+
+    curator_names = [f"Curator {c}" for c in range(n_curators)]
+    for c, name in enumerate(curator_names):
+        sheets["morpho_curators"].append({
+            "name": name, "addresses": random_hex(rng, 40), "aum": float(rng.lognormal(17, 1)),
+            "socials": f"url:https://curator{c}.xyz|twitter:https://x.com/curator{c}",
+        })
+
+    for v in range(n_vaults):
+        vault_address = random_hex(rng, 40)
+        tvl = float(rng.lognormal(15, 2))
+        sheets["morpho_vaults"].append({
+            "address": vault_address, "symbol": f"v{v}", "name": f"Vault {v}", "whitelisted": "true",
+            "state.curators": json.dumps([{"name": curator_names[v % n_curators]}]),
+            "state.totalAssetsUsd": tvl, "state.fee": 0.1, "state.dailyApy": float(rng.uniform(0.02, 0.1)),
+            "asset.symbol": LOAN_SYMBOLS[v % len(LOAN_SYMBOLS)], "asset.address": random_hex(rng, 40),
+        })
+        for _ in range(depositors_per_vault):
+            deposits = [{"hash": random_hex(rng, 64), "type": "MetaMorphoDeposit",
+                         "timestamp": int(now - rng.integers(0, history_days * 86400)),
+                         "data": {"assetsUsd": float(rng.lognormal(9, 1))}} for _ in range(3)]
+            sheets["morpho_vault_top_depositors"].append({
+                "vaultAddress": vault_address, "userAddress": users[int(rng.integers(len(users)))],
+                "assetsUsd": float(tvl * rng.uniform(0.01, 0.3)), "userTransactions": json.dumps(deposits),
+            })
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        for name, rows in sheets.items():
+            write_sheet(writer, f, name, rows)
+
+# ======================================================
+# Server
+# ======================================================
+
+def free_port() -> int:
+    """An unused local TCP port for the server"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(workdir: str, port: int) -> subprocess.Popen:
+    """Start a headless Streamlit server for the app with workdir as its working directory"""
+    env = dict(os.environ, MORPHO_CACHE_DIR=os.path.join(workdir, ".cache"))
+    return subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_FILE, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+def wait_for_server(port: int, timeout: float = 60.0):
+    """Poll the health endpoint until the server accepts connections"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Streamlit server did not come up on port {port}")
+
+def read_rss_bytes(pid: int) -> int:
+    """Resident set size of a process (Linux), 0 where /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+# ======================================================
+# Sessions
+# ======================================================
+
+class NavigationError(Exception):
+    """The control a navigation step needs is not on the current page"""
+
+class Session:
+    """One browser-like session on the server's websocket"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.page_script_hash = ""
+        self.buttons: List[Tuple[str, str]] = []  # (label, widget id) in render order
+        self.tables: List[Tuple[str, int]] = []  # (widget id, rows) of selectable tables
+        self.failed = False
+
+    async def rerun(self, widget_states: Optional[List] = None) -> float:
+        """Send one rerun request and wait for the app to settle, following st.rerun() calls"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_script_hash = self.page_script_hash
+        for widget_state in widget_states or []:
+            message.rerun_script.widget_states.widgets.append(widget_state)
+
+        start = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        self.buttons, self.tables, self.failed = [], [], False
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.websocket.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.main_script_hash
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self.record_element(forward.delta.new_element)
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # st.rerun(): the server starts the next run by itself
+                    self.buttons, self.tables = [], []
+                    continue
+                self.failed = self.failed or forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR
+                return time.perf_counter() - start
+
+    def record_element(self, element):
+        """Remember the buttons and selectable tables the page rendered"""
+        element_type = element.WhichOneof("type")
+        if element_type == "exception":
+            self.failed = True
+        elif element_type == "button":
+            self.buttons.append((element.button.label, element.button.id))
+        elif element_type in ("dataframe", "arrow_data_frame"):
+            table = getattr(element, element_type)
+            if table.selection_mode:
+                self.tables.append((table.id, count_arrow_rows(table)))
+
+    async def click(self, label: str, rng: np.random.Generator) -> float:
+        """Click a (randomly chosen) button with this label"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        ids = [widget_id for button_label, widget_id in self.buttons if button_label == label]
+        if not ids:
+            raise NavigationError(f"No '{label}' button on the page")
+        return await self.rerun([WidgetState(id=ids[int(rng.integers(len(ids)))], trigger_value=True)])
+
+    async def select_row(self, table_index: int, rng: np.random.Generator) -> float:
+        """Select a random row of the n-th selectable table on the page"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        if table_index >= len(self.tables) or not self.tables[table_index][1]:
+            raise NavigationError(f"No selectable table #{table_index} with rows on the page")
+        widget_id, rows = self.tables[table_index]
+        selection = {"selection": {"rows": [int(rng.integers(rows))], "columns": []}}
+        return await self.rerun([WidgetState(id=widget_id, string_value=json.dumps(selection))])
+
+def count_arrow_rows(table) -> int:
+    """Number of rows in a dataframe element's Arrow payload"""
+    import pyarrow as pa
+
+    data = table.arrow_data.data if hasattr(table, "arrow_data") else table.data
+    try:
+        return pa.ipc.open_stream(data).read_all().num_rows
+    except (pa.ArrowException, ValueError):
+        return 0
+
+# Selectable tables of the list page, in render order
+POOLS_TABLE, CURATORS_TABLE = 0, 1
+
+async def run_session(port: int, iterations: int, seed: int,
+                      results: List[Tuple[str, float, bool]]):
+    """Replay the scripted navigation flows in one session"""
+    import websockets
+
+    rng = np.random.default_rng(seed)
+    async with websockets.connect(f"ws://127.0.0.1:{port}/_stcore/stream", max_size=None,
+                                  subprotocols=["streamlit"]) as websocket:
+        session = Session(websocket)
+
+        async def step(name: str, action):
+            try:
+                elapsed = await action
+                failed = session.failed
+            except NavigationError:
+                elapsed, failed = float("nan"), True
+            results.append((name, elapsed, failed))
+            return not failed
+
+        await step("open list", session.rerun())
+        for _ in range(iterations):
+            # list -> pool -> borrower -> back to pool -> back to list
+            if (await step("list -> pool", session.select_row(POOLS_TABLE, rng))
+                    and await step("pool -> borrower", session.click("Analyze", rng))
+                    and await step("borrower -> pool", session.click("← Back to Pool", rng))):
+                await step("pool -> list", session.click("← Back to Pools", rng))
+
+            # list -> curator -> vault -> depositor -> back to vault -> back to list
+            if (await step("list -> curator", session.select_row(CURATORS_TABLE, rng))
+                    and await step("curator -> vault", session.select_row(0, rng))
+                    and await step("vault -> depositor", session.click("Analyze", rng))
+                    and await step("depositor -> vault", session.click("← Back to Vault", rng))):
+                await step("vault -> list", session.click("← Back to Vaults", rng))
+
+            # If a step failed midway, walk the back buttons up to the list page again
+            for _ in range(3):
+                back = [label for label, _ in session.buttons if label.startswith("← Back")]
+                if not back:
+                    break
+                await step("back", session.click(back[0], rng))
+
+# ======================================================
+# Report
+# ======================================================
+
+def summarize(results: List[Tuple[str, float, bool]], wall_seconds: float) -> pd.DataFrame:
+    """Latency percentiles (ms) per navigation step and overall"""
+    df = pd.DataFrame(results, columns=["Step", "Seconds", "Failed"])
+    rows = {}
+    for step, group in list(df.groupby("Step", sort=False)) + [("ALL", df)]:
+        ms = group["Seconds"].dropna().to_numpy() * 1000
+        rows[step] = {
+            "Count": len(group),
+            "Failed": int(group["Failed"].sum()),
+            "p50 (ms)": np.percentile(ms, 50) if ms.size else np.nan,
+            "p95 (ms)": np.percentile(ms, 95) if ms.size else np.nan,
+            "p99 (ms)": np.percentile(ms, 99) if ms.size else np.nan,
+            "Max (ms)": ms.max() if ms.size else np.nan,
+        }
+    report = pd.DataFrame(rows).T
+    report.loc["ALL", "Throughput (steps/s)"] = len(df) / wall_seconds if wall_seconds else np.nan
+    return report
+
+async def run_load(port: int, pid: int, sessions: int, iterations: int, seed: int) -> Tuple[List, float, int]:
+    """Run every session concurrently while sampling the server's peak RSS"""
+    results: List[Tuple[str, float, bool]] = []
+    peak_rss = read_rss_bytes(pid)
+    done = asyncio.Event()
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while not done.is_set():
+            peak_rss = max(peak_rss, read_rss_bytes(pid))
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_rss())
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(port, iterations, seed + i, results) for i in range(sessions)))
+    wall_seconds = time.perf_counter() - start
+    done.set()
+    await sampler
+    return results, wall_seconds, peak_rss
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Drive concurrent dashboard sessions and report navigation latency.")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--iterations", type=int, default=5, help="navigation loops per session")
+    parser.add_argument("--markets", type=int, default=200)
+    parser.add_argument("--vaults", type=int, default=50)
+    parser.add_argument("--curators", type=int, default=10)
+    parser.add_argument("--tx-per-borrower", type=int, default=20)
+    parser.add_argument("--csv", help="use an existing data.csv instead of generating one")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="morpho-load-")
+    csv_path = os.path.join(workdir, "data.csv")
+    if args.csv:
+        os.symlink(os.path.abspath(args.csv), csv_path)
+    else:
+        start = time.perf_counter()
+        generate_dataset(csv_path, args.markets, args.vaults, args.curators,
+                         tx_per_borrower=args.tx_per_borrower, seed=args.seed)
+        print(f"Generated {os.path.getsize(csv_path) / 2**20:.1f} MB dataset in "
+              f"{time.perf_counter() - start:.1f}s")
+
+    port = free_port()
+    server = start_server(workdir, port)
+    try:
+        wait_for_server(port)
+        rss_idle = read_rss_bytes(server.pid)
+
+        # Cold start: the first session pays for loading and building the data
+        cold_results: List[Tuple[str, float, bool]] = []
+        asyncio.run(run_session(port, 0, args.seed, cold_results))
+        rss_warm = read_rss_bytes(server.pid)
+
+        results, wall_seconds, rss_peak = asyncio.run(
+            run_load(port, server.pid, args.sessions, args.iterations, args.seed))
+        rss_end = read_rss_bytes(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    pd.set_option("display.width", 160)
+    print(f"\nCold start: {cold_results[0][1] * 1000:.0f} ms")
+    print(f"{args.sessions} sessions x {args.iterations} iterations in {wall_seconds:.1f}s\n")
+    print(summarize(results, wall_seconds).round(1).to_string())
+    print(f"\nServer RSS: idle {rss_idle / 2**20:.0f} MB, after cold start {rss_warm / 2**20:.0f} MB, "
+          f"peak {rss_peak / 2**20:.0f} MB, end {rss_end / 2**20:.0f} MB "
+          f"(growth under load {(rss_end - rss_warm) / 2**20:+.0f} MB)")
+    return 1 if any(failed for _, _, failed in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
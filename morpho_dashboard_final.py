@@ -1,21 +1,66 @@
+from __future__ import annotations
+
+import time
+
+# Taken before the heavy imports so startup timings include them
+SCRIPT_START = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 import numpy as np
 import os
+import sys
 import csv
-from typing import Dict, List, Optional, Tuple
+import gzip
+import bisect
+import concurrent.futures
+import functools
+import importlib
+import importlib.util
+import inspect
+import multiprocessing
+import argparse
+import urllib.parse
+import ast
+import contextlib
+import cProfile
+import hashlib
+import hmac
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Union
 import json
 
-# Try to import networkx for network graphs
+# Cross-process locking for the disk cache (POSIX only)
 try:
-    import networkx as nx
-    HAS_NETWORKX = True
+    import fcntl
 except ImportError:
-    HAS_NETWORKX = False
-    nx = None
+    fcntl = None
+
+class LazyModule:
+    """Module proxy that defers the import until the first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# Chart libraries are only imported once a chart is actually built
+go = LazyModule('plotly.graph_objects')
+px = LazyModule('plotly.express')
+
+# Optional: Arrow files let every server process map the same copy of the sheets
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+pa = LazyModule('pyarrow')
+pa_ipc = LazyModule('pyarrow.ipc')
+
+IMPORT_SECONDS = time.perf_counter() - SCRIPT_START
 
 CHAIN_CONFIG = {
     1: {'name': 'ethereum', 'explorer_base': 'https://etherscan.io'},
@@ -34,6 +79,40 @@ DEFAULT_CHAIN_INFO = CHAIN_CONFIG[DEFAULT_CHAIN_ID]
 APP_TITLE = "🔵 Morpho Blue + Pendle PT Analytics"
 APP_SUBTITLE = "Advanced yield looping opportunity analysis with transaction flows"
 CSV_FILE = "data.csv"
+# The collector's --output JSON; when set it is read instead of CSV_FILE
+JSON_FILE = os.environ.get('MORPHO_JSON_FILE', '')
+
+# Loop backtest grid: leverage multiples and rolling window lengths (days)
+BACKTEST_LEVERAGES = (1.0, 2.0, 3.0, 5.0)
+BACKTEST_WINDOWS = (7, 30, 90)
+
+# Rolling APY statistics windows (days) precomputed for the pools table
+ROLLING_WINDOWS = (7, 30, 90)
+
+# Disk cache of derived data shared by every server process on the host, warmed by
+# `python morpho_dashboard_final.py precompute` and bounded by an LRU size budget
+DISK_CACHE_DIR = os.environ.get('MORPHO_CACHE_DIR', '.cache')
+DISK_CACHE_MAX_BYTES = int(os.environ.get('MORPHO_CACHE_MAX_MB', '2048')) * 1024 * 1024
+
+# Sheets that can dwarf the rest of the CSV. With a disk cache they are streamed into the
+# columnar store in chunks of about MORPHO_INGEST_CHUNK_MB of CSV text, so parsing them
+# never holds more than one chunk of rows in memory.
+STREAMED_SHEETS = ('morpho_user_transactions', 'morpho_vault_top_depositors')
+INGEST_CHUNK_BYTES = int(os.environ.get('MORPHO_INGEST_CHUNK_MB', '16')) * 1024 * 1024
+# Rows of a sheet parsed from the JSON before they are packed into typed Arrow columns
+JSON_CHUNK_ROWS = int(os.environ.get('MORPHO_JSON_CHUNK_ROWS', '10000'))
+
+# Memory budget of each in-process drill-down cache (transactions, positions, depositors, charts)
+VIEW_CACHE_MAX_BYTES = int(os.environ.get('MORPHO_VIEW_CACHE_MB', '64')) * 1024 * 1024
+
+# Startup build concurrency: threads for independent stages, plus forked processes for
+# the pure-Python ones; MORPHO_BUILD_WORKERS=1 builds one stage at a time without forking
+BUILD_WORKERS = int(os.environ.get('MORPHO_BUILD_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Seconds to wait for a forked stage before killing it and building the stage in-process
+BUILD_STAGE_TIMEOUT = float(os.environ.get('MORPHO_BUILD_STAGE_TIMEOUT', '300'))
+# Rows a forkable stage must read before it is forked. A cold forkserver takes about 3 s to
+# import this module; the forkable stages take under 200 ms in-process on 300k transactions
+BUILD_FORK_MIN_ROWS = int(os.environ.get('MORPHO_BUILD_FORK_MIN_ROWS', '500000'))
 
 # ======================================================
 # Utility Functions
@@ -100,12 +179,201 @@ def estimate_external_yield(symbol) -> Optional[float]:
     }
     return yield_estimates.get(str(symbol).upper())
 
+def json_or_none(text: str):
+    """Decoded JSON value, or None if the text is not valid JSON"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+def decode_json_value(value):
+    """Decoded value of a JSON cell: text is parsed, arrays loaded from the JSON file are already decoded"""
+    if isinstance(value, (list, dict)):
+        return value
+    return json_or_none(value) if isinstance(value, str) and value else None
+
+def decode_json_column(values: List[object]) -> List[object]:
+    """Decode a column of JSON cells; missing or invalid values decode to None"""
+    return [decode_json_value(value) for value in values]
+
+def numeric_column(df: pd.DataFrame, column: str, default: float = 0.0) -> np.ndarray:
+    """Vectorized safe_float over a whole column, returned as a float array"""
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=float)
+    return pd.to_numeric(df[column], errors='coerce').fillna(default).to_numpy(dtype=float)
+
+# ======================================================
+# View Caches
+# ======================================================
+
+class ByteLRUCache:
+    """Thread-safe LRU cache bounded by the approximate byte size of its values"""
+
+    def __init__(self, name: str, max_bytes: int):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, nbytes)
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key) -> Tuple[bool, object]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value, nbytes: int):
+        if nbytes > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.resident_bytes -= previous[1]
+            self.entries[key] = (value, nbytes)
+            self.resident_bytes += nbytes
+            while self.resident_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self.entries.popitem(last=False)
+                self.resident_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'Entries': len(self.entries),
+                'Resident (MB)': self.resident_bytes / 2**20,
+                'Budget (MB)': self.max_bytes / 2**20,
+                'Hits': self.hits,
+                'Misses': self.misses,
+                'Hit Rate (%)': 100 * self.hits / lookups if lookups else 0.0,
+                'Evictions': self.evictions,
+            }
+
+@st.cache_resource(show_spinner=False)
+def get_view_caches() -> Dict[str, ByteLRUCache]:
+    """Process-wide registry of the drill-down caches, kept across reruns and sessions"""
+    return {}
+
+def get_view_cache(name: str) -> ByteLRUCache:
+    """Drill-down cache by name, created with the configured budget on first use"""
+    caches = get_view_caches()
+    if name not in caches:
+        caches.setdefault(name, ByteLRUCache(name, VIEW_CACHE_MAX_BYTES))
+    return caches[name]
+
+def view_cache_stats() -> pd.DataFrame:
+    """Hit rate, evictions and resident bytes of every drill-down cache"""
+    caches = get_view_caches()
+    return pd.DataFrame({name: cache.stats() for name, cache in sorted(caches.items())}).T
+
+def estimate_nbytes(value) -> int:
+    """Approximate memory held by a cached value"""
+    if value is None:
+        return 0
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(k) + estimate_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value)
+    if hasattr(value, 'to_plotly_json'):
+        return estimate_nbytes(value.to_plotly_json())
+    return sys.getsizeof(value)
+
+def view_cache_token(arg) -> object:
+    """Hashable cache key part for an argument; TypeError if it cannot be keyed"""
+    if arg is None or isinstance(arg, (str, int, float, bool, np.generic)):
+        return arg
+    if isinstance(arg, tuple):
+        return tuple(view_cache_token(item) for item in arg)
+    if isinstance(arg, dict) and not any(isinstance(v, (pd.DataFrame, pd.Series)) for v in arg.values()):
+        return ('dict', repr(sorted(arg.items(), key=lambda item: str(item[0]))))
+    raise TypeError(f"Cannot build a cache key from {type(arg).__name__}")
+
+def view_cache(name: str):
+    """Memoize a drill-down computation in the named byte-budgeted LRU cache
+
+    As with st.cache_data, parameters whose name starts with an underscore are left out
+    of the key; they must not change the result for a given set of keyed arguments. The
+    sheets and frames derived from them are passed that way, with the data version and
+    the pool or vault they were selected for keyed instead, so keys cost nothing to build
+    and no entry holds on to a previous version's sheets.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                bound = signature.bind(*args, **kwargs)
+                key = (func.__name__, tuple((param, view_cache_token(value))
+                                            for param, value in bound.arguments.items()
+                                            if not param.startswith('_')))
+            except TypeError:
+                return func(*args, **kwargs)
+
+            cache = get_view_cache(name)
+            found, value = cache.get(key)
+            if not found:
+                value = func(*args, **kwargs)
+                cache.put(key, value, estimate_nbytes(value))
+            return value
+        return wrapper
+    return decorator
+
 # ======================================================
 # Data Loading
 # ======================================================
 
-def load_csv_data() -> Dict[str, pd.DataFrame]:
-    """Load all sheets from the multi-section CSV file into DataFrames"""
+def data_file() -> str:
+    """The collector output the dashboard reads: its JSON if MORPHO_JSON_FILE is set, else the CSV"""
+    return JSON_FILE or CSV_FILE
+
+def get_data_version() -> str:
+    """Fingerprint of the current data file, used to key per-version caches"""
+    try:
+        stat = os.stat(data_file())
+    except OSError:
+        return "missing"
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def get_data_mtime() -> int:
+    """Modification time of the current data file in nanoseconds, 0 if it is missing"""
+    try:
+        return os.stat(data_file()).st_mtime_ns
+    except OSError:
+        return 0
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_data_fingerprint() -> Optional[str]:
+    """Content hash of the data file, used to address its entries in the disk cache"""
+    try:
+        return file_digest(data_file())
+    except OSError:
+        return None
+
+def load_csv_data(data_fingerprint: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """Load all sheets from the multi-section CSV file into DataFrames
+
+    Given the file's fingerprint, the STREAMED_SHEETS are written chunk by chunk into
+    their Arrow files in the disk cache and returned memory-mapped.
+    """
     try:
         if not os.path.exists(CSV_FILE):
             st.error(f"CSV file '{CSV_FILE}' not found!")
@@ -115,6 +383,19 @@ def load_csv_data() -> Dict[str, pd.DataFrame]:
         current_sheet = None
         current_data = []
         headers = []
+        stream = None
+        streamed = {}  # sheet name -> position among the sheets, for the ones in the store
+
+        def save_sheet():
+            if stream is not None:
+                if stream.close():
+                    streamed[current_sheet] = len(sheets) + len(streamed)
+            elif current_sheet and current_data and headers:
+                try:
+                    df = pd.DataFrame(current_data, columns=headers)
+                    sheets[current_sheet] = df
+                except Exception:
+                    pass
 
         with open(CSV_FILE, 'r', encoding='utf-8') as f:
             for line in f:
@@ -124,17 +405,13 @@ def load_csv_data() -> Dict[str, pd.DataFrame]:
 
                 if line.startswith('# sheet:'):
                     # Save previous sheet if it exists
-                    if current_sheet and current_data and headers:
-                        try:
-                            df = pd.DataFrame(current_data, columns=headers)
-                            sheets[current_sheet] = df
-                        except Exception:
-                            pass
+                    save_sheet()
 
                     # Start new sheet
                     current_sheet = line.replace('# sheet:', '').strip()
                     current_data = []
                     headers = []
+                    stream = None
                     continue
 
                 if line.startswith('#'):
@@ -149,29 +426,424 @@ def load_csv_data() -> Dict[str, pd.DataFrame]:
                         headers = row
                         if '__sheet' in headers:
                             headers.remove('__sheet')
+                        if data_fingerprint and HAS_PYARROW and current_sheet in STREAMED_SHEETS:
+                            stream = SheetStream.open(sheet_cache_key(current_sheet, data_fingerprint), headers)
                     elif headers and current_sheet:
                         if len(row) > len(headers):
                             row = row[1:]  # Assume first column is __sheet
                         while len(row) < len(headers):
                             row.append('')
                         row = row[:len(headers)]
-                        current_data.append(row)
+                        if stream is not None:
+                            stream.append(row, len(line))
+                        else:
+                            current_data.append(row)
                 except Exception:
                     continue
 
         # Save last sheet
-        if current_sheet and current_data and headers:
-            try:
-                df = pd.DataFrame(current_data, columns=headers)
-                sheets[current_sheet] = df
-            except Exception:
-                pass
+        save_sheet()
+
+        if streamed:
+            attached = attach_sheets(list(streamed), data_fingerprint)
+            if attached is None:
+                return {}
+            # Keep the file's sheet order
+            ordered = list(sheets.items())
+            for name, position in streamed.items():
+                ordered.insert(position, (name, attached[name]))
+            sheets = dict(ordered)
 
         return sheets
     except Exception as e:
         st.error(f"Error loading CSV file: {str(e)}")
         return {}
 
+# The collector's --output JSON holds the same data as its CSV before flattening. It is
+# read incrementally: each market (with its borrowers, transactions and Pendle data),
+# vault and vault's depositors is decoded on its own and turned into sheet rows, so the
+# document is never held whole. Values keep their JSON types, and nested arrays stay
+# decoded rather than being written out as JSON text and parsed again.
+COLLECTOR_SHEETS = ('morpho_markets', 'morpho_top_borrowers', 'morpho_user_transactions',
+                    'morpho_curators', 'morpho_vaults', 'morpho_vault_top_depositors',
+                    'pendle_pt_matches', 'pendle_market_data', 'pendle_market_history',
+                    'pendle_user_positions')
+JSON_READ_CHARS = 1 << 20
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+DEPOSITOR_TOP_TRANSACTIONS = 5
+
+class JsonStream:
+    """Incremental reader of a JSON document that steps into arrays and objects one level at a time"""
+
+    def __init__(self, f, read_chars: int = JSON_READ_CHARS):
+        self.file = f
+        self.read_chars = read_chars
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, size: int) -> bool:
+        """Append up to size more characters to the unread part of the buffer; False at the end of the file"""
+        chunk = self.file.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next character after any whitespace, or '' at the end of the document"""
+        while True:
+            self.pos = JSON_WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill(self.read_chars):
+                return ''
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed JSON: expected one of {chars!r}, found {char or 'the end of the file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete value"""
+        self.peek()
+        size = self.read_chars
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number ending at the edge of the buffer may continue in the file
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Read geometrically more, so a large value is decoded a bounded number of times
+            self.fill(size)
+            size *= 2
+
+    def items(self):
+        """Step through an array, yielding once per element for the caller to read; null is an empty array"""
+        if self.peek() == 'n':
+            self.value()
+            return
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.expect(',]') == ']':
+                return
+
+    def members(self):
+        """Step through an object, yielding each key for the caller to read its value; null is an empty object"""
+        if self.peek() == 'n':
+            self.value()
+            return
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+def flatten_record(record: dict, prefix: str = '', out: Optional[dict] = None) -> dict:
+    """The collector's flattening of a record into dotted columns, except that arrays of
+    objects are kept decoded instead of being serialized to JSON text"""
+    if out is None:
+        out = {}
+    for key, value in record.items():
+        column = prefix + key
+        if isinstance(value, dict):
+            flatten_record(value, column + '.', out)
+        elif isinstance(value, list):
+            if value and isinstance(value[0], (dict, list)):
+                out[column] = value
+            else:
+                out[column] = '|'.join(
+                    '' if item is None else item if isinstance(item, str) else json.dumps(item) for item in value)
+        else:
+            out[column] = value
+    return out
+
+def pendle_history_points(history) -> List[dict]:
+    """Pendle history as one point per timestamp, as the collector writes pendle_market_history"""
+    if isinstance(history, dict) and isinstance(history.get('timestamp'), list) \
+            and isinstance(history.get('impliedApy'), list):
+        def series(name: str) -> list:
+            values = history.get(name)
+            return values if isinstance(values, list) else []
+
+        implied, base, max_apy, tvl = series('impliedApy'), series('baseApy'), series('maxApy'), series('tvl')
+        at = lambda values, i: safe_float(values[i]) if i < len(values) else 0.0
+        return [{'timestamp': timestamp, 'apy': at(implied, i), 'impliedApy': at(implied, i),
+                 'baseApy': at(base, i), 'maxApy': at(max_apy, i), 'tvl': at(tvl, i)}
+                for i, timestamp in enumerate(history['timestamp'])]
+    if isinstance(history, list):
+        return history
+    if isinstance(history, dict):
+        for key in ('results', 'data', 'history'):
+            if isinstance(history.get(key), list):
+                return history[key]
+    return []
+
+def market_entry_records(entry: dict):
+    """(sheet, record) pairs the collector derives from one element of the document's markets"""
+    market = entry.get('market') or {}
+    unique_key = market.get('uniqueKey')
+    borrowers = [b for b in entry.get('topBorrowers') or [] if isinstance(b, dict)]
+    pendle = entry.get('pendle') or {}
+    pendle_address = pendle.get('marketAddress')
+
+    yield 'morpho_markets', market
+    for borrower in borrowers:
+        user_address = (borrower.get('user') or {}).get('address')
+        transactions = borrower.get('transactions')
+        yield 'morpho_top_borrowers', {
+            'marketUniqueKey': unique_key,
+            'userAddress': user_address,
+            'healthFactor': borrower.get('healthFactor'),
+            'priceVariationToLiquidationPrice': borrower.get('priceVariationToLiquidationPrice'),
+            'transactions_count': len(transactions) if isinstance(transactions, list) else 0,
+            'state': borrower.get('state'),
+        }
+        for tx in transactions or []:
+            yield 'morpho_user_transactions', {
+                'marketUniqueKey': unique_key,
+                'userAddress': user_address,
+                'hash': tx.get('hash'),
+                'timestamp': tx.get('timestamp'),
+                'type': tx.get('type'),
+                'data': tx.get('data'),
+            }
+
+    loan_symbol = (market.get('loanAsset') or {}).get('symbol') or ''
+    collateral_symbol = (market.get('collateralAsset') or {}).get('symbol') or ''
+    yield 'pendle_pt_matches', {
+        'marketUniqueKey': unique_key,
+        'morphoPair': f"{loan_symbol}/{collateral_symbol}",
+        'ptTokenAddress': pendle.get('matchedFromPtAddress') or '',
+        'chainId': pendle.get('chainId'),
+        'pendleMarketAddress': pendle_address or '',
+        'matched': bool(pendle_address),
+        'note': pendle.get('note') or '',
+    }
+    if not pendle_address:
+        return
+    if pendle.get('marketData'):
+        yield 'pendle_market_data', {
+            'marketUniqueKey': unique_key,
+            'chainId': pendle.get('chainId'),
+            'pendleMarketAddress': pendle_address,
+            'marketData': pendle['marketData'],
+        }
+    if pendle.get('historicalData'):
+        for point in pendle_history_points(pendle['historicalData']):
+            yield 'pendle_market_history', {
+                'marketUniqueKey': unique_key,
+                'chainId': pendle.get('chainId'),
+                'pendleMarketAddress': pendle_address,
+                'point': point,
+            }
+    for borrower in borrowers:
+        user_address = (borrower.get('user') or {}).get('address')
+        if not user_address:
+            continue
+        positions = borrower.get('pendleDashboardPositions')
+        yield 'pendle_user_positions', {
+            'marketUniqueKey': unique_key,
+            'userAddress': user_address,
+            'positionsCount': len(positions['positions'])
+            if isinstance(positions, dict) and isinstance(positions.get('positions'), list) else None,
+            'raw': positions,
+        }
+
+def curator_record(curator: dict) -> dict:
+    """Curator row with addresses and socials joined the way the collector writes them"""
+    return {
+        'name': curator.get('name'),
+        'addresses': '|'.join(str(a.get('address', '')) for a in curator.get('addresses') or []),
+        'socials': '|'.join(f"{s.get('type', '')}:{s.get('url', '')}" for s in curator.get('socials') or []),
+        'aum': (curator.get('state') or {}).get('aum'),
+    }
+
+def depositor_record(vault_address: str, depositor: dict) -> dict:
+    """Vault depositor row keeping the depositor's largest transactions by USD value"""
+    def transaction_usd(tx: dict) -> float:
+        data = tx.get('data') or {}
+        return safe_float(data.get('assetsUsd') or data.get('repaidAssetsUsd') or 0)
+
+    user = depositor.get('user') or {}
+    transactions = sorted(user.get('transactions') or [], key=transaction_usd, reverse=True)
+    return {
+        'vaultAddress': vault_address,
+        'userAddress': user.get('address'),
+        'assetsUsd': (depositor.get('state') or {}).get('assetsUsd'),
+        'userTransactions': transactions[:DEPOSITOR_TOP_TRANSACTIONS],
+    }
+
+def pack_column(values: list):
+    """A chunk of a column as a typed Arrow array; nested or mixed-type values stay a list"""
+    if not HAS_PYARROW:
+        return values
+    try:
+        array = pa.array(values)
+    except (pa.ArrowException, TypeError, ValueError, OverflowError):
+        return values
+    return values if pa.types.is_nested(array.type) else array
+
+def join_column_chunks(parts: List[Tuple[int, object]]):
+    """One column from its packed chunks (None for chunks parsed before the column appeared):
+    a ChunkedArray when the chunks' types agree, with ints widened to floats if both occur, else a list"""
+    arrays = [values for _, values in parts if values is not None]
+    if HAS_PYARROW and all(isinstance(values, pa.Array) for values in arrays):
+        types = {values.type for values in arrays} - {pa.null()}
+        target = None
+        if not types:
+            target = pa.large_string()
+        elif len(types) == 1:
+            target = types.pop()
+            if pa.types.is_string(target):
+                target = pa.large_string()
+        elif all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+            target = pa.float64()
+        if target is not None:
+            column = pa.chunked_array([pa.nulls(rows, target) if values is None else values.cast(target)
+                                       for rows, values in parts], type=target)
+            # Missing text is an empty cell, as in the CSV
+            return column.fill_null('') if pa.types.is_large_string(target) else column
+
+    joined = []
+    for rows, values in parts:
+        if values is None:
+            joined.extend([None] * rows)
+        else:
+            joined.extend(values if isinstance(values, list) else values.to_pylist())
+    if all(value is None or isinstance(value, str) for value in joined):
+        joined = ['' if value is None else value for value in joined]
+    return joined
+
+class SheetBuilder:
+    """Columns of one sheet built from flattened records; every JSON_CHUNK_ROWS rows the
+    scalar columns are packed into typed Arrow arrays and the rows' Python objects dropped"""
+
+    def __init__(self):
+        self.columns = {}  # every column seen so far, in order of appearance
+        self.chunks = []  # (rows, {column: packed values})
+        self.pending = []  # records not packed yet
+        self.rows = 0
+
+    def append(self, record: dict):
+        self.pending.append(record)
+        if len(self.pending) >= JSON_CHUNK_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            for record in self.pending:
+                self.columns.update(dict.fromkeys(record))
+            self.chunks.append((len(self.pending), {
+                column: pack_column([record.get(column) for record in self.pending]) for column in self.columns}))
+            self.rows += len(self.pending)
+            self.pending = []
+
+    def finish(self) -> Tuple[Optional['pa.Table'], Dict[str, list]]:
+        """The sheet's Arrow-typed columns as one table (None without pyarrow) and its other columns as lists"""
+        self.flush()
+        typed, other = {}, {}
+        for column in self.columns:
+            joined = join_column_chunks([(rows, packed.get(column)) for rows, packed in self.chunks])
+            (other if isinstance(joined, list) else typed)[column] = joined
+        self.chunks = []
+        return pa.table(typed) if HAS_PYARROW and typed else None, other
+
+def sheet_frame(table: Optional['pa.Table'], other: Dict[str, list], rows: int, order: List[str]) -> pd.DataFrame:
+    """DataFrame of a built sheet; text columns are Arrow-backed like the sheets mapped from the store"""
+    if table is not None:
+        frame = table.to_pandas(types_mapper={pa.large_string(): pd.StringDtype('pyarrow')}.get)
+    else:
+        frame = pd.DataFrame(index=pd.RangeIndex(rows))
+    for column, values in other.items():
+        frame[column] = pd.Series(values, index=frame.index)
+    return frame[order]
+
+def load_json_data(data_fingerprint: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """Load all sheets from the collector's JSON output, one market or vault at a time
+
+    Given the file's fingerprint, sheets whose columns are all typed scalars are written
+    straight into their Arrow files in the disk cache and returned memory-mapped.
+    """
+    try:
+        if not os.path.exists(JSON_FILE):
+            st.error(f"JSON file '{JSON_FILE}' not found!")
+            return {}
+
+        builders = {name: SheetBuilder() for name in COLLECTOR_SHEETS}
+
+        def add(sheet_name: str, record: dict):
+            builders[sheet_name].append(flatten_record(record))
+
+        with open(JSON_FILE, 'r', encoding='utf-8') as f:
+            stream = JsonStream(f)
+            for key in stream.members():
+                if key == 'markets':
+                    for _ in stream.items():
+                        entry = stream.value()
+                        if isinstance(entry, dict):
+                            for sheet_name, record in market_entry_records(entry):
+                                add(sheet_name, record)
+                elif key == 'curators':
+                    for _ in stream.items():
+                        add('morpho_curators', curator_record(stream.value() or {}))
+                elif key == 'vaults':
+                    for _ in stream.items():
+                        add('morpho_vaults', stream.value() or {})
+                elif key == 'vaultDepositors':
+                    for vault_address in stream.members():
+                        for _ in stream.items():
+                            add('morpho_vault_top_depositors', depositor_record(vault_address, stream.value() or {}))
+                else:
+                    stream.value()
+
+        sheets = {}
+        stored = []
+        for name, builder in builders.items():
+            table, other = builder.finish()
+            if not builder.rows:
+                continue
+            order = list(builder.columns)
+            if data_fingerprint and HAS_PYARROW and not other and \
+                    write_arrow_file(disk_cache_path(sheet_cache_key(name, data_fingerprint), '.arrow'), table.select(order)):
+                stored.append(name)
+                sheets[name] = None  # keeps the sheet's place until it is attached
+                continue
+            sheets[name] = sheet_frame(table, other, builder.rows, order)
+
+        if stored:
+            attached = attach_sheets(stored, data_fingerprint)
+            if attached is None:
+                return {}
+            sheets.update(attached)
+
+        return sheets
+    except Exception as e:
+        st.error(f"Error loading JSON file: {str(e)}")
+        return {}
+
+def load_sheets(data_fingerprint: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """Sheets of the configured data file"""
+    return load_json_data(data_fingerprint) if JSON_FILE else load_csv_data(data_fingerprint)
+
 # ======================================================
 # Routing Functions
 # ======================================================
@@ -428,115 +1100,14 @@ def get_top_borrowers(sheets: Dict[str, pd.DataFrame], unique_key: str) -> pd.Da
 
     return market_borrowers[['userAddress', 'Collateral USD', 'Borrow USD', 'Health Factor', 'PnL USD', 'Morpho PnL']].head(5)
 
-def process_positions_for_display(raw_positions_json: str):
-    """
-    Processes the raw JSON and returns aggregated stats and a detailed DataFrame.
-
-    Returns:
-        A tuple containing:
-        1. A dictionary of aggregated stats (for metrics and charts).
-        2. A pandas DataFrame with details of each open position.
-    """
-    aggregated_stats = {
-        'total_pt_value': 0,
-        'total_yt_value': 0,
-        'total_lp_value': 0,
-        'total_open_value': 0,
-        'position_count': 0,
-    }
-    detailed_positions = []
-
-    if not isinstance(raw_positions_json, str):
-        return aggregated_stats, pd.DataFrame(detailed_positions)
-
-    try:
-        data = json.loads(raw_positions_json)
-    except json.JSONDecodeError:
-        return aggregated_stats, pd.DataFrame(detailed_positions)
-
-    for chain_data in data:
-        for pos in chain_data.get('openPositions', []):
-            pt_val = pos.get('pt', {}).get('valuation', 0)
-            yt_val = pos.get('yt', {}).get('valuation', 0)
-            lp_val = pos.get('lp', {}).get('valuation', 0)
-            position_total = pt_val + yt_val + lp_val
-
-            if position_total > 0:
-                # Add to aggregates
-                aggregated_stats['total_pt_value'] += pt_val
-                aggregated_stats['total_yt_value'] += yt_val
-                aggregated_stats['total_lp_value'] += lp_val
-                aggregated_stats['position_count'] += 1
-
-                # Add to detailed list for the DataFrame
-                detailed_positions.append({
-                    "Market ID": pos.get('marketId', 'N/A'),
-                    "PT Value": pt_val,
-                    "YT Value": yt_val,
-                    "LP Value": lp_val,
-                    "Total Value": position_total
-                })
-
-    aggregated_stats['total_open_value'] = (
-        aggregated_stats['total_pt_value'] +
-        aggregated_stats['total_yt_value'] +
-        aggregated_stats['total_lp_value']
-    )
-
-    return aggregated_stats, pd.DataFrame(detailed_positions)
-
-def get_pendle_positions(sheets: Dict[str, pd.DataFrame], user_address: str, unique_key: str) -> pd.DataFrame:
-    """
-    Get Pendle positions for a specific user and calculate the total valuation from raw.positions.
-    """
-    if 'pendle_user_positions' not in sheets:
-        return pd.DataFrame()
-
-    positions_df = sheets['pendle_user_positions']
-    user_positions = positions_df[
-        (positions_df['userAddress'] == user_address) &
-        (positions_df['marketUniqueKey'] == unique_key)
-    ].copy()
-
-    if user_positions.empty or 'raw.positions' not in user_positions.columns:
-        return user_positions
-
-    def calculate_total_valuation(positions_json_str: str) -> float:
-        """
-        Parses a JSON string from a single row and calculates the sum of all open valuations.
-        """
-        total_valuation = 0.0
-        # Handle cases where the cell might be empty or not a valid JSON string
-        if not isinstance(positions_json_str, str):
-            return 0.0
-
-        try:
-            data = json.loads(positions_json_str)
-        except json.JSONDecodeError:
-            return 0.0
-
-        # The JSON data is a list of chains
-        for chain_data in data:
-            # Loop through each open position in the chain
-            for position in chain_data.get('openPositions', []):
-                pt_valuation = position.get('pt', {}).get('valuation', 0)
-                yt_valuation = position.get('yt', {}).get('valuation', 0)
-                lp_valuation = position.get('lp', {}).get('valuation', 0)
-                total_valuation += pt_valuation + yt_valuation + lp_valuation
-
-        return total_valuation
-
-    # Correctly apply the function to each row in the 'raw.positions' column
-    user_positions['totalBalance'] = user_positions['raw.positions'].apply(calculate_total_valuation)
-
-    return user_positions
-
-def get_user_transactions(sheets: Dict[str, pd.DataFrame], unique_key: str, user_address: str = None) -> pd.DataFrame:
+@view_cache("transactions")
+def get_user_transactions(_sheets: Dict[str, pd.DataFrame], data_version: str, unique_key: str,
+                          user_address: str = None) -> pd.DataFrame:
     """Get transaction history for market or specific user"""
-    if 'morpho_user_transactions' not in sheets:
+    if 'morpho_user_transactions' not in _sheets:
         return pd.DataFrame()
 
-    tx_df = sheets['morpho_user_transactions']
+    tx_df = _sheets['morpho_user_transactions']
     market_txs = tx_df[tx_df['marketUniqueKey'] == unique_key].copy()
 
     if user_address:
@@ -552,9 +1123,10 @@ def get_user_transactions(sheets: Dict[str, pd.DataFrame], unique_key: str, user
 
     return market_txs
 
-def calculate_borrower_pnl(sheets: Dict[str, pd.DataFrame], unique_key: str, user_address: str, pool_info: Dict) -> float:
+def calculate_borrower_pnl(sheets: Dict[str, pd.DataFrame], data_version: str, unique_key: str, user_address: str,
+                           pool_info: Dict) -> float:
     """Calculate estimated PnL using leverage and looping calculations"""
-    tx_df = get_user_transactions(sheets, unique_key, user_address)
+    tx_df = get_user_transactions(sheets, data_version, unique_key, user_address)
     if tx_df.empty:
         return 0.0
 
@@ -589,54 +1161,80 @@ def calculate_borrower_pnl(sheets: Dict[str, pd.DataFrame], unique_key: str, use
 
     return estimated_pnl
 
-def get_vault_depositors(sheets: Dict[str, pd.DataFrame], vault_address: str) -> pd.DataFrame:
-    """Get depositors for a specific vault"""
-    if 'morpho_vault_top_depositors' not in sheets:
+@view_cache("borrowers")
+def get_borrowers_with_pnl(_sheets: Dict[str, pd.DataFrame], data_version: str, unique_key: str,
+                           pool_info: Dict) -> pd.DataFrame:
+    """Top borrowers of a market with the estimated PnL of each"""
+    borrowers_df = get_top_borrowers(_sheets, unique_key)
+    if borrowers_df.empty:
+        return borrowers_df
+    borrowers_df['Estimated PnL'] = [calculate_borrower_pnl(_sheets, data_version, unique_key, address, pool_info)
+                                     for address in borrowers_df['userAddress']]
+    return borrowers_df
+
+def summarize_depositor_transactions(transactions) -> Tuple[float, List[Dict]]:
+    """Deposited amount and transaction records from a depositor's decoded userTransactions"""
+    calculated_amount = 0
+    transaction_data = []
+    try:
+        for tx in transactions if isinstance(transactions, list) else []:
+            if isinstance(tx, dict):
+                tx_hash = tx.get('hash', '')
+                tx_type = tx.get('type', '')
+                tx_timestamp = tx.get('timestamp', 0)
+                tx_data = tx.get('data', {})
+                tx_amount = safe_float(tx_data.get('assetsUsd', 0))
+
+                transaction_data.append({
+                    'hash': tx_hash,
+                    'type': tx_type,
+                    'timestamp': tx_timestamp,
+                    'amount_usd': tx_amount
+                })
+
+                # Sum deposits for calculated amount
+                if 'deposit' in tx_type.lower() or tx_amount > 0:
+                    calculated_amount += tx_amount
+    except Exception:
+        # Malformed records keep whatever was summed before them
+        pass
+    return calculated_amount, transaction_data
+
+def decode_depositor_transactions(sheets: Dict[str, pd.DataFrame]) -> Optional[List[object]]:
+    """userTransactions of every depositor row, decoded once at build time"""
+    depositors_df = sheets.get('morpho_vault_top_depositors')
+    if depositors_df is None or 'userTransactions' not in depositors_df.columns:
+        return None
+    return decode_json_column(depositors_df['userTransactions'].tolist())
+
+@view_cache("vault_depositors")
+def get_vault_depositors(_sheets: Dict[str, pd.DataFrame], data_version: str, vault_address: str,
+                         _decoded_transactions: Optional[List[object]] = None) -> pd.DataFrame:
+    """Get depositors for a specific vault, reusing the userTransactions decoded at build time if given"""
+    if 'morpho_vault_top_depositors' not in _sheets:
         return pd.DataFrame()
 
-    depositors_df = sheets['morpho_vault_top_depositors']
-    vault_depositors = depositors_df[depositors_df['vaultAddress'] == vault_address].copy()
+    depositors_df = _sheets['morpho_vault_top_depositors']
+    vault_mask = (depositors_df['vaultAddress'] == vault_address).to_numpy()
+    vault_depositors = depositors_df[vault_mask]
 
     if vault_depositors.empty:
         return pd.DataFrame()
 
+    # Parse user transactions to get actual amounts if raw amount is 0
+    if _decoded_transactions is not None:
+        decoded_transactions = [_decoded_transactions[row] for row in np.flatnonzero(vault_mask)]
+    elif 'userTransactions' in vault_depositors.columns:
+        decoded_transactions = decode_json_column(vault_depositors['userTransactions'].tolist())
+    else:
+        decoded_transactions = [None] * len(vault_depositors)
+
     # Process depositor amounts and transactions
     processed_depositors = []
-    for _, depositor in vault_depositors.iterrows():
+    for (_, depositor), transactions in zip(vault_depositors.iterrows(), decoded_transactions):
         user_addr = depositor['userAddress']
         raw_amount = safe_float(depositor.get('assetsUsd', 0))
-
-        # Parse user transactions to get actual amounts if raw amount is 0
-        transactions_str = depositor.get('userTransactions', '[]')
-        calculated_amount = 0
-        transaction_data = []
-
-        try:
-            if isinstance(transactions_str, str):
-                transactions = json.loads(transactions_str)
-            else:
-                transactions = transactions_str if isinstance(transactions_str, list) else []
-
-            for tx in transactions:
-                if isinstance(tx, dict):
-                    tx_hash = tx.get('hash', '')
-                    tx_type = tx.get('type', '')
-                    tx_timestamp = tx.get('timestamp', 0)
-                    tx_data = tx.get('data', {})
-                    tx_amount = safe_float(tx_data.get('assetsUsd', 0))
-
-                    transaction_data.append({
-                        'hash': tx_hash,
-                        'type': tx_type,
-                        'timestamp': tx_timestamp,
-                        'amount_usd': tx_amount
-                    })
-
-                    # Sum deposits for calculated amount
-                    if 'deposit' in tx_type.lower() or tx_amount > 0:
-                        calculated_amount += tx_amount
-        except:
-            pass
+        calculated_amount, transaction_data = summarize_depositor_transactions(transactions)
 
         # Use calculated amount if raw amount is 0 or very small
         final_amount = calculated_amount if raw_amount < 1000 and calculated_amount > raw_amount else raw_amount
@@ -653,42 +1251,12 @@ def get_vault_depositors(sheets: Dict[str, pd.DataFrame], vault_address: str) ->
     result_df = pd.DataFrame(processed_depositors)
     return result_df.sort_values('Assets USD', ascending=False).head(10)
 
-def get_vault_depositors_by_curator(sheets: Dict[str, pd.DataFrame], curator_name: str) -> pd.DataFrame:
-    """Get top depositors for all vaults managed by a specific curator"""
-    if 'morpho_vault_top_depositors' not in sheets or 'morpho_vaults' not in sheets:
-        return pd.DataFrame()
-
-    depositors_df = sheets['morpho_vault_top_depositors']
-    vaults_df = build_vaults_df(sheets)
-
-    # Get vaults managed by this curator
-    curator_vaults = vaults_df[
-        vaults_df['Curator Names List'].apply(
-            lambda x: curator_name in x if isinstance(x, list) else False
-        )
-    ]
-
-    # Remove duplicate vaults
-    curator_vaults = curator_vaults.drop_duplicates(subset=['Address'])
-
-    if curator_vaults.empty:
-        return pd.DataFrame()
-
-    curator_vault_addresses = curator_vaults['Address'].tolist()
-
-    # Filter depositors for curator's vaults
-    curator_depositors = depositors_df[
-        depositors_df['vaultAddress'].isin(curator_vault_addresses)
-    ].copy()
-
-    if curator_depositors.empty:
+def get_vault_depositors_by_curator(curator_depositors: Dict[str, pd.DataFrame], curator_name: str) -> pd.DataFrame:
+    """Get top depositors for all vaults managed by a specific curator, largest position first"""
+    top = curator_depositors.get('top')
+    if top is None or curator_name not in top.index:
         return pd.DataFrame()
-
-    # Add vault names
-    vault_name_map = dict(zip(curator_vaults['Address'], curator_vaults['Vault']))
-    curator_depositors['Vault Name'] = curator_depositors['vaultAddress'].map(vault_name_map)
-
-    return curator_depositors.sort_values('assetsUsd', ascending=False).head(20)
+    return top.loc[[curator_name]].reset_index(drop=True)
 
 def parse_historical_apy_data(historical_data_str: str) -> pd.DataFrame:
     """Parse historical APY data from JSON string format"""
@@ -770,26 +1338,29 @@ def get_pendle_yield_data(sheets: Dict[str, pd.DataFrame], market_key: str) -> p
 
     return pendle_df[['date', 'apy']].sort_values('date')
 
-def create_depositor_distribution_chart(depositors_df: pd.DataFrame) -> go.Figure:
+@view_cache("charts")
+def create_depositor_distribution_chart(_depositors_df: pd.DataFrame, data_version: str, vault_address: str) -> go.Figure:
     """Create depositor distribution pie chart"""
-    if depositors_df.empty:
+    if _depositors_df.empty:
         return go.Figure()
 
     fig = px.pie(
-        values=depositors_df['Assets USD'],
-        names=[f"{addr[:10]}..." for addr in depositors_df['userAddress']],
+        values=_depositors_df['Assets USD'],
+        names=[f"{addr[:10]}..." for addr in _depositors_df['userAddress']],
         title="Depositor Distribution by Amount"
     )
     fig.update_layout(height=400)
     return fig
 
-def create_depositor_sankey(depositors_df: pd.DataFrame, vault_info: Dict) -> go.Figure:
+@view_cache("charts")
+def create_depositor_sankey(_depositors_df: pd.DataFrame, data_version: str, vault_address: str, vault_info: Dict,
+                            depositor_address: str = None) -> go.Figure:
     """Create Sankey diagram for vault depositors"""
-    if depositors_df.empty:
+    if _depositors_df.empty:
         return go.Figure()
 
     # Create nodes: depositors -> vault -> asset
-    depositors = [f"{addr[:10]}..." for addr in depositors_df['userAddress'][:5]]  # Top 5
+    depositors = [f"{addr[:10]}..." for addr in _depositors_df['userAddress'][:5]]  # Top 5
     vault_name = vault_info.get('Vault', 'Vault')
     asset_name = vault_info.get('Asset', 'Asset')
 
@@ -798,7 +1369,7 @@ def create_depositor_sankey(depositors_df: pd.DataFrame, vault_info: Dict) -> go
 
     sources, targets, values = [], [], []
 
-    for i, (_, depositor) in enumerate(depositors_df.head(5).iterrows()):
+    for i, (_, depositor) in enumerate(_depositors_df.head(5).iterrows()):
         depositor_short = f"{depositor['userAddress'][:10]}..."
         amount = depositor['Assets USD']
 
@@ -828,147 +1399,1337 @@ def create_depositor_sankey(depositors_df: pd.DataFrame, vault_info: Dict) -> go
     return fig
 
 # ======================================================
-# Visualization Functions
+# Risk Analytics
 # ======================================================
 
-def create_pool_performance_chart(sheets: Dict[str, pd.DataFrame], pool_key: str) -> go.Figure:
+def build_borrower_risk_arrays(sheets: Dict[str, pd.DataFrame]) -> Dict[str, np.ndarray]:
     """
-    Creates a single-axis line chart with a custom hybrid linear-log scale,
-    displaying only the two APY lines.
+    Collect collateral, debt and LLTV of every borrower in every market into
+    aligned NumPy arrays, sorted by market so per-market sums are a reduceat.
     """
-    
-    # Define the threshold for switching scales
-    threshold = 100
-    log_offset = threshold / np.log10(threshold)
-    
-    def hybrid_scale(y):
-        """Maps a value to the hybrid linear-log scale."""
-        return y if y is not None and y <= threshold else np.log10(y) * log_offset if y is not None and y > 0 else None
+    if 'morpho_top_borrowers' not in sheets or 'morpho_markets' not in sheets:
+        return {}
 
-    # Initialize the figure with a single y-axis
-    fig = go.Figure()
+    borrowers = sheets['morpho_top_borrowers']
+    markets = sheets['morpho_markets'].drop_duplicates(subset=['uniqueKey'])
+    if borrowers.empty or markets.empty:
+        return {}
 
-    # Get market data
-    if 'morpho_markets' not in sheets:
-        return fig
+    # Borrowers whose market is missing or has no LLTV cannot be health-checked, so they are left out
+    markets = markets.set_index(markets['uniqueKey'].astype(str))
+    market_keys = borrowers['marketUniqueKey'].astype(str)
+    known = market_keys.map(pd.Series(numeric_column(markets, 'lltv'), index=markets.index)).fillna(0).to_numpy() > 0
+    borrowers, market_keys = borrowers[known], market_keys[known]
+    if borrowers.empty:
+        return {}
 
-    markets_df = sheets['morpho_markets']
-    market_data = markets_df[markets_df['uniqueKey'] == pool_key]
+    codes, unique_keys = pd.factorize(market_keys, sort=True)
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+
+    markets = markets.reindex(unique_keys)
+    lltv_by_market = numeric_column(markets, 'lltv') / 1e18
+    coll_symbols = markets.get('collateralAsset.symbol', pd.Series('—', index=markets.index)).fillna('—')
+    loan_symbols = markets.get('loanAsset.symbol', pd.Series('—', index=markets.index)).fillna('—')
+
+    return {
+        'collateral_usd': numeric_column(borrowers, 'state.collateralUsd')[order],
+        'debt_usd': numeric_column(borrowers, 'state.borrowAssetsUsd')[order],
+        'lltv': lltv_by_market[codes],
+        'market_codes': codes,
+        'market_offsets': np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]),
+        'market_keys': np.asarray(unique_keys, dtype=object),
+        'market_labels': (coll_symbols.astype(str) + ' / ' + loan_symbols.astype(str)).to_numpy(dtype=object),
+        'market_is_pt': np.array([is_pt_token(s) for s in coll_symbols], dtype=bool),
+    }
 
-    if market_data.empty:
-        return fig
+def run_liquidation_stress(risk: Dict[str, np.ndarray], shocks: np.ndarray, pt_only: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Apply a grid of collateral price shocks to every borrower at once.
 
-    market = market_data.iloc[0]
-    collateral_symbol = market.get('collateralAsset.symbol', 'Unknown')
-    loan_symbol = market.get('loanAsset.symbol', 'Unknown')
+    Health factor is collateral × LLTV / debt, so a shock s scales it by (1 + s).
+    Returns borrower × scenario health factors plus market × scenario totals of
+    liquidatable debt (USD) and liquidatable borrower counts.
+    """
+    shocks = np.asarray(shocks, dtype=float)
+    if not risk or shocks.size == 0:
+        return {}
 
-    # Parse historical Morpho and Pendle APY data
-    historical_df = parse_historical_apy_data(market.get('historicalState.dailyNetBorrowApy', ''))
-    pendle_df = pd.DataFrame()
-    if is_pt_token(collateral_symbol):
-        pendle_df = get_pendle_yield_data(sheets, pool_key)
-        
-    # Plot the main APY lines
-    if not historical_df.empty:
-        fig.add_trace(
-            go.Scatter(
-                x=historical_df['date'],
-                y=historical_df['apy'].apply(hybrid_scale),
-                name='Morpho borrow rate',
-                line=dict(color='#00D2FF', width=2)
-            )
-        )
-    if not pendle_df.empty:
-        fig.add_trace(
-            go.Scatter(
-                x=pendle_df['date'],
-                y=pendle_df['apy'].apply(hybrid_scale),
-                name='Pendle APY',
-                line=dict(color='#FF6B6B', width=2, dash='dash')
-            )
-        )
-        
-    # Current APY as a reference line with transformed data
-    current_apy = safe_float(market.get('state.netBorrowApy', 0)) * 100
-    fig.add_hline(
-        y=hybrid_scale(current_apy),
-        line_dash="dot",
-        line_color="red",
-        annotation_text=f"Current Morpho: {current_apy:.2f}%"
-    )
+    if pt_only:
+        shocked = risk['market_is_pt'][risk['market_codes']].astype(float)
+    else:
+        shocked = np.ones(len(risk['market_codes']))
+
+    price_factor = 1.0 + np.outer(shocked, shocks)
+    max_borrow = (risk['collateral_usd'] * risk['lltv'])[:, None] * price_factor
+    debt = risk['debt_usd'][:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        health = np.where(debt > 0, max_borrow / debt, np.inf)
+
+    liquidatable = health < 1.0
+    offsets = risk['market_offsets']
+    return {
+        'health_factor': health,
+        'market_liquidatable_usd': np.add.reduceat(np.where(liquidatable, debt, 0.0), offsets, axis=0),
+        'market_liquidatable_count': np.add.reduceat(liquidatable.astype(np.int64), offsets, axis=0),
+        'market_debt_usd': np.add.reduceat(risk['debt_usd'], offsets),
+    }
 
-    # Create custom axis labels for the hybrid scale
-    tick_values = [0, 25, 50, 75, 100, 200, 500, 1000, 2000, 5000]
-    tick_labels = [f"{v}%" for v in tick_values]
-    transformed_tick_values = [hybrid_scale(v) for v in tick_values]
-    
-    # Update layout and set titles
-    fig.update_layout(
-        title_text=f"Historical APY Performance: {collateral_symbol}/{loan_symbol}",
-        xaxis_title="Date",
-        yaxis_title="APY (%) (Hybrid Linear-Log Scale)",
-        hovermode='x unified',
-        height=500,
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
+@st.cache_data(show_spinner=False, max_entries=64)
+def get_liquidation_stress(_risk: Dict[str, np.ndarray], data_version: str,
+                           shocks: Tuple[float, ...], pt_only: bool) -> pd.DataFrame:
+    """Market-level stress results in long format, cached per data version and scenario grid"""
+    results = run_liquidation_stress(_risk, np.array(shocks), pt_only)
+    if not results:
+        return pd.DataFrame()
 
-    # Apply the custom axis labels
-    fig.update_yaxes(
-        tickmode='array',
-        tickvals=transformed_tick_values,
-        ticktext=tick_labels
-    )
+    n_markets, n_shocks = results['market_liquidatable_usd'].shape
+    return pd.DataFrame({
+        'Unique Key': np.repeat(_risk['market_keys'], n_shocks),
+        'Pool': np.repeat(_risk['market_labels'], n_shocks),
+        'Is PT Market': np.repeat(_risk['market_is_pt'], n_shocks),
+        'Price Shock (%)': np.tile(np.array(shocks) * 100, n_markets),
+        'Liquidatable USD': results['market_liquidatable_usd'].ravel(),
+        'Liquidatable Borrowers': results['market_liquidatable_count'].ravel(),
+        'Borrowed USD': np.repeat(results['market_debt_usd'], n_shocks),
+    })
 
-    # Add range selector
-    fig.update_layout(
-        xaxis=dict(
-            rangeselector=dict(
-                buttons=list([
-                    dict(count=7, label="7d", step="day", stepmode="backward"),
-                    dict(count=30, label="30d", step="day", stepmode="backward"),
-                    dict(count=90, label="3m", step="day", stepmode="backward"),
-                    dict(step="all")
-                ])
-            ),
-            rangeslider=dict(visible=True),
-            type="date"
-        )
-    )
+# ======================================================
+# Depositor Concentration
+# ======================================================
 
-    return fig
+CONCENTRATION_COLUMNS = ['Depositors', 'Top 1 Share', 'Top 5 Share', 'HHI', 'Gini']
+CURATOR_TOP_DEPOSITORS = 20
 
-def create_sankey_diagram(tx_df: pd.DataFrame, pool_info: Dict, user_address: str = None) -> Optional[go.Figure]:
-    """Create Sankey flow diagram for transactions based on the simple.py logic."""
-    if tx_df.empty:
-        return None
+def compute_depositor_amounts(sheets: Dict[str, pd.DataFrame],
+                              depositor_transactions: Optional[List[object]]) -> np.ndarray:
+    """
+    Position size (USD) of every depositor row, aligned with morpho_vault_top_depositors.
 
-    # Get unique borrowers (or a single user if specified)
-    if user_address:
-        borrowers = [user_address]
-        title = f"Transaction Flow - {user_address[:10]}..."
-    else:
-        # Limit to top 10 unique borrowers for readability
-        borrowers = sorted(tx_df['userAddress'].dropna().unique().tolist())[:10]
-        title = "Transaction Flow - Top Borrowers"
+    Same rule as get_vault_depositors: raw assetsUsd, replaced by the summed
+    userTransactions when the raw amount is under $1,000 and the sum is larger.
+    """
+    depositors_df = sheets.get('morpho_vault_top_depositors')
+    if depositors_df is None or depositors_df.empty:
+        return np.zeros(0)
+
+    amounts = numeric_column(depositors_df, 'assetsUsd')
+    if depositor_transactions is None:
+        return amounts
+    for row in np.flatnonzero(amounts < 1000):
+        calculated_amount, _ = summarize_depositor_transactions(depositor_transactions[row])
+        if calculated_amount > amounts[row]:
+            amounts[row] = calculated_amount
+    return amounts
+
+def build_vault_concentration(sheets: Dict[str, pd.DataFrame], depositor_amounts: np.ndarray) -> pd.DataFrame:
+    """
+    Depositor count, top-1/top-5 share, HHI (0–10,000) and Gini of every vault's
+    top depositors in one grouped pass: rows are sorted by vault and descending
+    size so each statistic is a reduceat over the vault offsets.
+    """
+    depositors_df = sheets.get('morpho_vault_top_depositors')
+    if depositors_df is None or depositors_df.empty or 'vaultAddress' not in depositors_df.columns:
+        return pd.DataFrame(columns=CONCENTRATION_COLUMNS)
+
+    codes, vault_addresses = pd.factorize(depositors_df['vaultAddress'].astype(str), sort=True)
+    amounts = np.clip(depositor_amounts, 0.0, None)
+    order = np.lexsort((-amounts, codes))
+    codes, amounts = codes[order], amounts[order]
+
+    offsets = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[offsets, len(codes)])
+    rank = np.arange(len(codes)) - np.repeat(offsets, counts) + 1
+
+    totals = np.add.reduceat(amounts, offsets)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = amounts / np.repeat(totals, counts)
+        top5 = np.add.reduceat(np.where(rank <= 5, shares, 0.0), offsets)
+        hhi = np.add.reduceat(shares ** 2, offsets) * 10000
+        # Gini over ascending sizes x_i (i = 1..n) is 2·Σ i·x_i / (n·Σx) − (n+1)/n;
+        # with descending rank r, i = n + 1 − r
+        weighted = np.add.reduceat(np.repeat(counts + 1, counts) * shares - rank * shares, offsets)
+        gini = np.where(counts > 1, (2 * weighted - counts - 1) / counts, 0.0)
+
+    valid = totals > 0
+    return pd.DataFrame({
+        'Depositors': counts,
+        'Top 1 Share': np.where(valid, shares[offsets], np.nan) * 100,
+        'Top 5 Share': np.where(valid, top5, np.nan) * 100,
+        'HHI': np.where(valid, hhi, np.nan),
+        'Gini': np.where(valid, gini, np.nan),
+    }, index=pd.Index(vault_addresses, name='Address'))
+
+def add_vault_concentration(vaults_df: pd.DataFrame, concentration: pd.DataFrame) -> pd.DataFrame:
+    """Join the per-vault concentration metrics onto the vaults table"""
+    if vaults_df.empty:
+        return vaults_df
+    vaults_df = vaults_df.join(concentration, on='Address')
+    vaults_df['Depositors'] = vaults_df['Depositors'].fillna(0).astype(int)
+    return vaults_df
+
+def curator_vault_links(curators_df: pd.DataFrame) -> pd.DataFrame:
+    """Curator→vault index: one row per (curator row, managed vault) from the Managed Vaults records"""
+    columns = ['curator_row', 'Curator', 'Address', 'Vault']
+    if curators_df.empty or 'Managed Vaults' not in curators_df.columns:
+        return pd.DataFrame(columns=columns)
+
+    managed = curators_df['Managed Vaults'].explode().dropna()
+    links = pd.DataFrame({
+        'curator_row': managed.index,
+        'Curator': curators_df.loc[managed.index, 'Curator'].to_numpy(),
+        'Address': [vault.get('Address', '') for vault in managed],
+        'Vault': [vault.get('Vault', 'Unknown') for vault in managed],
+    }, columns=columns)
+    return links.drop_duplicates(subset=['curator_row', 'Address'])
+
+def build_curator_depositors(sheets: Dict[str, pd.DataFrame], curators_df: pd.DataFrame,
+                             depositor_amounts: np.ndarray,
+                             top_n: int = CURATOR_TOP_DEPOSITORS) -> Dict[str, pd.DataFrame]:
+    """
+    Depositor rollups of every curator from a hash join of the curator→vault index
+    with the depositor positions: unique depositors, total deposited and depositors
+    present in more than one of the curator's vaults (summary, indexed by curator),
+    plus each curator's top_n positions by USD size (top, indexed by curator).
+    """
+    summary_columns = ['Unique Depositors', 'Total Deposited', 'Cross-Vault Depositors']
+    top_columns = ['userAddress', 'vaultAddress', 'Vault Name', 'Assets USD']
+    empty = {
+        'summary': pd.DataFrame(columns=summary_columns, index=pd.Index([], name='Curator')),
+        'top': pd.DataFrame(columns=top_columns, index=pd.Index([], name='Curator')),
+    }
+    depositors_df = sheets.get('morpho_vault_top_depositors')
+    if depositors_df is None or depositors_df.empty or 'vaultAddress' not in depositors_df.columns:
+        return empty
+
+    links = curator_vault_links(curators_df).drop_duplicates(subset=['Curator', 'Address'])
+    positions = pd.DataFrame({
+        'Address': depositors_df['vaultAddress'].astype(str).to_numpy(dtype=object),
+        'userAddress': depositors_df['userAddress'].astype(str).to_numpy(dtype=object),
+        'Assets USD': depositor_amounts,
+    })
+    merged = links[['Curator', 'Address', 'Vault']].merge(positions, on='Address')
+    if merged.empty:
+        return empty
+
+    per_user = merged.groupby(['Curator', 'userAddress'], sort=False).agg(
+        total=('Assets USD', 'sum'), vaults=('Address', 'nunique'))
+    per_user['cross_vault'] = per_user['vaults'] > 1
+    summary = per_user.groupby(level='Curator').agg(**{
+        'Unique Depositors': ('total', 'size'),
+        'Total Deposited': ('total', 'sum'),
+        'Cross-Vault Depositors': ('cross_vault', 'sum'),
+    })
+
+    top = (merged.sort_values(['Curator', 'Assets USD'], ascending=[True, False], kind='stable')
+           .groupby('Curator', sort=False).head(top_n)
+           .rename(columns={'Address': 'vaultAddress', 'Vault': 'Vault Name'})
+           .set_index('Curator')[top_columns])
+    return {'summary': summary, 'top': top}
+
+def add_curator_concentration(curators_df: pd.DataFrame, vaults_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Roll the vault concentration metrics up to curators: depositor counts are
+    summed, shares, HHI and Gini are averaged weighted by vault TVL.
+    """
+    if curators_df.empty or vaults_df.empty or 'Managed Vaults' not in curators_df.columns:
+        return curators_df
 
-    loan = pool_info.get('Borrow Asset', 'Loan')
-    coll = pool_info.get('Collateral Asset', 'Collateral')
+    metrics = vaults_df.drop_duplicates(subset=['Address']).set_index('Address')
+    links = curator_vault_links(curators_df).join(metrics[['TVL'] + CONCENTRATION_COLUMNS], on='Address')
 
-    # Use shortened addresses for node labels to keep the chart clean
-    borrower_labels = {b: f"{b[:6]}...{b[-4:]}" for b in borrowers}
+    curators_df = curators_df.copy()
+    curators_df['Depositors'] = links.groupby('curator_row')['Depositors'].sum().reindex(
+        curators_df.index, fill_value=0).astype(int)
 
-    # Define nodes: Borrowers first, then assets, to group them on one side
-    nodes = list(borrower_labels.values()) + [f"Loan: {loan}", f"Collateral: {coll}"]
-    if pool_info.get('Is PT Market'):
-        nodes.append("Pendle PT")
+    weighted = CONCENTRATION_COLUMNS[1:]
+    weights = links['TVL'].where(links[weighted].notna().all(axis=1), 0.0).fillna(0.0)
+    sums = links[weighted].mul(weights, axis=0).groupby(links['curator_row']).sum()
+    weight_sums = weights.groupby(links['curator_row']).sum()
+    rollup = sums.div(weight_sums.where(weight_sums > 0), axis=0)
+    for column in weighted:
+        curators_df[column] = rollup[column].reindex(curators_df.index)
+    return curators_df
 
-    idx = {n: i for i, n in enumerate(nodes)}
+# ======================================================
+# Pendle Positions
+# ======================================================
 
-    # Build links (source, target, value)
-    links_s, links_t, links_v = [], [], []
+PENDLE_VALUE_COLUMNS = ['PT Value', 'YT Value', 'LP Value']
+PENDLE_POSITION_COLUMNS = ['userAddress', 'marketUniqueKey', 'Chain ID', 'Market ID', 'Pendle Market',
+                           *PENDLE_VALUE_COLUMNS, 'Total Value']
+PENDLE_EXPOSURE_COLUMNS = ['Market ID', 'Chain ID', 'Holders', *PENDLE_VALUE_COLUMNS, 'Total Value']
 
-    for b in borrowers:
-        sub = tx_df[tx_df['userAddress'] == b]
+def build_pendle_positions(sheets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Every open Pendle position with a value, one row per (user, Morpho market,
+    position), decoded once from raw.positions. Pendle market IDs are
+    '<chain>-<address>'; 'Pendle Market' is the lowercase address. Rows are
+    sorted by user so a user's positions are one contiguous slice.
+    """
+    positions_df = sheets.get('pendle_user_positions')
+    if positions_df is None or positions_df.empty or 'raw.positions' not in positions_df.columns:
+        return pd.DataFrame(columns=PENDLE_POSITION_COLUMNS)
+
+    rows, chain_ids, market_ids, values = [], [], [], []
+    for row, raw in enumerate(positions_df['raw.positions']):
+        chains = decode_json_value(raw)
+        if not isinstance(chains, list):
+            continue
+        for chain_data in chains:
+            if not isinstance(chain_data, dict):
+                continue
+            for position in chain_data.get('openPositions') or []:
+                rows.append(row)
+                chain_ids.append(chain_data.get('chainId'))
+                market_ids.append(str(position.get('marketId', 'N/A')))
+                values.append([safe_float(safe_get(position, [token, 'valuation'], 0)) for token in ('pt', 'yt', 'lp')])
+
+    rows = np.asarray(rows, dtype=int)
+    values = np.asarray(values, dtype=float).reshape(-1, len(PENDLE_VALUE_COLUMNS))
+    market_ids = pd.Series(market_ids, dtype=object)
+    positions = pd.DataFrame({
+        'userAddress': positions_df['userAddress'].fillna('').astype(str).to_numpy(dtype=object)[rows],
+        'marketUniqueKey': positions_df['marketUniqueKey'].astype(str).to_numpy(dtype=object)[rows],
+        'Chain ID': pd.to_numeric(pd.Series(chain_ids, dtype=object), errors='coerce').to_numpy(),
+        'Market ID': market_ids.to_numpy(),
+        'Pendle Market': market_ids.str.split('-').str[-1].str.lower().to_numpy(),
+        **{column: values[:, i] for i, column in enumerate(PENDLE_VALUE_COLUMNS)},
+        'Total Value': values.sum(axis=1),
+    }, columns=PENDLE_POSITION_COLUMNS)
+    positions = positions[positions['Total Value'] > 0]
+    return positions.sort_values(['userAddress', 'marketUniqueKey'], kind='stable', ignore_index=True)
+
+def get_user_pendle_positions(pendle_positions: pd.DataFrame, user_address: str,
+                              unique_key: Optional[str] = None) -> pd.DataFrame:
+    """A user's rows of the positions table by binary search, optionally only those stored with one Morpho market"""
+    users = pendle_positions['userAddress'].to_numpy()
+    start, end = np.searchsorted(users, str(user_address), 'left'), np.searchsorted(users, str(user_address), 'right')
+    positions = pendle_positions.iloc[start:end]
+    if unique_key is not None:
+        positions = positions[positions['marketUniqueKey'] == unique_key]
+    return positions
+
+def distinct_pendle_positions(pendle_positions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Each user's positions counted once. Pendle dashboards are fetched per user, so
+    the same snapshot is stored with every PT market the user borrows in.
+    """
+    return pendle_positions.drop_duplicates(subset=['userAddress', 'Market ID'])
+
+def build_pendle_exposure(pendle_positions: pd.DataFrame) -> pd.DataFrame:
+    """Value held in every Pendle market across all tracked Morpho borrowers, indexed by 'Pendle Market'"""
+    if pendle_positions.empty:
+        return pd.DataFrame(columns=PENDLE_EXPOSURE_COLUMNS, index=pd.Index([], name='Pendle Market'))
+
+    exposure = distinct_pendle_positions(pendle_positions).groupby('Pendle Market', sort=False).agg(**{
+        'Market ID': ('Market ID', 'first'),
+        'Chain ID': ('Chain ID', 'first'),
+        'Holders': ('userAddress', 'nunique'),
+        **{column: (column, 'sum') for column in [*PENDLE_VALUE_COLUMNS, 'Total Value']},
+    })
+    return exposure.sort_values('PT Value', ascending=False)
+
+def add_pendle_exposure(pools_df: pd.DataFrame, sheets: Dict[str, pd.DataFrame],
+                        pendle_exposure: pd.DataFrame) -> pd.DataFrame:
+    """
+    Join onto each PT pool the PT value its Pendle market's holders among the
+    tracked Morpho borrowers (of any market) have, matched on the market address.
+    """
+    matches = sheets.get('pendle_pt_matches')
+    if pools_df.empty or matches is None or matches.empty or 'pendleMarketAddress' not in matches.columns:
+        return pools_df
+
+    pendle_markets = pd.Series(matches['pendleMarketAddress'].fillna('').astype(str).str.lower().to_numpy(),
+                               index=matches['marketUniqueKey'].astype(str).to_numpy())
+    pendle_markets = pendle_markets[~pendle_markets.index.duplicated()]
+    pendle_market = pools_df['Unique Key'].map(pendle_markets)
+    pools_df = pools_df.copy()
+    pools_df['Pendle Market'] = pendle_market.fillna('').to_numpy()
+    pools_df['Borrower PT Exposure ($M)'] = pendle_market.map(pendle_exposure['PT Value']).to_numpy() / 1_000_000
+    pools_df['PT Holders'] = pendle_market.map(pendle_exposure['Holders']).fillna(0).astype(int).to_numpy()
+    return pools_df
+
+# ======================================================
+# Loop Optimization
+# ======================================================
+
+def optimize_leverage_loops(pools_df: pd.DataFrame, equity_usd: float = 0.0,
+                            target_health: float = 1.1, grid_size: int = 50) -> pd.DataFrame:
+    """
+    Evaluate the looped net APY L × Y − (L−1) × B for every pool over a leverage grid.
+
+    Each pool's grid runs from 1× up to the lower of its LLTV bound at the target
+    health factor, 1 / (1 − LLTV / target_health), and its liquidity bound for the
+    given equity, 1 + available / equity. All pools are evaluated as one
+    pools × grid array.
+    """
+    if pools_df.empty:
+        return pd.DataFrame()
+
+    implied = pools_df['PT/External APY (%)'].astype(float).to_numpy()
+    borrow = pools_df['Morpho Borrow APY (%)'].astype(float).to_numpy()
+    lltv = pools_df['LLTV (%)'].astype(float).to_numpy() / 100
+    available = pools_df['Available Borrow ($M)'].astype(float).to_numpy() * 1_000_000
+
+    # LLTV bound: at leverage L the loop borrows (L-1)/L of its collateral
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ltv_limit = np.clip(lltv / target_health, 0.0, 0.99)
+        max_leverage = 1.0 / (1.0 - ltv_limit)
+        if equity_usd > 0:
+            max_leverage = np.minimum(max_leverage, 1.0 + available / equity_usd)
+
+    steps = np.linspace(0.0, 1.0, grid_size)
+    leverage = 1.0 + (max_leverage - 1.0)[:, None] * steps[None, :]
+    net_apy = leverage * implied[:, None] - (leverage - 1.0) * borrow[:, None]
+    net_apy = np.where(np.isnan(net_apy), -np.inf, net_apy)
+
+    best = net_apy.argmax(axis=1)
+    rows = np.arange(len(pools_df))
+    best_leverage = leverage[rows, best]
+    best_apy = net_apy[rows, best]
+    best_apy = np.where(np.isinf(best_apy), np.nan, best_apy)
+
+    # Capacity: the most equity the pool's free liquidity can lever at that multiple
+    with np.errstate(divide='ignore', invalid='ignore'):
+        max_equity = np.where(best_leverage > 1.0, available / (best_leverage - 1.0), np.inf)
+    equity = np.minimum(max_equity, equity_usd) if equity_usd > 0 else max_equity
+    equity = np.where(np.isinf(equity), np.nan, equity)
+
+    return pd.DataFrame({
+        'Pool': pools_df['Pool'].to_numpy(),
+        'Optimal Leverage': best_leverage,
+        'Loop Net APY (%)': best_apy,
+        'Net APY Spread (%)': pools_df['Net APY Spread (%)'].astype(float).to_numpy(),
+        'Max Leverage': max_leverage,
+        'Equity ($M)': equity / 1_000_000,
+        'Position Size ($M)': equity * best_leverage / 1_000_000,
+        'Annual Profit ($)': equity * best_apy / 100,
+        'Available Borrow ($M)': available / 1_000_000,
+        'LLTV (%)': lltv * 100,
+        'Is PT Market': pools_df['Is PT Market'].to_numpy(),
+        'Unique Key': pools_df['Unique Key'].to_numpy(),
+    })
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_leverage_loops(_pools_df: pd.DataFrame, data_version: str, equity_usd: float,
+                       target_health: float) -> pd.DataFrame:
+    """Best loop per pool, cached per data version and optimizer inputs"""
+    return optimize_leverage_loops(_pools_df, equity_usd, target_health)
+
+# Morpho's AdaptiveCurveIrm: the borrow rate is rate_at_target × curve(utilization),
+# with the curve 1/4× at 0% utilization, 1× at the 90% target and 4× at 100%
+IRM_TARGET_UTILIZATION = 0.9
+IRM_CURVE_STEEPNESS = 4.0
+SIZE_AWARE_GRID_POINTS = 41
+
+def irm_curve(utilization: np.ndarray) -> np.ndarray:
+    """AdaptiveCurveIrm multiple of the rate at target for a utilization (0–1)"""
+    utilization = np.asarray(utilization, dtype=float)
+    err = np.where(utilization > IRM_TARGET_UTILIZATION,
+                   (utilization - IRM_TARGET_UTILIZATION) / (1.0 - IRM_TARGET_UTILIZATION),
+                   (utilization - IRM_TARGET_UTILIZATION) / IRM_TARGET_UTILIZATION)
+    coeff = np.where(err < 0, 1.0 - 1.0 / IRM_CURVE_STEEPNESS, IRM_CURVE_STEEPNESS - 1.0)
+    return coeff * err + 1.0
+
+def simulate_borrow_apy(pools_df: pd.DataFrame, borrow_sizes_usd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Borrow APY (%) and loop spread (%) of every pool after borrowing each size,
+    as two pools × sizes arrays.
+
+    The rate at target is inferred from the current borrow APY and utilization
+    and held fixed, as within a single block, so only the curve moves with the
+    post-trade utilization (borrow + size) / supply. Sizes beyond the pool's
+    available liquidity are NaN.
+    """
+    sizes = np.asarray(borrow_sizes_usd, dtype=float)
+    supply = pools_df['Supply Assets ($M)'].astype(float).to_numpy() * 1_000_000
+    available = pools_df['Available Borrow ($M)'].astype(float).to_numpy() * 1_000_000
+    utilization = pools_df['Utilization (%)'].astype(float).to_numpy() / 100
+    borrow_apy = pools_df['Morpho Borrow APY (%)'].astype(float).to_numpy() / 100
+    implied = pools_df['PT/External APY (%)'].astype(float).to_numpy()
+
+    # APY = exp(rate × year) − 1, so the annualised rate is log1p(APY)
+    rate_at_target = np.log1p(borrow_apy) / irm_curve(np.clip(utilization, 0.0, 1.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        post_utilization = utilization[:, None] + sizes[None, :] / supply[:, None]
+    post_utilization = np.where(sizes[None, :] <= available[:, None], np.clip(post_utilization, 0.0, 1.0), np.nan)
+
+    post_apy = np.expm1(rate_at_target[:, None] * irm_curve(post_utilization)) * 100
+    return post_apy, implied[:, None] - post_apy
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_size_aware_spread(_pools_df: pd.DataFrame, data_version: str, borrow_size_usd: float) -> pd.DataFrame:
+    """Post-trade borrow APY and spread of every pool for one borrow size, aligned to the pools index"""
+    post_apy, spread = simulate_borrow_apy(_pools_df, np.array([borrow_size_usd]))
+    return pd.DataFrame({
+        'Post-Trade Borrow APY (%)': post_apy[:, 0],
+        'Size-Aware Spread (%)': spread[:, 0],
+    }, index=_pools_df.index)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_size_aware_spread_curves(_pools_df: pd.DataFrame, data_version: str, unique_keys: Tuple[str, ...],
+                                 max_size_usd: float) -> pd.DataFrame:
+    """Long frame of the selected pools' post-trade borrow APY and spread over a grid of borrow sizes"""
+    pools = _pools_df[_pools_df['Unique Key'].isin(unique_keys)].drop_duplicates('Unique Key')
+    sizes = np.linspace(0.0, max_size_usd, SIZE_AWARE_GRID_POINTS)
+    post_apy, spread = simulate_borrow_apy(pools, sizes)
+    return pd.DataFrame({
+        'Pool': np.repeat(pools['Pool'].to_numpy(), len(sizes)),
+        'Unique Key': np.repeat(pools['Unique Key'].to_numpy(), len(sizes)),
+        'Borrow Size ($M)': np.tile(sizes / 1_000_000, len(pools)),
+        'Post-Trade Borrow APY (%)': post_apy.ravel(),
+        'Size-Aware Spread (%)': spread.ravel(),
+    })
+
+# ======================================================
+# Historical Analytics
+# ======================================================
+
+def build_morpho_borrow_history(sheets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Decode every market's historicalState.dailyNetBorrowApy into one long frame (APY in %)"""
+    columns = ['Unique Key', 'date', 'apy']
+    markets = sheets.get('morpho_markets', pd.DataFrame())
+    if markets.empty or 'historicalState.dailyNetBorrowApy' not in markets.columns:
+        return pd.DataFrame(columns=columns)
+
+    keys, timestamps, values = [], [], []
+    for unique_key, raw in zip(markets['uniqueKey'], markets['historicalState.dailyNetBorrowApy']):
+        points = decode_json_value(raw)
+        if not isinstance(points, list):
+            continue
+        for point in points:
+            if isinstance(point, dict) and 'x' in point and 'y' in point:
+                keys.append(unique_key)
+                timestamps.append(point['x'])
+                values.append(point['y'])
+
+    history = pd.DataFrame({
+        'Unique Key': keys,
+        'date': pd.to_datetime(pd.to_numeric(pd.Series(timestamps, dtype=object), errors='coerce'), unit='s'),
+        'apy': pd.to_numeric(pd.Series(values, dtype=object), errors='coerce') * 100,
+    })
+    history = history.dropna(subset=['date', 'apy'])
+    return history.sort_values(['Unique Key', 'date'], ignore_index=True)
+
+def build_pendle_apy_history(sheets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Pendle implied APY history (in %) for every matched Morpho market in one long frame"""
+    columns = ['Unique Key', 'date', 'apy']
+    history = sheets.get('pendle_market_history', pd.DataFrame())
+    if history.empty or 'point.timestamp' not in history.columns or 'point.apy' not in history.columns:
+        return pd.DataFrame(columns=columns)
+
+    if 'marketUniqueKey' in history.columns:
+        market_keys = history['marketUniqueKey']
+    else:
+        # Older exports only carry the Pendle address; map it back through the matches
+        matches = sheets.get('pendle_pt_matches', pd.DataFrame())
+        if matches.empty:
+            return pd.DataFrame(columns=columns)
+        address_map = matches.drop_duplicates(subset=['pendleMarketAddress']).set_index('pendleMarketAddress')['marketUniqueKey']
+        market_keys = history['pendleMarketAddress'].map(address_map)
+
+    pendle_df = pd.DataFrame({
+        'Unique Key': market_keys,
+        'date': pd.to_datetime(pd.to_numeric(history['point.timestamp'], errors='coerce'), unit='s'),
+        'apy': pd.to_numeric(history['point.apy'], errors='coerce') * 100,
+    })
+    pendle_df = pendle_df.dropna(subset=['Unique Key', 'date', 'apy'])
+    return pendle_df.sort_values(['Unique Key', 'date'], ignore_index=True)
+
+def backtest_loops(borrow_history: pd.DataFrame, pendle_history: pd.DataFrame,
+                   leverages: Tuple[float, ...], windows: Tuple[int, ...]) -> pd.DataFrame:
+    """
+    Simulate the realized carry of a looped PT position for every market at once.
+
+    Each Pendle point is aligned with the latest Morpho borrow rate (merge_asof by
+    market), a position at leverage L accrues L × Y − (L−1) × B between points,
+    and returns are collected over every rolling window of consecutive daily points.
+    Returns one row per market × leverage × window with the mean and 5th
+    percentile window return and the maximum drawdown of the full path.
+    """
+    if borrow_history.empty or pendle_history.empty:
+        return pd.DataFrame()
+
+    aligned = pd.merge_asof(
+        pendle_history.sort_values('date').rename(columns={'apy': 'implied'}),
+        borrow_history.sort_values('date').rename(columns={'apy': 'borrow'}),
+        on='date', by='Unique Key', direction='backward', tolerance=pd.Timedelta(days=2)
+    )
+    aligned = aligned.dropna(subset=['implied', 'borrow'])
+    if aligned.empty:
+        return pd.DataFrame()
+    aligned = aligned.sort_values(['Unique Key', 'date'], ignore_index=True)
+
+    codes, market_keys = pd.factorize(aligned['Unique Key'])
+    group_start = np.r_[True, codes[1:] != codes[:-1]]
+    leverage = np.asarray(leverages, dtype=float)
+
+    # Rate observed at the previous point accrues over the elapsed interval
+    net_apy = (leverage[None, :] * aligned['implied'].to_numpy()[:, None]
+               - (leverage[None, :] - 1.0) * aligned['borrow'].to_numpy()[:, None]) / 100
+    elapsed_days = np.r_[0.0, np.diff(aligned['date'].to_numpy()).astype('timedelta64[s]').astype(float) / 86400]
+    elapsed_days[group_start] = 0.0
+    prev_net_apy = np.vstack([net_apy[:1], net_apy[:-1]])
+    growth = np.log1p(np.maximum(prev_net_apy * elapsed_days[:, None] / 365, -0.999999))
+    log_equity = np.cumsum(growth, axis=0)
+
+    # Max drawdown per market and leverage over the whole aligned path
+    peak = pd.DataFrame(log_equity).groupby(codes).cummax().to_numpy()
+    drawdown = pd.DataFrame(np.expm1(log_equity - peak)).groupby(codes).min()
+
+    positions = np.arange(len(codes))
+    frames = []
+    for window in windows:
+        start = positions - window
+        valid = (start >= 0) & (codes[np.maximum(start, 0)] == codes)
+        if not valid.any():
+            continue
+        window_returns = np.expm1(log_equity[valid] - log_equity[start[valid]])
+        frames.append(pd.DataFrame({
+            'code': np.repeat(codes[valid], len(leverage)),
+            'Leverage': np.tile(leverage, valid.sum()),
+            'Window (days)': window,
+            'return': window_returns.ravel() * 100,
+        }))
+    if not frames:
+        return pd.DataFrame()
+
+    grouped = pd.concat(frames, ignore_index=True).groupby(['code', 'Leverage', 'Window (days)'])['return']
+    stats = pd.DataFrame({
+        'Mean Return (%)': grouped.mean(),
+        'P5 Return (%)': grouped.quantile(0.05),
+        'Windows': grouped.size(),
+    }).reset_index()
+
+    leverage_index = {lev: i for i, lev in enumerate(leverage)}
+    stats['Max Drawdown (%)'] = drawdown.to_numpy()[
+        stats['code'].to_numpy(), stats['Leverage'].map(leverage_index).to_numpy()
+    ] * 100
+    stats.insert(0, 'Unique Key', np.asarray(market_keys)[stats.pop('code').to_numpy()])
+    return stats
+
+def build_apy_history_store(sheets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Decode all APY history once into a single long-format store.
+
+    One row per (series, market, date) with series 'borrow' (Morpho net borrow
+    APY) or 'implied' (Pendle implied APY); keys and series are categoricals so
+    slicing a market is a cheap boolean mask over compact codes.
+    """
+    borrow = build_morpho_borrow_history(sheets)
+    implied = build_pendle_apy_history(sheets)
+    store = pd.concat([borrow.assign(series='borrow'), implied.assign(series='implied')], ignore_index=True)
+    store['Unique Key'] = store['Unique Key'].astype('category')
+    store['series'] = pd.Categorical(store['series'], categories=['borrow', 'implied'])
+    store['apy'] = store['apy'].astype(float)
+    return store[['series', 'Unique Key', 'date', 'apy']]
+
+def get_history_series(store: pd.DataFrame, series: str, unique_key: Optional[str] = None) -> pd.DataFrame:
+    """Slice one APY series (optionally for one market) out of the history store"""
+    if store.empty:
+        return pd.DataFrame(columns=['Unique Key', 'date', 'apy'])
+    mask = store['series'] == series
+    if unique_key is not None:
+        mask &= store['Unique Key'] == unique_key
+    result = store.loc[mask, ['Unique Key', 'date', 'apy']]
+    result['Unique Key'] = result['Unique Key'].astype(str)
+    return result
+
+def compute_rolling_apy_stats(store: pd.DataFrame, windows: Tuple[int, ...] = ROLLING_WINDOWS) -> pd.DataFrame:
+    """
+    Rolling mean, volatility and 5th percentile of the borrow APY, implied APY and
+    their spread for every market, as of each market's latest observation.
+
+    Each series is pivoted to a daily date × market panel so every window is a
+    single time-based rolling operation across all markets.
+    """
+    if store.empty:
+        return pd.DataFrame()
+
+    daily = store.assign(date=store['date'].dt.floor('D'))
+    panel = daily.pivot_table(index='date', columns=['series', 'Unique Key'], values='apy',
+                              aggfunc='mean', observed=True)
+    panel = panel.reindex(pd.date_range(panel.index.min(), panel.index.max(), freq='D'))
+
+    borrow = panel['borrow'] if 'borrow' in panel.columns.get_level_values(0) else pd.DataFrame(index=panel.index)
+    implied = panel['implied'] if 'implied' in panel.columns.get_level_values(0) else pd.DataFrame(index=panel.index)
+    spread = implied.sub(borrow.reindex(columns=implied.columns))
+
+    def latest(frame: pd.DataFrame) -> pd.Series:
+        return frame.ffill().iloc[-1] if not frame.empty else pd.Series(dtype=float)
+
+    columns = {}
+    for window in windows:
+        min_periods = max(2, window // 4)
+        for label, values in (('Borrow APY', borrow), ('Implied APY', implied), ('Spread', spread)):
+            rolling = values.rolling(f'{window}D', min_periods=min_periods)
+            columns[f'{label} Mean {window}d (%)'] = latest(rolling.mean())
+            columns[f'{label} Vol {window}d (%)'] = latest(rolling.std())
+        columns[f'Spread P5 {window}d (%)'] = latest(spread.rolling(f'{window}D', min_periods=min_periods).quantile(0.05))
+
+    stats = pd.DataFrame(columns)
+    stats.index = stats.index.astype(str)
+    stats.index.name = 'Unique Key'
+    return stats
+
+def add_rolling_apy_stats(pools_df: pd.DataFrame, stats: pd.DataFrame) -> pd.DataFrame:
+    """Join precomputed rolling APY statistics onto the pools table"""
+    if pools_df.empty or stats.empty:
+        return pools_df
+    return pools_df.join(stats, on='Unique Key')
+
+def run_loop_backtest(store: pd.DataFrame,
+                      leverages: Tuple[float, ...] = BACKTEST_LEVERAGES,
+                      windows: Tuple[int, ...] = BACKTEST_WINDOWS) -> pd.DataFrame:
+    """Loop backtest over every PT market in the APY history store"""
+    return backtest_loops(get_history_series(store, 'borrow'), get_history_series(store, 'implied'),
+                          leverages, windows)
+
+# ======================================================
+# Activity Cubes
+# ======================================================
+
+# Bucket widths in seconds; weeks start on Monday 00:00 UTC
+ACTIVITY_RESOLUTIONS = {'Hour': 3600, 'Day': 86400, 'Week': 7 * 86400}
+ACTIVITY_WEEK_OFFSET = 4 * 86400  # the epoch was a Thursday
+# Transaction categories in the order their type names are tested, and the sign each
+# contributes to the net position (collateral supplies and withdrawals included)
+ACTIVITY_CATEGORIES = ('borrow', 'repay', 'supply', 'withdraw', 'other')
+ACTIVITY_NET_SIGN = np.array([1.0, -1.0, 1.0, -1.0, 0.0])
+ACTIVITY_CHUNK_ROWS = 250_000
+
+def activity_buckets(timestamps: np.ndarray, resolution: str) -> np.ndarray:
+    """Start (epoch seconds) of the resolution's bucket holding each timestamp"""
+    width = ACTIVITY_RESOLUTIONS[resolution]
+    offset = ACTIVITY_WEEK_OFFSET if resolution == 'Week' else 0
+    return (timestamps - offset) // width * width + offset
+
+def classify_transactions(types: pd.Series) -> np.ndarray:
+    """Index into ACTIVITY_CATEGORIES of each transaction type"""
+    # There are only a handful of distinct types, so each is classified once
+    type_codes, distinct_types = pd.factorize(types)
+    categories = [next((i for i, name in enumerate(ACTIVITY_CATEGORIES[:-1]) if name in str(tx_type).lower()),
+                       len(ACTIVITY_CATEGORIES) - 1) for tx_type in distinct_types]
+    return np.append(np.array(categories, dtype=np.int8), np.int8(len(ACTIVITY_CATEGORIES) - 1))[type_codes]
+
+def aggregate_activity(frame: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """Sum transaction counts and USD over the key columns, sorted by them"""
+    return frame.groupby(keys, sort=True, as_index=False)[['count', 'usd']].sum()
+
+def cube_arrays(frame: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Columns of an aggregated frame as plain arrays"""
+    return {column: frame[column].to_numpy() for column in frame.columns}
+
+def build_activity_cube(sheets: Dict[str, pd.DataFrame]) -> Dict[str, object]:
+    """
+    Transaction counts and USD sums over (market, user, category, time bucket) at
+    every ACTIVITY_RESOLUTIONS width, for answering activity charts in O(buckets).
+
+    The transactions sheet is parsed and aggregated to hourly buckets one chunk of
+    rows at a time, so only the partial aggregates are held alongside it; days and
+    weeks roll up from the hours. Each resolution keeps a per-user cube sorted by
+    (market, user) and a per-market marginal sorted by market, both located with a
+    binary search.
+    """
+    tx_df = sheets.get('morpho_user_transactions')
+    required = {'marketUniqueKey', 'userAddress', 'timestamp', 'type'}
+    if tx_df is None or tx_df.empty or not required.issubset(tx_df.columns):
+        return {}
+
+    market_codes, markets = pd.factorize(tx_df['marketUniqueKey'].astype(str), sort=True)
+    user_codes, users = pd.factorize(tx_df['userAddress'].astype(str), sort=True)
+
+    partials = []
+    for start in range(0, len(tx_df), ACTIVITY_CHUNK_ROWS):
+        chunk = tx_df.iloc[start:start + ACTIVITY_CHUNK_ROWS]
+        timestamps = pd.to_numeric(chunk['timestamp'], errors='coerce').to_numpy(dtype=float)
+        valid = np.isfinite(timestamps)
+        rows = slice(start, start + len(chunk))
+        partial = pd.DataFrame({
+            'market': market_codes[rows][valid].astype(np.int32),
+            'user': user_codes[rows][valid].astype(np.int32),
+            'category': classify_transactions(chunk['type'])[valid],
+            'bucket': activity_buckets(timestamps[valid].astype(np.int64), 'Hour'),
+            'count': np.ones(valid.sum(), dtype=np.int64),
+            'usd': numeric_column(chunk, 'data.assetsUsd')[valid],
+        })
+        partials.append(aggregate_activity(partial, ['market', 'user', 'category', 'bucket']))
+
+    user_keys = ['market', 'user', 'category', 'bucket']
+    by_user = aggregate_activity(pd.concat(partials, ignore_index=True), user_keys)
+
+    cube = {'markets': np.asarray(markets, dtype=object), 'users': np.asarray(users, dtype=object)}
+    for resolution in ACTIVITY_RESOLUTIONS:
+        if resolution != 'Hour':
+            by_user = by_user.assign(bucket=activity_buckets(by_user['bucket'].to_numpy(), resolution))
+            by_user = aggregate_activity(by_user, user_keys)
+        by_market = aggregate_activity(by_user, ['market', 'category', 'bucket'])
+        user_cube = cube_arrays(by_user)
+        user_cube['key'] = user_cube['market'].astype(np.int64) * len(users) + user_cube['user']
+        cube[resolution] = {'user': user_cube, 'market': cube_arrays(by_market)}
+    return cube
+
+def query_activity(cube: Dict[str, object], market_key: str, user_address: Optional[str] = None,
+                   resolution: str = 'Day') -> pd.DataFrame:
+    """Activity of a market, or of one user in it, per time bucket and category"""
+    columns = ['Bucket', 'Category', 'Transactions', 'USD Value']
+    if not cube:
+        return pd.DataFrame(columns=columns)
+
+    def code(values: np.ndarray, value: str) -> Optional[int]:
+        position = int(np.searchsorted(values, value))
+        return position if position < len(values) and values[position] == value else None
+
+    market = code(cube['markets'], market_key)
+    if market is None:
+        return pd.DataFrame(columns=columns)
+    if user_address is None:
+        table, key = cube[resolution]['market'], market
+        lookup = table['market']
+    else:
+        user = code(cube['users'], user_address)
+        if user is None:
+            return pd.DataFrame(columns=columns)
+        table, key = cube[resolution]['user'], market * len(cube['users']) + user
+        lookup = table['key']
+
+    rows = slice(np.searchsorted(lookup, key, 'left'), np.searchsorted(lookup, key, 'right'))
+    activity = pd.DataFrame({
+        'Bucket': pd.to_datetime(table['bucket'][rows], unit='s'),
+        'Category': np.asarray(ACTIVITY_CATEGORIES, dtype=object)[table['category'][rows]],
+        'Transactions': table['count'][rows],
+        'USD Value': table['usd'][rows],
+    })
+    return activity.sort_values(['Bucket', 'Category'], kind='stable', ignore_index=True)
+
+# ======================================================
+# User Index
+# ======================================================
+
+USER_INDEX_SHEETS = ('morpho_top_borrowers', 'morpho_user_transactions',
+                     'pendle_user_positions', 'morpho_vault_top_depositors')
+
+def build_user_index(sheets: Dict[str, pd.DataFrame]) -> Dict[str, object]:
+    """
+    Build a global address index over every per-user sheet.
+
+    'rows' maps sheet -> lowercase address -> row positions in that sheet, so
+    collecting everything for one address costs O(user rows). 'addresses' is the
+    sorted list of all known addresses for prefix lookups.
+    """
+    rows = {}
+    addresses = set()
+    for sheet_name in USER_INDEX_SHEETS:
+        df = sheets.get(sheet_name, pd.DataFrame())
+        if df.empty or 'userAddress' not in df.columns:
+            rows[sheet_name] = {}
+            continue
+        normalized = df['userAddress'].fillna('').astype(str).str.lower()
+        rows[sheet_name] = normalized.groupby(normalized, sort=False).indices
+        addresses.update(rows[sheet_name].keys())
+    addresses.discard('')
+    return {'rows': rows, 'addresses': sorted(addresses)}
+
+def search_addresses(user_index: Dict[str, object], prefix: str, limit: int = 20) -> List[str]:
+    """Return up to `limit` indexed addresses starting with the given prefix"""
+    prefix = prefix.strip().lower()
+    if not prefix or not user_index:
+        return []
+    addresses = user_index['addresses']
+    start = bisect.bisect_left(addresses, prefix)
+    matches = []
+    for address in addresses[start:start + limit]:
+        if not address.startswith(prefix):
+            break
+        matches.append(address)
+    return matches
+
+def get_user_rows(sheets: Dict[str, pd.DataFrame], user_index: Dict[str, object], address: str) -> Dict[str, pd.DataFrame]:
+    """Every row belonging to an address, per sheet, via the user index"""
+    address = str(address).lower()
+    result = {}
+    for sheet_name in USER_INDEX_SHEETS:
+        positions = user_index['rows'].get(sheet_name, {}).get(address) if user_index else None
+        if positions is None:
+            result[sheet_name] = pd.DataFrame()
+        else:
+            result[sheet_name] = sheets[sheet_name].iloc[positions]
+    return result
+
+def build_user_portfolio(sheets: Dict[str, pd.DataFrame], user_index: Dict[str, object], pendle_positions: pd.DataFrame,
+                         address: str, pools_df: pd.DataFrame, vaults_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Aggregate every borrow position, flow, Pendle position and vault deposit of an address"""
+    user_rows = get_user_rows(sheets, user_index, address)
+    pool_names = dict(zip(pools_df['Unique Key'], pools_df['Pool'])) if not pools_df.empty else {}
+    vault_names = dict(zip(vaults_df['Address'], vaults_df['Vault'])) if not vaults_df.empty else {}
+
+    borrows = user_rows['morpho_top_borrowers']
+    if not borrows.empty:
+        borrows = pd.DataFrame({
+            'Pool': borrows['marketUniqueKey'].map(pool_names).fillna(borrows['marketUniqueKey']),
+            'Collateral USD': numeric_column(borrows, 'state.collateralUsd'),
+            'Borrow USD': numeric_column(borrows, 'state.borrowAssetsUsd'),
+            'Health Factor': numeric_column(borrows, 'healthFactor', np.nan),
+            'Morpho PnL': numeric_column(borrows, 'state.marginPnlUsd'),
+            'Unique Key': borrows['marketUniqueKey'].to_numpy(),
+            'userAddress': borrows['userAddress'].to_numpy(),
+        })
+
+    flows = user_rows['morpho_user_transactions']
+    if not flows.empty:
+        flows = pd.DataFrame({
+            'Unique Key': flows['marketUniqueKey'].to_numpy(),
+            'type': flows['type'].astype(str).to_numpy(),
+            'USD Value': numeric_column(flows, 'data.assetsUsd'),
+        })
+        flows = flows.pivot_table(index='Unique Key', columns='type', values='USD Value',
+                                  aggfunc='sum', fill_value=0.0).reset_index()
+        flows.insert(0, 'Pool', flows['Unique Key'].map(pool_names).fillna(flows['Unique Key']))
+
+    pendle = user_rows['pendle_user_positions']
+    if not pendle.empty:
+        # Pendle dashboard positions are fetched per user, so every market row carries the same snapshot
+        pendle = get_user_pendle_positions(pendle_positions, pendle['userAddress'].iloc[0],
+                                           pendle['marketUniqueKey'].iloc[0])
+        pendle = pendle[['Market ID', *PENDLE_VALUE_COLUMNS, 'Total Value']]
+
+    deposits = user_rows['morpho_vault_top_depositors']
+    if not deposits.empty:
+        deposits = pd.DataFrame({
+            'Vault': deposits['vaultAddress'].map(vault_names).fillna(deposits['vaultAddress']),
+            'Assets USD': numeric_column(deposits, 'assetsUsd'),
+            'Vault Address': deposits['vaultAddress'].to_numpy(),
+            'userAddress': deposits['userAddress'].to_numpy(),
+        }).sort_values('Assets USD', ascending=False)
+
+    return {'borrows': borrows, 'flows': flows, 'pendle': pendle, 'deposits': deposits}
+
+# ======================================================
+# Search Index
+# ======================================================
+
+# Result kinds in ranking order, with the icon shown in the sidebar
+SEARCH_KINDS = {'pool': '📊', 'vault': '🏦', 'curator': '🧑‍🏫', 'address': '👛'}
+
+ROUTE_TARGET_PARAMS = {'pool': 'key', 'vault': 'address', 'curator': 'curator', 'address': 'addr'}
+
+def search_text(columns: List[pd.Series]) -> pd.Series:
+    """Lowercase text of each entry as ' piece piece word word ... ', where pieces are the
+    whitespace-separated parts of its names and words their alphanumeric runs, so that
+    ' ' + term is a substring exactly when the term prefixes one of its tokens"""
+    lowered = columns[0].fillna('').astype(str).str.lower()
+    for column in columns[1:]:
+        lowered = lowered + ' ' + column.fillna('').astype(str).str.lower()
+    words = lowered.str.replace(r'[^0-9a-z]+', ' ', regex=True)
+    return ' ' + lowered + ' ' + words + ' '
+
+def build_search_index(pools_df: pd.DataFrame, vaults_df: pd.DataFrame, curators_df: pd.DataFrame) -> Dict[str, object]:
+    """
+    Build a prefix index over pools, vaults and curators.
+
+    Every entry is indexed under the tokens of its names, symbols and keys. Entries are
+    numbered in ranking order (pools, vaults, curators, then the shortest label), and
+    'tokens' is sorted with 'token_entries' giving the entry of each token, so the
+    entries matching a prefix are one contiguous slice found by bisection and a token's
+    own entries are in ranking order. User addresses are searched in the user index's
+    own sorted list.
+    """
+    # A sheet missing from the data file leaves its frame empty and column-less; its part is skipped
+    parts = []
+    if not pools_df.empty and 'Pool' in pools_df.columns:
+        parts.append(('pool', pools_df['Pool'], pools_df['Unique Key'], pools_df['Unique Key'].str[:10],
+                      [pools_df['Pool'], pools_df['Collateral Asset'], pools_df['Borrow Asset'], pools_df['Unique Key']]))
+    if not vaults_df.empty and 'Vault' in vaults_df.columns:
+        vaults = vaults_df.drop_duplicates('Address')
+        parts.append(('vault', vaults['Vault'], vaults['Address'],
+                      vaults['Symbol'].astype(str) + ' · ' + vaults['Curator Name'].where(vaults['Curator Name'] != '', vaults['Asset']),
+                      [vaults['Vault'], vaults['Symbol'], vaults['Address']]))
+    if 'Curator' in curators_df.columns:
+        curator_names = curators_df['Curator'].drop_duplicates()
+        parts.append(('curator', curator_names, curator_names, pd.Series('Curator', index=curator_names.index),
+                      [curator_names]))
+
+    kinds, labels, targets, details, texts = [], [], [], [], []
+    for kind, label, target, detail, columns in parts:
+        kinds += [kind] * len(label)
+        labels += label.astype(str).tolist()
+        targets += target.astype(str).tolist()
+        details += detail.astype(str).tolist()
+        texts += search_text(columns).tolist()
+    kind_rank = {kind: rank for rank, kind in enumerate(SEARCH_KINDS)}
+    ranked = sorted(range(len(kinds)), key=lambda entry: (kind_rank[kinds[entry]], len(labels[entry])))
+
+    # One posting per distinct token of each entry, sorted by token and then entry
+    tokens, token_entries = [], []
+    for entry, text in enumerate(texts[i] for i in ranked):
+        entry_tokens = set(text.split())
+        entry_tokens.discard('nan')
+        tokens.extend(entry_tokens)
+        token_entries.extend([entry] * len(entry_tokens))
+    order = sorted(range(len(tokens)), key=tokens.__getitem__)
+    return {
+        'tokens': [tokens[i] for i in order],
+        'token_entries': np.asarray(token_entries, dtype=np.int64)[order],
+        'kinds': [kinds[i] for i in ranked],
+        'labels': [labels[i] for i in ranked],
+        'targets': [targets[i] for i in ranked],
+        'details': [details[i] for i in ranked],
+    }
+
+def first_set_positions(mask: np.ndarray, limit: int) -> np.ndarray:
+    """Positions of the first `limit` true values of a boolean mask, scanned in growing blocks
+    so that a dense mask is only read as far as its first few hits"""
+    found, count, start, block = [], 0, 0, 1024
+    while start < len(mask) and count < limit:
+        positions = np.flatnonzero(mask[start:start + block])[:limit - count] + start
+        found.append(positions)
+        count += len(positions)
+        start += block
+        block *= 2
+    return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+def search_index(index: Dict[str, object], user_index: Dict[str, object], query: str,
+                 limit: int = 10) -> List[Tuple[str, str, str, Dict[str, str]]]:
+    """Entries matching every word of the query by prefix, as (kind, label, detail, route)"""
+    terms = query.strip().lower().split()
+    if not terms or not index:
+        return []
+
+    # Each term's postings are one slice, and the postings of the token equal to the term (its
+    # whole-token hits) the start of it. The term with the fewest postings marks the candidates;
+    # the others keep the candidates among their own postings
+    tokens, token_entries = index['tokens'], index['token_entries']
+    slices = []
+    for term in terms:
+        start = bisect.bisect_left(tokens, term)
+        stop = bisect.bisect_left(tokens, term + '\U0010ffff', start)
+        slices.append((start, bisect.bisect_right(tokens, term, start, stop), stop))
+    slices.sort(key=lambda bounds: bounds[2] - bounds[0])
+    best = np.empty(0, dtype=np.int64)
+    if slices[0][0] < slices[0][2]:
+        matched = np.zeros(len(index['kinds']), dtype=bool)
+        matched[token_entries[slices[0][0]:slices[0][2]]] = True
+        for start, _, stop in slices[1:]:
+            postings = token_entries[start:stop]
+            candidates, matched = matched, np.zeros_like(matched)
+            matched[postings[candidates[postings]]] = True
+        whole = np.zeros_like(matched)
+        for start, exact_stop, _ in slices:
+            postings = token_entries[start:exact_stop]
+            whole[postings[matched[postings]]] = True
+
+        # Entries are numbered in ranking order: the best are the first whole-token hits, then the first others
+        best = first_set_positions(whole, limit)
+        if len(best) < limit:
+            best = np.concatenate([best, first_set_positions(matched & ~whole, limit - len(best))])
+
+    kinds = index['kinds']
+    results = [(kinds[entry], index['labels'][entry], index['details'][entry],
+                {'view': kinds[entry], ROUTE_TARGET_PARAMS[kinds[entry]]: index['targets'][entry]})
+               for entry in best.tolist()]
+
+    if len(terms) == 1 and len(results) < limit:
+        for address in search_addresses(user_index, terms[0], limit - len(results)):
+            results.append(('address', f"{address[:10]}...{address[-6:]}", address,
+                            {'view': 'portfolio', ROUTE_TARGET_PARAMS['address']: address}))
+    return results
+
+# ======================================================
+# Pool Screens
+# ======================================================
+
+SCREENS_FILE = os.environ.get('MORPHO_SCREENS_FILE', 'screens.json')
+
+# Short field names for the pools table; every column is also reachable by its
+# snake_case name, e.g. spread_vol_30d for 'Spread Vol 30d (%)'
+POOL_FILTER_ALIASES = {
+    'spread': 'Net APY Spread (%)',
+    'utilization': 'Utilization (%)',
+    'supply': 'Supply Assets ($M)',
+    'available': 'Available Borrow ($M)',
+    'borrow_apy': 'Morpho Borrow APY (%)',
+    'pt_apy': 'PT/External APY (%)',
+    'lltv': 'LLTV (%)',
+    'is_pt': 'Is PT Market',
+    'pt_exposure': 'Borrower PT Exposure ($M)',
+    'pt_holders': 'PT Holders',
+    'collateral': 'Collateral Asset',
+    'borrow': 'Borrow Asset',
+    'pool': 'Pool',
+    'status': 'Status',
+    'key': 'Unique Key',
+}
+
+FILTER_COMPARISONS = {
+    ast.Gt: np.greater, ast.GtE: np.greater_equal, ast.Lt: np.less, ast.LtE: np.less_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+    ast.In: lambda left, right: np.isin(left, right),
+    ast.NotIn: lambda left, right: ~np.isin(left, right),
+}
+FILTER_ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide}
+
+def filter_identifier(column: str) -> str:
+    """snake_case field name of a column: 'Spread Vol 30d (%)' -> 'spread_vol_30d'"""
+    return re.sub(r'[^0-9a-z]+', '_', re.sub(r'\([^)]*\)', '', column.lower())).strip('_')
+
+def pool_filter_fields(columns: List[str]) -> Dict[str, str]:
+    """Field name -> column of every filterable column, aliases first"""
+    fields = {filter_identifier(str(column)): column for column in columns}
+    fields.update((alias, column) for alias, column in POOL_FILTER_ALIASES.items() if column in columns)
+    return fields
+
+def filter_mask(values) -> np.ndarray:
+    """Truth value of each row; NaN and missing values are false"""
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values
+    if values.dtype.kind in 'iuf':
+        return (values != 0) & ~np.isnan(values.astype(float))
+    return np.array([bool(value) and not pd.isna(value) for value in values], dtype=bool)
+
+@functools.lru_cache(maxsize=256)
+def compile_pool_filter(expression: str) -> Tuple[Callable[[Dict[str, np.ndarray]], object], Tuple[str, ...]]:
+    """
+    Compile a screen such as `spread > 3 and utilization < 90 and is_pt` into a
+    function of the field arrays, plus the field names it reads. Supports and/or/not,
+    (chained) comparisons, in / not in over literal lists, + - * / and parentheses;
+    anything else is a ValueError, so no user text is ever executed.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid screen syntax: {e.msg}") from None
+    fields = []
+
+    def build(node):
+        if isinstance(node, ast.BoolOp):
+            parts = [build(value) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return lambda env: functools.reduce(combine, (filter_mask(part(env)) for part in parts))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = build(node.operand)
+            return lambda env: ~filter_mask(operand(env))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operand = build(node.operand)
+            return lambda env: np.negative(operand(env))
+        if isinstance(node, ast.BinOp) and type(node.op) in FILTER_ARITHMETIC:
+            left, right, op = build(node.left), build(node.right), FILTER_ARITHMETIC[type(node.op)]
+            return lambda env: op(left(env), right(env))
+        if isinstance(node, ast.Compare):
+            operands = [build(node.left)] + [build(comparator) for comparator in node.comparators]
+            ops = [FILTER_COMPARISONS[type(op)] for op in node.ops if type(op) in FILTER_COMPARISONS]
+            if len(ops) != len(node.ops):
+                raise ValueError("Unsupported comparison in screen")
+
+            def compare(env):
+                values = [operand(env) for operand in operands]
+                return functools.reduce(np.logical_and, (op(values[i], values[i + 1]) for i, op in enumerate(ops)))
+            return compare
+        if isinstance(node, (ast.Tuple, ast.List)):
+            items = [build(item) for item in node.elts]
+            return lambda env: [item(env) for item in items]
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool)):
+            value = node.value
+            return lambda env: value
+        if isinstance(node, ast.Name):
+            name = node.id
+            fields.append(name)
+            return lambda env: env[name]
+        raise ValueError(f"Unsupported expression in screen: {ast.get_source_segment(expression.strip(), node) or type(node).__name__}")
+
+    return build(tree.body), tuple(dict.fromkeys(fields))
+
+def evaluate_pool_filter(pools_df: pd.DataFrame, expression: str) -> np.ndarray:
+    """Boolean row mask of a screen over the pools table; ValueError for unknown fields"""
+    predicate, names = compile_pool_filter(expression)
+    fields = pool_filter_fields(list(pools_df.columns))
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ValueError(f"Unknown field(s) in screen: {', '.join(unknown)}")
+    env = {}
+    for name in names:
+        column = pools_df[fields[name]]
+        env[name] = (column.to_numpy(dtype=float, na_value=np.nan) if pd.api.types.is_numeric_dtype(column)
+                     and not pd.api.types.is_bool_dtype(column) else column.to_numpy())
+    try:
+        return np.broadcast_to(filter_mask(predicate(env)), (len(pools_df),))
+    except TypeError as e:
+        raise ValueError(f"Mismatched types in screen: {e}") from None
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def get_screen_mask(_pools_df: pd.DataFrame, data_version: str, expression: str) -> np.ndarray:
+    """Row mask of a screen, cached per (expression, data version)"""
+    return evaluate_pool_filter(_pools_df, expression)
+
+def load_saved_screens() -> Dict[str, str]:
+    """Saved screens (name -> expression); an unreadable file is treated as empty"""
+    try:
+        with open(SCREENS_FILE, 'r', encoding='utf-8') as f:
+            screens = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {str(name): str(expression) for name, expression in screens.items()} if isinstance(screens, dict) else {}
+
+def store_saved_screens(screens: Dict[str, str]) -> bool:
+    """Write the saved screens atomically; False if the file cannot be written"""
+    tmp_path = f"{SCREENS_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(screens, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, SCREENS_FILE)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        return False
+    return True
+
+# ======================================================
+# Visualization Functions
+# ======================================================
+
+@view_cache("charts")
+def create_pool_performance_chart(_sheets: Dict[str, pd.DataFrame], data_version: str, pool_key: str) -> go.Figure:
+    """
+    Creates a single-axis line chart with a custom hybrid linear-log scale,
+    displaying only the two APY lines.
+    """
+    
+    # Define the threshold for switching scales
+    threshold = 100
+    log_offset = threshold / np.log10(threshold)
+    
+    def hybrid_scale(y):
+        """Maps a value to the hybrid linear-log scale."""
+        return y if y is not None and y <= threshold else np.log10(y) * log_offset if y is not None and y > 0 else None
+
+    # Initialize the figure with a single y-axis
+    fig = go.Figure()
+
+    # Get market data
+    if 'morpho_markets' not in _sheets:
+        return fig
+
+    markets_df = _sheets['morpho_markets']
+    market_data = markets_df[markets_df['uniqueKey'] == pool_key]
+
+    if market_data.empty:
+        return fig
+
+    market = market_data.iloc[0]
+    collateral_symbol = market.get('collateralAsset.symbol', 'Unknown')
+    loan_symbol = market.get('loanAsset.symbol', 'Unknown')
+
+    # Parse historical Morpho and Pendle APY data
+    historical_df = parse_historical_apy_data(market.get('historicalState.dailyNetBorrowApy', ''))
+    pendle_df = pd.DataFrame()
+    if is_pt_token(collateral_symbol):
+        pendle_df = get_pendle_yield_data(_sheets, pool_key)
+        
+    # Plot the main APY lines
+    if not historical_df.empty:
+        fig.add_trace(
+            go.Scatter(
+                x=historical_df['date'],
+                y=historical_df['apy'].apply(hybrid_scale),
+                name='Morpho borrow rate',
+                line=dict(color='#00D2FF', width=2)
+            )
+        )
+    if not pendle_df.empty:
+        fig.add_trace(
+            go.Scatter(
+                x=pendle_df['date'],
+                y=pendle_df['apy'].apply(hybrid_scale),
+                name='Pendle APY',
+                line=dict(color='#FF6B6B', width=2, dash='dash')
+            )
+        )
+        
+    # Current APY as a reference line with transformed data
+    current_apy = safe_float(market.get('state.netBorrowApy', 0)) * 100
+    fig.add_hline(
+        y=hybrid_scale(current_apy),
+        line_dash="dot",
+        line_color="red",
+        annotation_text=f"Current Morpho: {current_apy:.2f}%"
+    )
+
+    # Create custom axis labels for the hybrid scale
+    tick_values = [0, 25, 50, 75, 100, 200, 500, 1000, 2000, 5000]
+    tick_labels = [f"{v}%" for v in tick_values]
+    transformed_tick_values = [hybrid_scale(v) for v in tick_values]
+    
+    # Update layout and set titles
+    fig.update_layout(
+        title_text=f"Historical APY Performance: {collateral_symbol}/{loan_symbol}",
+        xaxis_title="Date",
+        yaxis_title="APY (%) (Hybrid Linear-Log Scale)",
+        hovermode='x unified',
+        height=500,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+
+    # Apply the custom axis labels
+    fig.update_yaxes(
+        tickmode='array',
+        tickvals=transformed_tick_values,
+        ticktext=tick_labels
+    )
+
+    # Add range selector
+    fig.update_layout(
+        xaxis=dict(
+            rangeselector=dict(
+                buttons=list([
+                    dict(count=7, label="7d", step="day", stepmode="backward"),
+                    dict(count=30, label="30d", step="day", stepmode="backward"),
+                    dict(count=90, label="3m", step="day", stepmode="backward"),
+                    dict(step="all")
+                ])
+            ),
+            rangeslider=dict(visible=True),
+            type="date"
+        )
+    )
+
+    return fig
+
+@view_cache("charts")
+def create_sankey_diagram(_tx_df: pd.DataFrame, data_version: str, pool_info: Dict,
+                          user_address: str = None) -> Optional[go.Figure]:
+    """Create Sankey flow diagram for transactions based on the simple.py logic."""
+    if _tx_df.empty:
+        return None
+
+    # Get unique borrowers (or a single user if specified)
+    if user_address:
+        borrowers = [user_address]
+        title = f"Transaction Flow - {user_address[:10]}..."
+    else:
+        # Limit to top 10 unique borrowers for readability
+        borrowers = sorted(_tx_df['userAddress'].dropna().unique().tolist())[:10]
+        title = "Transaction Flow - Top Borrowers"
+
+    loan = pool_info.get('Borrow Asset', 'Loan')
+    coll = pool_info.get('Collateral Asset', 'Collateral')
+
+    # Use shortened addresses for node labels to keep the chart clean
+    borrower_labels = {b: f"{b[:6]}...{b[-4:]}" for b in borrowers}
+
+    # Define nodes: Borrowers first, then assets, to group them on one side
+    nodes = list(borrower_labels.values()) + [f"Loan: {loan}", f"Collateral: {coll}"]
+    if pool_info.get('Is PT Market'):
+        nodes.append("Pendle PT")
+
+    idx = {n: i for i, n in enumerate(nodes)}
+
+    # Build links (source, target, value)
+    links_s, links_t, links_v = [], [], []
+
+    for b in borrowers:
+        sub = _tx_df[_tx_df['userAddress'] == b]
         borrower_label = borrower_labels[b]
 
         # 1. Borrow Flow: Borrower -> Loan Asset (Represents debt obligation)
@@ -1027,61 +2788,49 @@ def create_sankey_diagram(tx_df: pd.DataFrame, pool_info: Dict, user_address: st
     fig.update_layout(title_text=title, height=420)
     return fig
 
-def create_transaction_frequency_chart(tx_df: pd.DataFrame) -> go.Figure:
-    """Create transaction frequency chart"""
-    if tx_df.empty:
+@view_cache("charts")
+def create_transaction_frequency_chart(_activity: pd.DataFrame, data_version: str, pool_key: str,
+                                       user_address: str = None, resolution: str = 'Day') -> go.Figure:
+    """Create transaction frequency chart from activity cube buckets"""
+    if _activity.empty:
         return go.Figure()
 
-    # Group by date and count transactions
-    tx_df['Date'] = tx_df['Timestamp'].dt.date
-    freq_data = tx_df.groupby('Date').size().reset_index(name='Transaction Count')
-
-    fig = px.bar(freq_data, x='Date', y='Transaction Count',
-                title="Transaction Frequency Over Time")
-    fig.update_layout(height=300)
+    fig = px.bar(_activity, x='Bucket', y='Transactions', color='Category',
+                 title=f"Transaction Frequency Over Time (per {resolution.lower()})")
+    fig.update_layout(height=300, xaxis_title='Date', yaxis_title='Transaction Count')
     return fig
 
-def create_cumulative_net_position_chart(tx_df: pd.DataFrame) -> go.Figure:
-    """Create cumulative net borrow position chart"""
-    if tx_df.empty:
+@view_cache("charts")
+def create_cumulative_net_position_chart(_activity: pd.DataFrame, data_version: str, pool_key: str,
+                                         user_address: str = None, resolution: str = 'Day') -> go.Figure:
+    """Create cumulative net borrow position chart from activity cube buckets"""
+    if _activity.empty:
         return go.Figure()
 
-    # Calculate cumulative net position
-    tx_df_sorted = tx_df.sort_values('Timestamp')
-    tx_df_sorted['Net Amount'] = 0
-
-    for idx, row in tx_df_sorted.iterrows():
-        tx_type = str(row['type']).lower()
-        amount = row['USD Value']
-
-        if 'borrow' in tx_type:
-            tx_df_sorted.loc[idx, 'Net Amount'] = amount
-        elif 'repay' in tx_type:
-            tx_df_sorted.loc[idx, 'Net Amount'] = -amount
-        elif 'supply' in tx_type:
-            tx_df_sorted.loc[idx, 'Net Amount'] = amount
-        elif 'withdraw' in tx_type:
-            tx_df_sorted.loc[idx, 'Net Amount'] = -amount
-
-    tx_df_sorted['Cumulative Position'] = tx_df_sorted['Net Amount'].cumsum()
+    # Borrows and supplies add to the position, repays and withdrawals reduce it
+    signs = ACTIVITY_NET_SIGN[pd.Categorical(_activity['Category'], categories=ACTIVITY_CATEGORIES).codes]
+    net_amount = (_activity['USD Value'] * signs).groupby(_activity['Bucket']).sum()
+    positions = net_amount.cumsum().rename('Cumulative Position').reset_index()
 
-    fig = px.line(tx_df_sorted, x='Timestamp', y='Cumulative Position',
+    fig = px.line(positions, x='Bucket', y='Cumulative Position',
                  title="Cumulative Net Position Over Time")
-    fig.update_layout(height=300)
+    fig.update_layout(height=300, xaxis_title='Timestamp')
     return fig
 
-def create_pnl_comparison_chart(borrowers_df: pd.DataFrame, sheets: Dict[str, pd.DataFrame], unique_key: str, pool_info: Dict) -> go.Figure:
+@view_cache("charts")
+def create_pnl_comparison_chart(_borrowers_df: pd.DataFrame, _sheets: Dict[str, pd.DataFrame], data_version: str,
+                                unique_key: str, pool_info: Dict) -> go.Figure:
     """Create clear PnL comparison chart"""
-    if borrowers_df.empty:
+    if _borrowers_df.empty:
         return go.Figure()
 
     # Calculate estimated PnL for each borrower
     estimated_pnls = []
-    for _, borrower in borrowers_df.iterrows():
-        est_pnl = calculate_borrower_pnl(sheets, unique_key, borrower['userAddress'], pool_info)
+    for _, borrower in _borrowers_df.iterrows():
+        est_pnl = calculate_borrower_pnl(_sheets, data_version, unique_key, borrower['userAddress'], pool_info)
         estimated_pnls.append(est_pnl)
 
-    borrowers_df = borrowers_df.copy()
+    borrowers_df = _borrowers_df.copy()
     borrowers_df['Estimated PnL'] = estimated_pnls
 
     # Create comparison chart
@@ -1113,564 +2862,1594 @@ def create_pnl_comparison_chart(borrowers_df: pd.DataFrame, sheets: Dict[str, pd
 
     return fig
 
+@view_cache("charts")
+def create_liquidation_heatmap(_stress_df: pd.DataFrame, data_version: str, shocks: Tuple[float, ...],
+                               pt_only: bool, top_n: int = 25) -> go.Figure:
+    """Create market × price-shock heatmap of liquidatable debt"""
+    if _stress_df.empty:
+        return go.Figure()
+
+    grid = _stress_df.pivot_table(index=['Pool', 'Unique Key'], columns='Price Shock (%)',
+                                  values='Liquidatable USD', aggfunc='sum')
+    grid = grid.loc[grid.max(axis=1) > 0]
+    if grid.empty:
+        return go.Figure()
+
+    # Most exposed markets first, deepest shocks on the right
+    grid = grid.loc[grid.max(axis=1).sort_values(ascending=False).index[:top_n]]
+    grid = grid[sorted(grid.columns, reverse=True)]
+
+    fig = go.Figure(data=go.Heatmap(
+        z=grid.to_numpy() / 1_000_000,
+        x=[f"{c:.0f}%" for c in grid.columns],
+        y=[f"{pool} ({key[:8]})" for pool, key in grid.index],
+        colorscale='Reds',
+        colorbar=dict(title="$M"),
+        hovertemplate="%{y}<br>Shock %{x}<br>Liquidatable: $%{z:.2f}M<extra></extra>"
+    ))
+    fig.update_layout(
+        title="Liquidatable Debt by Market and Collateral Price Shock",
+        xaxis_title="Collateral Price Shock",
+        yaxis=dict(autorange='reversed'),
+        height=max(400, 24 * len(grid) + 150)
+    )
+    return fig
+
+def create_size_aware_spread_chart(curves: pd.DataFrame) -> go.Figure:
+    """Create loop spread vs borrow size lines from the simulated post-trade borrow APY"""
+    curves = curves.dropna(subset=['Size-Aware Spread (%)'])
+    if curves.empty:
+        return go.Figure()
+
+    fig = px.line(curves, x='Borrow Size ($M)', y='Size-Aware Spread (%)', color='Pool',
+                  hover_data={'Post-Trade Borrow APY (%)': ':.2f', 'Size-Aware Spread (%)': ':.2f'},
+                  title="Loop Spread After Borrowing")
+    fig.add_hline(y=0, line_dash="dash", line_color="gray")
+    fig.update_layout(height=400, xaxis_title='Borrow Size ($M)', yaxis_title='Spread (%)')
+    return fig
+
 # ======================================================
-# Main Application
+# Disk Cache
 # ======================================================
 
-def main():
-    st.set_page_config(
-        page_title=APP_TITLE,
-        page_icon="🔵",
-        layout="wide"
-    )
+# Fingerprint of this module's source, so cached builds are dropped when the code changes.
+# Hashed once at import: the source a running process executes does not change under it
+CODE_VERSION = file_digest(os.path.abspath(__file__))[:16]
 
-    st.title(APP_TITLE)
-    st.markdown(APP_SUBTITLE)
+def disk_cache_key(name: str, data_fingerprint: str) -> str:
+    """Content address of a cached artifact: its name, the data it was built from and the code that built it"""
+    address = hashlib.sha256(f"{name}\0{data_fingerprint}\0{CODE_VERSION}".encode()).hexdigest()
+    return f"{name}-{address[:32]}"
 
-    # Load data
-    with st.spinner("Loading data from CSV file..."):
-        sheets = load_csv_data()
+def disk_cache_path(key: str, suffix: str = '.pkl') -> str:
+    """File holding the cached artifact for a key"""
+    return os.path.join(DISK_CACHE_DIR, f"{key}{suffix}")
 
-    if not sheets:
-        st.error("Failed to load data. Please ensure morpho_pendle.csv exists and is accessible.")
-        return
+def disk_cache_load(key: str) -> Optional[object]:
+    """Cached artifact for a key, or None on a miss"""
+    path = disk_cache_path(key)
+    try:
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
 
-    # Build dataframes
-    pools_df = build_pools_df(sheets)
-    curators_df = build_curators_df(sheets)
-    vaults_df = build_vaults_df(sheets)
+    # Bump the mtime so LRU eviction sees the entry as recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return value
+
+def disk_cache_store(key: str, value: object) -> Optional[str]:
+    """Write an artifact atomically and evict old entries; a read-only cache dir is not an error"""
+    path = disk_cache_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        return None
 
-    # Initialize routing if not exists
-    if 'route_view' not in st.session_state:
-        st.session_state.route_view = 'list'
+    evict_disk_cache()
+    return path
 
-    # Routing
-    route = get_route()
-    view = route.get('view', ['list'])[0] if route.get('view') else 'list'
+def evict_disk_cache(max_bytes: int = DISK_CACHE_MAX_BYTES) -> List[str]:
+    """Delete least recently used entries until the cache fits its size budget"""
+    entries = []
+    now = time.time()
+    try:
+        with os.scandir(DISK_CACHE_DIR) as scan:
+            for entry in scan:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith(('.pkl', '.arrow')):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                elif entry.name.endswith('.tmp') and now - stat.st_mtime > 3600:
+                    # Left behind by a writer that died mid-write
+                    with contextlib.suppress(OSError):
+                        os.remove(entry.path)
+    except OSError:
+        return []
+
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    evicted = []
+    # The newest entry is always kept, even if it alone exceeds the budget
+    for _, size, path in entries[:-1]:
+        if total <= max_bytes:
+            break
+        # The entry's .lock file stays: another process may hold it or be waiting on it, and
+        # unlinking it would let a later process lock a fresh file and build concurrently
+        with contextlib.suppress(OSError):
+            os.remove(path)
+        total -= size
+        evicted.append(path)
+    return evicted
+
+@contextlib.contextmanager
+def disk_cache_lock(key: str):
+    """Exclusive lock on a cache key across every process on the host"""
+    if fcntl is None:
+        yield
+        return
+    try:
+        os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+        lock_file = open(os.path.join(DISK_CACHE_DIR, f"{key}.lock"), 'w')
+    except OSError:
+        yield
+        return
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
-    # Sidebar filters
-    with st.sidebar:
-        st.header("🎛️ Filters")
+# ======================================================
+# Shared Data Plane
+# ======================================================
 
-        if view == 'list':
-            # Pool filters
-            st.subheader("Pool Filters")
+# Sheets are published as uncompressed Arrow IPC files in the disk cache. Every server
+# process maps the same file, so the page cache holds one copy however many workers run.
+SHOW_MEMORY_REPORT = os.environ.get('MORPHO_SHOW_MEMORY') == '1'
 
-            # Asset filters
-            all_collateral = ['All'] + sorted(pools_df['Collateral Asset'].unique().tolist()) if not pools_df.empty else ['All']
-            all_borrow = ['All'] + sorted(pools_df['Borrow Asset'].unique().tolist()) if not pools_df.empty else ['All']
+def sheet_cache_key(sheet_name: str, data_fingerprint: str) -> str:
+    """Disk cache key of one published sheet"""
+    return disk_cache_key(f"sheet_{sheet_name}", data_fingerprint)
 
-            filter_collateral = st.selectbox("Collateral Asset", all_collateral)
-            filter_borrow = st.selectbox("Borrow Asset", all_borrow)
+def write_arrow_file(path: str, table: 'pa.Table') -> bool:
+    """Write a table to an uncompressed Arrow file, moved into place once complete"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+        with pa.OSFile(tmp_path, 'wb') as sink, pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        return True
+    except (OSError, pa.ArrowException):
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        return False
 
-            # Numeric filters
-            supply_filter = st.slider("Min Supply Assets ($M)", 0.0, 100.0, 0.0, 0.1)
-            min_available = st.slider("Min Available Borrow ($M)", 0.0, 50.0, 0.0, 0.1)
-            only_pt = st.checkbox("🎯 Only PT Markets", value=False)
-            min_spread = st.slider("Min APY Spread (%)", -50.0, 50.0, -50.0, 0.5)
+def publish_sheets(sheets: Dict[str, pd.DataFrame], data_fingerprint: str) -> List[str]:
+    """Write each sheet to its Arrow file; the names of the sheets now in the store
 
-    # Main content based on view
-    if view == 'list':
-        # Main tabs
-        tab1, tab2, tab3 = st.tabs(["📊 Pools", "🧑‍🏫 Curators", "🏦 Vaults"])
+    Sheets of text are stored as strings; the ones with nested values (decoded from the
+    JSON input) cannot be represented and are left out.
+    """
+    published = []
+    for name, df in sheets.items():
+        path = disk_cache_path(sheet_cache_key(name, data_fingerprint), '.arrow')
+        if not os.path.exists(path):
+            try:
+                # large_string is pandas' native Arrow string layout, so attaching needs no cast
+                schema = pa.schema([(str(column), pa.large_string()) for column in df.columns])
+                table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            except (ValueError, TypeError, pa.ArrowException):
+                continue
+            if not write_arrow_file(path, table):
+                continue
+        published.append(name)
+    return published
+
+class SheetStream:
+    """Arrow file of one sheet written incrementally, one record batch per chunk of parsed rows"""
+
+    def __init__(self, path: str, headers: List[str]):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.schema = pa.schema([(str(column), pa.large_string()) for column in headers])
+        self.columns = [[] for _ in headers]
+        self.chunk_bytes = 0
+        self.rows = 0
+        self.failed = False
+        self.sink = pa.OSFile(self.tmp_path, 'wb')
+        self.writer = pa_ipc.new_file(self.sink, self.schema)
+
+    @classmethod
+    def open(cls, key: str, headers: List[str]) -> Optional['SheetStream']:
+        """Stream for a sheet's Arrow file, or None if the store is not writable"""
+        try:
+            os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+            return cls(disk_cache_path(key, '.arrow'), headers)
+        except (OSError, pa.ArrowException):
+            return None
 
-        # POOLS TAB
-        with tab1:
-            if pools_df.empty:
-                st.warning("No pool data available.")
-            else:
-                # Apply filters
-                filtered_pools = pools_df.copy()
-
-                if filter_collateral != 'All':
-                    filtered_pools = filtered_pools[filtered_pools['Collateral Asset'] == filter_collateral]
-                if filter_borrow != 'All':
-                    filtered_pools = filtered_pools[filtered_pools['Borrow Asset'] == filter_borrow]
-                if supply_filter > 0:
-                    filtered_pools = filtered_pools[filtered_pools['Supply Assets ($M)'] >= supply_filter]
-                if min_available > 0:
-                    filtered_pools = filtered_pools[filtered_pools['Available Borrow ($M)'] >= min_available]
-                if only_pt:
-                    filtered_pools = filtered_pools[filtered_pools['Is PT Market'] == True]
-                if min_spread > -50:
-                    filtered_pools = filtered_pools[filtered_pools['Net APY Spread (%)'].fillna(-999) >= min_spread]
-
-                # Sort by descending supply assets
-                filtered_pools = filtered_pools.sort_values('Supply Assets ($M)', ascending=False)
-
-                # Display table
-                st.subheader(f"📋 Pool Details ({len(filtered_pools)} pools)")
-
-                if filtered_pools.empty:
-                    st.info("No pools match the current filters.")
-                else:
-                    # Format display columns
-                    display_cols = ['Pool', 'Supply Assets ($M)', 'Available Borrow ($M)',
-                                  'Morpho Borrow APY (%)', 'PT/External APY (%)', 'Net APY Spread (%)',
-                                  'Status', 'Utilization (%)', 'LLTV (%)']
-
-                    # Create dataframe with color styling based on status
-                    def style_rows(df):
-                        def color_status(row):
-                            if '🟢' in str(row['Status']):
-                                return ['background-color: #d4edda'] * len(row)  # Light green
-                            elif '🟡' in str(row['Status']):
-                                return ['background-color: #fff3cd'] * len(row)  # Light yellow
-                            elif '🔴' in str(row['Status']):
-                                return ['background-color: #f8d7da'] * len(row)  # Light red
-                            else:
-                                return [''] * len(row)
-                        return df.style.apply(color_status, axis=1)
-
-                    # Interactive table
-                    selected = st.dataframe(
-                        filtered_pools[display_cols],
-                        use_container_width=True,
-                        hide_index=True,
-                        on_select="rerun",
-                        selection_mode="single-row"
-                    )
+    def append(self, row: List[str], nbytes: int):
+        if self.failed:
+            return
+        for column, value in zip(self.columns, row):
+            column.append(value)
+        self.rows += 1
+        self.chunk_bytes += nbytes
+        if self.chunk_bytes >= INGEST_CHUNK_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self.failed or not self.columns or not self.columns[0]:
+            return
+        try:
+            # Coerce the chunk to the store's column types before the rows are dropped
+            arrays = [pa.array(column, type=field.type) for column, field in zip(self.columns, self.schema)]
+            self.writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+        except (OSError, pa.ArrowException):
+            self.failed = True
+        self.columns = [[] for _ in self.columns]
+        self.chunk_bytes = 0
+
+    def close(self) -> bool:
+        """Finish the file and move it into place; False (and no file) if the sheet had no rows"""
+        self.flush()
+        try:
+            self.writer.close()
+            self.sink.close()
+            if self.rows and not self.failed:
+                os.replace(self.tmp_path, self.path)
+                return True
+        except (OSError, pa.ArrowException):
+            self.failed = True
+        with contextlib.suppress(OSError):
+            os.remove(self.tmp_path)
+        if self.failed:
+            # The rows are gone, so a partial sheet must not be passed off as the whole one
+            raise OSError(f"Could not write '{self.path}'")
+        return False
 
-                    # Handle pool selection
-                    if hasattr(selected, 'selection') and selected.selection and selected.selection.rows:
-                        selected_idx = selected.selection.rows[0]
-                        selected_pool = filtered_pools.iloc[selected_idx]
-                        set_route(view='pool', key=selected_pool['Unique Key'])
-                        st.rerun()
-
-        # CURATORS TAB
-        with tab2:
-            if curators_df.empty:
-                st.warning("No curator data available.")
-            else:
-                st.subheader("🧑‍🏫 Curators")
-                
-                selected_curator = st.dataframe(
-                    curators_df,
-                    column_order=['Curator', 'Total AUM', 'Vault Count'],
-                    column_config={
-                        "Total AUM": st.column_config.NumberColumn(
-                            "Total AUM", format="$%d"
-                        ),
-                        "Address": None,
-                        "Managed Vaults": None,
-                        "Morpho URL": None,
-                        "twitter": None,
-                        "main": None,
-                    },
-                    use_container_width=True,
-                    hide_index=True,
-                    on_select="rerun",
-                    selection_mode="single-row"
-                )
-
-                # Handle curator selection
-                if hasattr(selected_curator, 'selection') and selected_curator.selection and selected_curator.selection.rows:
-                    selected_idx = selected_curator.selection.rows[0]
-                    curator_info = curators_df.iloc[selected_idx]
-                    set_route(view='curator', curator=curator_info['Curator'])
-                    st.rerun()
+def attach_sheets(sheet_names: List[str], data_fingerprint: str) -> Optional[Dict[str, pd.DataFrame]]:
+    """Map published sheets zero-copy, text as Arrow-backed string columns; None if any file is gone"""
+    string_dtype = pd.StringDtype('pyarrow')
+    sheets = {}
+    for name in sheet_names:
+        path = disk_cache_path(sheet_cache_key(name, data_fingerprint), '.arrow')
+        try:
+            table = pa_ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        except (OSError, pa.ArrowException):
+            return None
+        sheets[name] = table.to_pandas(types_mapper={pa.large_string(): string_dtype}.get)
+        with contextlib.suppress(OSError):
+            os.utime(path)
+    return sheets
+
+def store_app_data(key: str, data_fingerprint: str, data: Dict[str, object]):
+    """Persist app data: sheets as shared Arrow files when possible, the rest and the derived frames pickled"""
+    bundle = dict(data)
+    published = publish_sheets(data['sheets'], data_fingerprint) if HAS_PYARROW else []
+    if published:
+        bundle['sheets'] = {name: df for name, df in data['sheets'].items() if name not in published}
+        bundle['sheet_order'] = list(data['sheets'])
+        bundle['shared_sheets'] = published
+        # Swap this process's private copy for the mapped one the other workers use
+        shared = attach_sheets(published, data_fingerprint)
+        if shared is not None:
+            data['sheets'] = {name: shared.get(name, df) for name, df in data['sheets'].items()}
+            data['shared_sheets'] = published
+    disk_cache_store(key, bundle)
+
+def attach_app_data(data: Dict[str, object], data_fingerprint: str) -> bool:
+    """Attach the shared sheets of a cached bundle; False if they have to be rebuilt"""
+    if 'shared_sheets' not in data:
+        return 'sheets' in data
+    shared = attach_sheets(data['shared_sheets'], data_fingerprint) if HAS_PYARROW else None
+    if shared is None:
+        return False
+    private = data.get('sheets', {})
+    data['sheets'] = {name: shared[name] if name in shared else private[name]
+                      for name in data.get('sheet_order', data['shared_sheets'])}
+    return True
+
+def read_process_memory() -> Dict[str, int]:
+    """Memory totals of this process from /proc/self/smaps_rollup (Linux), in bytes"""
+    totals = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    totals[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    except OSError:
+        pass
+    return totals
+
+def read_mapped_file_memory(directory: str) -> Dict[str, int]:
+    """Resident and proportional bytes of this process's mappings of files under a directory"""
+    directory = os.path.abspath(directory)
+    totals = {'Rss': 0, 'Pss': 0}
+    in_directory = False
+    try:
+        with open('/proc/self/smaps') as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                if not parts[0].endswith(':'):
+                    # Mapping header: address range, perms, offset, dev, inode, [path]
+                    in_directory = len(parts) >= 6 and parts[5].startswith(directory)
+                elif in_directory and parts[0][:-1] in totals:
+                    totals[parts[0][:-1]] += int(parts[1]) * 1024
+    except OSError:
+        pass
+    return totals
+
+def build_memory_report(data: Dict[str, object]) -> Tuple[Dict[str, float], pd.DataFrame]:
+    """Per-process memory accounting: process totals (MB) and the size and storage of every frame"""
+    process = read_process_memory()
+    mapped = read_mapped_file_memory(DISK_CACHE_DIR)
+    summary = {
+        'PID': os.getpid(),
+        'RSS (MB)': process.get('Rss', 0) / 2**20,
+        'PSS (MB)': process.get('Pss', 0) / 2**20,
+        'Private (MB)': (process.get('Private_Clean', 0) + process.get('Private_Dirty', 0)) / 2**20,
+        'Shared Sheets RSS (MB)': mapped['Rss'] / 2**20,
+        'Shared Sheets PSS (MB)': mapped['Pss'] / 2**20,
+    }
 
-        # VAULTS TAB
-        with tab3:
-            if vaults_df.empty:
-                st.warning("No vault data available.")
-            else:
-                st.subheader("🏦 All Vaults")
-
-                selected_vault = st.dataframe(
-                    vaults_df,
-                    column_order=['Vault', 'Symbol', 'TVL', 'APY', 'Fee', 'Asset'],
-                    column_config={
-                        "TVL": st.column_config.NumberColumn("TVL", format="$%d"),
-                        "APY": st.column_config.NumberColumn("APY (%)", format="%.2f"),
-                        "Fee": st.column_config.NumberColumn("Fee (%)", format="%.2f"),
-                        "Address": None,
-                        "Curator": None,
-                        "Curator Name": None,
-                        "Curator Names List": None,
-                        "Whitelisted": None,
-                    },
-                    use_container_width=True,
-                    hide_index=True,
-                    on_select="rerun",
-                    selection_mode="single-row"
-                )
-
-                # Handle vault selection
-                if hasattr(selected_vault, 'selection') and selected_vault.selection and selected_vault.selection.rows:
-                    selected_idx = selected_vault.selection.rows[0]
-                    vault_info = vaults_df.iloc[selected_idx]
-                    set_route(view='vault', address=vault_info['Address'])
-                    st.rerun()
+    shared = set(data.get('shared_sheets', ()))
+    frames = [(f"sheet: {name}", df, 'shared mmap' if name in shared else 'private')
+              for name, df in data.get('sheets', {}).items()]
+    frames += [(name, value, 'private') for name, value in data.items() if isinstance(value, pd.DataFrame)]
+    report = pd.DataFrame({
+        'Frame': [name for name, _, _ in frames],
+        'Rows': [len(df) for _, df, _ in frames],
+        'Size (MB)': [df.memory_usage(deep=True).sum() / 2**20 for _, df, _ in frames],
+        'Storage': [storage for _, _, storage in frames],
+    })
+    return summary, report
 
-    elif view == 'pool':
-        # Pool detail page
-        pool_key = route.get('key', [None])[0]
-        if not pool_key:
-            set_route(view='list')
-            st.rerun()
-            return
+# ======================================================
+# Build Scheduler
+# ======================================================
 
-        if st.button("← Back to Pools"):
-            set_route(view='list')
-            st.rerun()
+# Module the build functions are imported from in child processes. Under Streamlit the
+# script runs as __main__, which a fresh process cannot import the functions from
+APP_MODULE = os.path.splitext(os.path.basename(os.path.abspath(__file__)))[0]
 
-        # Find the pool
-        pool_info = pools_df[pools_df['Unique Key'] == pool_key]
-        if pool_info.empty:
-            st.error("Pool not found")
-            return
+def fork_context():
+    """
+    Multiprocessing context for forked build stages. Children are forked from a
+    single-threaded forkserver with this module preloaded, never from the
+    multi-threaded server process, whose locks other threads may hold; spawn
+    where there is no forkserver.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([APP_MODULE])
+        return context
+    return multiprocessing.get_context('spawn')
+
+def importable_build(build: Callable) -> Callable:
+    """The same build function looked up in APP_MODULE, so it pickles by a name child processes can import"""
+    module = sys.modules.get(APP_MODULE) or importlib.import_module(APP_MODULE)
+    return getattr(module, build.__name__)
+
+def input_rows(args: List[object]) -> int:
+    """Rows of the frames a stage is given, directly or as values of a dict"""
+    values = [value for arg in args for value in (arg.values() if isinstance(arg, dict) else [arg])]
+    return sum(len(value) for value in values if isinstance(value, pd.DataFrame))
+
+def send_build_result(sender, build: Callable, args: List[object]):
+    """Child process body: build the stage and send its result back"""
+    sender.send(build(*args))
+
+def start_forked_stage(build: Callable, args: List[object]):
+    """Run a build stage in a child process; None if it could not be started"""
+    context = fork_context()
+    receiver, sender = context.Pipe(duplex=False)
+    try:
+        process = context.Process(target=importable_build(send_build_result),
+                                  args=(sender, importable_build(build), args), daemon=True)
+        process.start()
+    except (OSError, ImportError, AttributeError, pickle.PicklingError):
+        receiver.close()
+        return None
+    finally:
+        sender.close()
+    return process, receiver
 
-        pool_info = pool_info.iloc[0]
-        st.header(f"📊 {pool_info['Pool']}")
+def finish_forked_stage(forked, build: Callable, args: List[object], timeout: float = BUILD_STAGE_TIMEOUT):
+    """
+    Result of a forked stage. If the child fails, or sends nothing within the
+    timeout and is killed, the stage is rebuilt here so its error surfaces.
+    """
+    process, receiver = forked
+    try:
+        if receiver.poll(timeout):
+            return receiver.recv()
+    except EOFError:
+        pass
+    finally:
+        receiver.close()
+        if process.is_alive():
+            process.kill()
+        process.join()
+    return build(*args)
+
+def run_build_graph(stages: Dict[str, Tuple[Callable, Tuple[str, ...], Union[bool, Tuple[str, ...]]]], inputs: Dict[str, object],
+                    max_workers: int = BUILD_WORKERS,
+                    fork_min_rows: int = BUILD_FORK_MIN_ROWS) -> Tuple[Dict[str, object], pd.DataFrame]:
+    """Run build stages as soon as their dependencies are done, independent stages concurrently
+
+    Each stage is `name: (build, dependencies, forked)`; `build` is called with the results
+    of its dependencies (stage or input names) in order. Forked stages are pure-Python work
+    the GIL would serialize: they run in child processes started before any build thread,
+    so they may only depend on inputs. `forked` is False or the keys the stage reads from
+    its dict inputs; only those entries are sent to the child. A stage is only forked if they
+    hold at least fork_min_rows rows, below which starting the child costs more than it
+    saves. Returns every result and a report of each stage's start, duration and whether it
+    is on the critical path.
+    """
+    results = dict(inputs)
+    started: Dict[str, float] = {}
+    finished: Dict[str, float] = {}
+    build_start = time.perf_counter()
+
+    forked = {}
+    for name, (build, dependencies, fork) in stages.items():
+        if fork and max_workers > 1:
+            if not all(dependency in inputs for dependency in dependencies):
+                raise ValueError(f"Forked build stage '{name}' may only depend on inputs")
+            args = [{key: inputs[dependency][key] for key in fork if key in inputs[dependency]}
+                    if isinstance(inputs[dependency], dict) else inputs[dependency]
+                    for dependency in dependencies]
+            if input_rows(args) >= fork_min_rows:
+                started[name] = time.perf_counter()
+                forked[name] = start_forked_stage(build, args)
+
+    def run_stage(name: str):
+        build, dependencies, _ = stages[name]
+        args = [results[dependency] for dependency in dependencies]
+        try:
+            if forked.get(name) is not None:
+                return finish_forked_stage(forked[name], build, args)
+            started[name] = time.perf_counter()
+            return build(*args)
+        finally:
+            finished[name] = time.perf_counter()
+
+    remaining = dict(stages)
+    running: Dict[concurrent.futures.Future, str] = {}
+    # Waiting on a forked child takes a thread but no CPU, so those get threads of their own
+    with concurrent.futures.ThreadPoolExecutor(max(1, max_workers) + len(forked),
+                                               thread_name_prefix='build') as threads:
+        while remaining or running:
+            ready = [name for name, (_, dependencies, _) in remaining.items()
+                     if all(dependency in results for dependency in dependencies)]
+            if not ready and not running:
+                raise ValueError(f"Build stages with unmet dependencies: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+                running[threads.submit(run_stage, name)] = name
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    durations = {name: finished[name] - started[name] for name in stages}
+    path = critical_path(stages, durations)
+    report = pd.DataFrame({
+        'Depends On': [', '.join(d for d in stages[name][1] if d in stages) for name in stages],
+        'Forked': [forked.get(name) is not None for name in stages],
+        'Start (ms)': [(started[name] - build_start) * 1000 for name in stages],
+        'Duration (ms)': [durations[name] * 1000 for name in stages],
+        'Critical Path': [name in path for name in stages],
+    }, index=pd.Index(list(stages), name='Stage'))
+    return results, report.sort_values('Start (ms)')
+
+def critical_path(stages: Dict[str, Tuple[Callable, Tuple[str, ...], Union[bool, Tuple[str, ...]]]],
+                  durations: Dict[str, float]) -> List[str]:
+    """Longest chain of dependent stages by duration, which bounds the build's wall time"""
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+
+    def longest(name: str) -> float:
+        if name not in finish:
+            dependencies = [d for d in stages[name][1] if d in stages]
+            slowest = max(dependencies, key=longest, default=None)
+            previous[name] = slowest
+            finish[name] = durations[name] + (finish[slowest] if slowest else 0.0)
+        return finish[name]
+
+    if not stages:
+        return []
+    name = max(stages, key=longest)
+    path = []
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return path[::-1]
 
-        # Pool metrics (removed Pool Size)
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Morpho Borrow APY", format_percentage(pool_info['Morpho Borrow APY (%)']))
-        with col2:
-            st.metric("PT/External APY", format_percentage(pool_info['PT/External APY (%)']))
-        with col3:
-            spread = pool_info['Net APY Spread (%)']
-            st.metric("Net Spread", format_percentage(spread),
-                     delta=None if pd.isna(spread) else f"{spread:.2f}% opportunity")
-
-        # Additional metrics
-        col4, col5, col6 = st.columns(3)
-        with col4:
-            st.metric("Supply Assets", format_usd(pool_info['Supply Assets ($M)'] * 1_000_000))
-        with col5:
-            st.metric("Available Borrow", format_usd(pool_info['Available Borrow ($M)'] * 1_000_000))
-        with col6:
-            st.metric("Utilization", format_percentage(pool_info['Utilization (%)']))
-
-        # Links
-        link_col1, link_col2 = st.columns(2)
-        with link_col1:
-            if pool_info['Morpho Link']:
-                st.markdown(f"🔗 [View on Morpho]({pool_info['Morpho Link']})")
-        with link_col2:
-            if pool_info['Pendle Link']:
-                st.markdown(f"🔗 [View on Pendle]({pool_info['Pendle Link']})")
-
-        # Historical APY Performance Chart
-        st.subheader("📈 Historical APY Performance")
-        performance_chart = create_pool_performance_chart(sheets, pool_key)
-        st.plotly_chart(performance_chart, use_container_width=True)
-
-        # Show summary statistics if historical data exists
-        if 'morpho_markets' in sheets:
-            markets_df = sheets['morpho_markets']
-            market_data = markets_df[markets_df['uniqueKey'] == pool_key]
-            if not market_data.empty:
-                market = market_data.iloc[0]
-                historical_data_str = market.get('historicalState.dailyNetBorrowApy', '')
-                historical_df = parse_historical_apy_data(historical_data_str)
-
-                if not historical_df.empty:
-                    col1, col2, col3, col4 = st.columns(4)
-                    current_apy = safe_float(market.get('state.netBorrowApy', 0)) * 100
-                    avg_apy = historical_df['apy'].mean()
-                    max_apy = historical_df['apy'].max()
-                    min_apy = historical_df['apy'].min()
+# ======================================================
+# Change Detection
+# ======================================================
 
-                    with col1:
-                        st.metric("Current APY", f"{current_apy:.2f}%")
-                    with col2:
-                        st.metric("Average APY", f"{avg_apy:.2f}%")
-                    with col3:
-                        st.metric("Maximum APY", f"{max_apy:.2f}%")
-                    with col4:
-                        st.metric("Minimum APY", f"{min_apy:.2f}%")
+# Entities compared between data versions: the key columns they are joined on and
+# the metrics whose changes are tracked
+CHANGE_ENTITIES = {
+    'market': (('Unique Key',), ('Net APY Spread (%)', 'Utilization (%)', 'Morpho Borrow APY (%)', 'Supply Assets ($M)')),
+    'vault': (('Address',), ('TVL', 'APY')),
+    'borrower': (('Unique Key', 'userAddress'), ('Health Factor', 'Borrow USD')),
+}
+ALERT_CONDITIONS = ('crosses above', 'crosses below', 'rises by', 'falls by')
+DEFAULT_ALERT_RULES = [
+    {'Entity': 'market', 'Metric': 'Net APY Spread (%)', 'Condition': 'crosses above', 'Threshold': 3.0},
+    {'Entity': 'market', 'Metric': 'Utilization (%)', 'Condition': 'rises by', 'Threshold': 10.0},
+    {'Entity': 'borrower', 'Metric': 'Health Factor', 'Condition': 'crosses below', 'Threshold': 1.1},
+]
+
+def build_change_snapshot(sheets: Dict[str, pd.DataFrame], pools_df: pd.DataFrame,
+                          vaults_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Tracked metrics of every market, vault and top borrower, indexed by their join keys"""
+    def snapshot(frame: pd.DataFrame, entity: str, labels: pd.Series) -> pd.DataFrame:
+        keys, metrics = CHANGE_ENTITIES[entity]
+        if frame.empty or not set(keys).issubset(frame.columns):
+            return pd.DataFrame(columns=['Label', *metrics])
+        result = pd.DataFrame({'Label': labels.astype(str).to_numpy()}, index=pd.MultiIndex.from_frame(
+            frame[list(keys)].astype(str)) if len(keys) > 1 else pd.Index(frame[keys[0]].astype(str), name=keys[0]))
+        for metric in metrics:
+            result[metric] = numeric_column(frame, metric, np.nan)
+        return result[~result.index.duplicated()]
+
+    pool_labels = pools_df.set_index('Unique Key')['Pool'] if not pools_df.empty else pd.Series(dtype=object)
+    pool_labels = pool_labels[~pool_labels.index.duplicated()]
+
+    borrowers = sheets.get('morpho_top_borrowers', pd.DataFrame())
+    if not borrowers.empty:
+        borrowers = pd.DataFrame({
+            'Unique Key': borrowers['marketUniqueKey'].astype(str).to_numpy(),
+            'userAddress': borrowers['userAddress'].astype(str).to_numpy(),
+            'Health Factor': numeric_column(borrowers, 'healthFactor', np.nan),
+            'Borrow USD': numeric_column(borrowers, 'state.borrowAssetsUsd', np.nan),
+        })
+    borrower_labels = (borrowers['Unique Key'].map(pool_labels).fillna('—') + ' · ' + borrowers['userAddress'].str[:10]
+                       if not borrowers.empty else pd.Series(dtype=object))
 
-        # Sub-tabs for detailed analysis
-        pool_tabs = st.tabs(["👥 Top Borrowers", "📈 Transactions", "🕸️ Flow Analysis"])
+    return {
+        'market': snapshot(pools_df, 'market', pools_df.get('Pool', pd.Series(dtype=object))),
+        'vault': snapshot(vaults_df, 'vault', vaults_df.get('Vault', pd.Series(dtype=object))),
+        'borrower': snapshot(borrowers, 'borrower', borrower_labels),
+    }
 
-        # TOP BORROWERS TAB
-        with pool_tabs[0]:
-            borrowers_df = get_top_borrowers(sheets, pool_key)
-            if borrowers_df.empty:
-                st.info("No borrower data available for this pool.")
-            else:
-                st.subheader("🏆 Top 5 Borrowers")
-
-                # Calculate estimated PnL for each borrower
-                estimated_pnls = []
-                for _, borrower in borrowers_df.iterrows():
-                    est_pnl = calculate_borrower_pnl(sheets, pool_key, borrower['userAddress'], pool_info.to_dict())
-                    estimated_pnls.append(est_pnl)
-
-                borrowers_df['Estimated PnL'] = estimated_pnls
-
-                # Format borrowers data for display with Etherscan links
-                display_borrowers = borrowers_df.copy()
-                display_borrowers['Collateral'] = [format_usd(x) for x in display_borrowers['Collateral USD']]
-                display_borrowers['Borrowed'] = [format_usd(x) for x in display_borrowers['Borrow USD']]
-                display_borrowers['Health'] = [f"{x:.2f}" if not pd.isna(x) else "—" for x in display_borrowers['Health Factor']]
-                display_borrowers['Est. PnL'] = [format_usd(x) if not pd.isna(x) else "—" for x in display_borrowers['Estimated PnL']]
-                display_borrowers['Morpho PnL'] = [format_usd(x) if not pd.isna(x) else "—" for x in display_borrowers['Morpho PnL']]
-                display_borrowers['Address'] = [f"{addr[:10]}...{addr[-6:]}" for addr in display_borrowers['userAddress']]
-
-                # Create proper table with headers
-                header_cols = st.columns([2, 1, 1, 1, 1, 1, 1])
-                with header_cols[0]:
-                    st.write("**Address**")
-                with header_cols[1]:
-                    st.write("**Collateral**")
-                with header_cols[2]:
-                    st.write("**Borrowed**")
-                with header_cols[3]:
-                    st.write("**Health Factor**")
-                with header_cols[4]:
-                    st.write("**Est. PnL**")
-                with header_cols[5]:
-                    st.write("**Morpho PnL**")
-                with header_cols[6]:
-                    st.write("**Action**")
-
-                # Create table with etherscan links
-                for idx, row in display_borrowers.iterrows():
-                    cols = st.columns([2, 1, 1, 1, 1, 1, 1])
-                    with cols[0]:
-                        st.write(f"[{row['Address']}](https://etherscan.io/address/{row['userAddress']})")
-                    with cols[1]:
-                        st.write(row['Collateral'])
-                    with cols[2]:
-                        st.write(row['Borrowed'])
-                    with cols[3]:
-                        st.write(row['Health'])
-                    with cols[4]:
-                        st.write(row['Est. PnL'])
-                    with cols[5]:
-                        st.write(row['Morpho PnL'])
-                    with cols[6]:
-                        if st.button("Analyze", key=f"analyze_{pool_key}_{idx}"):
-                            set_route(view='borrower', key=pool_key, addr=row['userAddress'])
-                            st.rerun()
-
-                # PnL comparison chart
-                if len(borrowers_df) > 1:
-                    st.subheader("📊 PnL Comparison")
-                    pnl_chart = create_pnl_comparison_chart(borrowers_df, sheets, pool_key, pool_info.to_dict())
-                    st.plotly_chart(pnl_chart, use_container_width=True)
-
-        # TRANSACTIONS TAB
-        with pool_tabs[1]:
-            tx_df = get_user_transactions(sheets, pool_key)
-            if tx_df.empty:
-                st.info("No transaction data available for this pool.")
-            else:
-                st.subheader("📈 Transaction Analysis")
-
-                # Transaction summary metrics
-                total_volume = tx_df['USD Value'].sum()
-                unique_users = tx_df['userAddress'].nunique()
-                avg_tx_size = tx_df['USD Value'].mean()
-
-                tx_col1, tx_col2, tx_col3 = st.columns(3)
-                with tx_col1:
-                    st.metric("Total Volume", format_usd(total_volume))
-                with tx_col2:
-                    st.metric("Unique Users", unique_users)
-                with tx_col3:
-                    st.metric("Avg Transaction", format_usd(avg_tx_size))
-
-                # Transaction frequency chart
-                freq_chart = create_transaction_frequency_chart(tx_df)
-                st.plotly_chart(freq_chart, use_container_width=True)
-
-                # Cumulative net position chart
-                cumulative_chart = create_cumulative_net_position_chart(tx_df)
-                st.plotly_chart(cumulative_chart, use_container_width=True)
-
-        # FLOW ANALYSIS TAB
-        with pool_tabs[2]:
-            tx_df = get_user_transactions(sheets, pool_key)
-            if tx_df.empty:
-                st.info("No transaction data available for flow analysis.")
-            else:
-                st.subheader("🌊 Transaction Flow Analysis")
+def diff_snapshots(previous: Dict[str, pd.DataFrame], current: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Hash-join each entity's snapshots on its keys and keep the rows that are new,
+    removed or have a changed metric, with previous values and deltas alongside.
+    """
+    changes = {}
+    for entity, (_, metrics) in CHANGE_ENTITIES.items():
+        before, after = previous.get(entity), current.get(entity)
+        if before is None or after is None:
+            continue
+        metrics = [metric for metric in metrics if metric in before.columns and metric in after.columns]
+        joined = after.join(before, how='outer', rsuffix=' prev')
+        joined['Label'] = joined['Label'].fillna(joined['Label prev'])
+
+        new = joined['Label prev'].isna().to_numpy()
+        removed = after.index.get_indexer(joined.index) < 0
+        changed = np.zeros(len(joined), dtype=bool)
+        for metric in metrics:
+            before_values = joined[f"{metric} prev"].to_numpy(dtype=float)
+            after_values = joined[metric].to_numpy(dtype=float)
+            joined[f"{metric} Δ"] = after_values - before_values
+            changed |= ~((before_values == after_values) | (np.isnan(before_values) & np.isnan(after_values)))
+        joined['Status'] = np.select([new, removed, changed], ['new', 'removed', 'changed'], 'unchanged')
+
+        columns = ['Label', 'Status'] + [column for metric in metrics
+                                         for column in (metric, f"{metric} prev", f"{metric} Δ")]
+        changes[entity] = joined.loc[joined['Status'] != 'unchanged', columns]
+    return changes
+
+def evaluate_alert_rules(changes: Dict[str, pd.DataFrame], rules: pd.DataFrame) -> pd.DataFrame:
+    """Entities whose change between versions triggers one of the rules, one row per (rule, entity)"""
+    columns = ['Entity', 'Label', 'Rule', 'Previous', 'Current', 'Change']
+    triggered = []
+    for rule in rules.itertuples(index=False):
+        frame = changes.get(rule.Entity)
+        threshold = pd.to_numeric(rule.Threshold, errors='coerce')
+        if frame is None or f"{rule.Metric} prev" not in frame.columns or pd.isna(threshold):
+            continue
+        before, after = frame[f"{rule.Metric} prev"], frame[rule.Metric]
+        if rule.Condition == 'crosses above':
+            mask = (before <= threshold) & (after > threshold)
+        elif rule.Condition == 'crosses below':
+            mask = (before >= threshold) & (after < threshold)
+        elif rule.Condition == 'rises by':
+            mask = (after - before) >= threshold
+        elif rule.Condition == 'falls by':
+            mask = (before - after) >= threshold
+        else:
+            continue
+        hits = frame[mask.to_numpy()]
+        triggered.append(pd.DataFrame({
+            'Entity': rule.Entity,
+            'Label': hits['Label'].to_numpy(),
+            'Rule': f"{rule.Metric} {rule.Condition} {threshold:g}",
+            'Previous': hits[f"{rule.Metric} prev"].to_numpy(),
+            'Current': hits[rule.Metric].to_numpy(),
+            'Change': hits[f"{rule.Metric} Δ"].to_numpy(),
+        }, columns=columns))
+    return pd.concat(triggered, ignore_index=True) if triggered else pd.DataFrame(columns=columns)
+
+def change_history_path() -> str:
+    """File holding the change history, kept beside the disk cache but outside what eviction scans"""
+    return os.path.join(DISK_CACHE_DIR, 'history', 'change_history.pkl')
+
+def advance_change_history(data_fingerprint: str, data_mtime: int,
+                           snapshot: Dict[str, pd.DataFrame]) -> Optional[Tuple[str, Dict[str, pd.DataFrame]]]:
+    """
+    Record a data version's snapshot as the latest one and return the (fingerprint,
+    snapshot) of the version that was latest before it, or None if there is none.
 
-                # Sankey diagram positioned on the left
-                col1, col2 = st.columns([2, 1])
-                with col1:
-                    sankey_fig = create_sankey_diagram(tx_df, pool_info.to_dict())
-                    if sankey_fig:
-                        st.plotly_chart(sankey_fig, use_container_width=True)
-                    else:
-                        st.info("Not enough transaction data to create flow diagram.")
+    The history is not keyed by code version, so it survives deploys, and a version only
+    replaces the latest one if its data file is newer: a process still serving an older
+    file leaves the history alone and gets no comparison.
+    """
+    path = change_history_path()
+    with disk_cache_lock('change_history'):
+        try:
+            with open(path, 'rb') as f:
+                history = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            history = {}
+        latest = history.get('latest')
+        if latest is not None and latest[0] == data_fingerprint:
+            return history.get('previous')
+        if latest is not None and data_mtime <= latest[1]:
+            return None
+
+        history = {'previous': (latest[0], latest[2]) if latest is not None else None,
+                   'latest': (data_fingerprint, data_mtime, snapshot)}
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(history, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+    return history['previous']
+
+def detect_changes(data_fingerprint: str, data_mtime: int, snapshot: Dict[str, pd.DataFrame]) -> Dict[str, object]:
+    """Changes since the previously loaded data version: its fingerprint and the per-entity diffs"""
+    previous = advance_change_history(data_fingerprint, data_mtime, snapshot)
+    if previous is None:
+        return {}
+    return {'previous_fingerprint': previous[0], 'changes': diff_snapshots(previous[1], snapshot)}
 
-    elif view == 'borrower':
-        # Borrower detail page
-        pool_key = route.get('key', [None])[0]
-        borrower_addr = route.get('addr', [None])[0]
+# ======================================================
+# App Data
+# ======================================================
 
-        if not pool_key or not borrower_addr:
-            set_route(view='list')
-            st.rerun()
-            return
+# Derived structures built from the sheets: (build, dependencies, forked). The forked
+# stages are the JSON decoding and per-row Python loops that threads would not overlap;
+# they name the sheets they read, which are all that is sent to their child process.
+APP_DATA_STAGES = {
+    'apy_history': (build_apy_history_store, ('sheets',), ('morpho_markets', 'pendle_market_history', 'pendle_pt_matches')),
+    'rolling_stats': (compute_rolling_apy_stats, ('apy_history',), False),
+    'pools_base': (build_pools_df, ('sheets',), False),
+    'pools_stats': (add_rolling_apy_stats, ('pools_base', 'rolling_stats'), False),
+    'pools_df': (add_pendle_exposure, ('pools_stats', 'sheets', 'pendle_exposure'), False),
+    'curators_base': (build_curators_df, ('sheets',), ('morpho_curators', 'morpho_vaults')),
+    'vaults_base': (build_vaults_df, ('sheets',), False),
+    'depositor_amounts': (compute_depositor_amounts, ('sheets', 'depositor_transactions'), False),
+    'vault_concentration': (build_vault_concentration, ('sheets', 'depositor_amounts'), False),
+    'vaults_df': (add_vault_concentration, ('vaults_base', 'vault_concentration'), False),
+    'curators_df': (add_curator_concentration, ('curators_base', 'vaults_df'), False),
+    'curator_depositors': (build_curator_depositors, ('sheets', 'curators_base', 'depositor_amounts'), False),
+    'activity_cube': (build_activity_cube, ('sheets',), False),
+    'pendle_positions': (build_pendle_positions, ('sheets',), ('pendle_user_positions',)),
+    'pendle_exposure': (build_pendle_exposure, ('pendle_positions',), False),
+    'change_snapshot': (build_change_snapshot, ('sheets', 'pools_base', 'vaults_base'), False),
+    'loop_backtest': (run_loop_backtest, ('apy_history',), False),
+    'borrower_risk': (build_borrower_risk_arrays, ('sheets',), False),
+    'user_index': (build_user_index, ('sheets',), False),
+    'depositor_transactions': (decode_depositor_transactions, ('sheets',), ('morpho_vault_top_depositors',)),
+    'search_index': (build_search_index, ('pools_base', 'vaults_base', 'curators_base'), False),
+}
 
-        if st.button("← Back to Pool"):
-            set_route(view='pool', key=pool_key)
-            st.rerun()
+APP_DATA_KEYS = ('pools_df', 'curators_df', 'vaults_df', 'apy_history', 'loop_backtest',
+                 'borrower_risk', 'user_index', 'depositor_transactions', 'search_index',
+                 'curator_depositors', 'activity_cube', 'change_snapshot', 'pendle_positions')
+
+def build_app_data(sheets: Dict[str, pd.DataFrame],
+                   stage_seconds: Optional[Dict[str, float]] = None) -> Dict[str, object]:
+    """Build every derived frame and index from the sheets, recording per-stage build times"""
+    start = time.perf_counter()
+    results, build_report = run_build_graph(APP_DATA_STAGES, {'sheets': sheets})
+    if stage_seconds is not None:
+        stage_seconds.update((stage, ms / 1000) for stage, ms in build_report['Duration (ms)'].items())
+        stage_seconds['build_wall'] = time.perf_counter() - start
+
+    data = {'sheets': sheets, 'build_report': build_report}
+    data.update((key, results[key]) for key in APP_DATA_KEYS)
+    return data
+
+# Two versions are kept: the current one and the one sessions still render while the
+# collector's rewrite is picked up. Older versions (sheets, frames, indexes, maps) are freed
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_app_data(data_version: str) -> Dict[str, object]:
+    """Sheets and derived frames for a data version, shared with other processes through the disk cache"""
+    data_mtime = get_data_mtime()
+    fingerprint = get_data_fingerprint()
+    if fingerprint is None:
+        return load_and_build_app_data()
+
+    key = disk_cache_key('app_data', fingerprint)
+    data = disk_cache_load(key)
+    if data is None or not attach_app_data(data, fingerprint):
+        # Only one process builds a given version; the others wait and read its result
+        with disk_cache_lock(key):
+            data = disk_cache_load(key)
+            if data is None or not attach_app_data(data, fingerprint):
+                data = load_and_build_app_data(fingerprint)
+                if data:
+                    store_app_data(key, fingerprint, data)
+    if data:
+        data['changes'] = detect_changes(fingerprint, data_mtime, data['change_snapshot'])
+    return data
+
+def load_and_build_app_data(data_fingerprint: Optional[str] = None) -> Dict[str, object]:
+    """Parse the data file and build the derived frames; large sheets go through the disk cache if given its fingerprint"""
+    sheets = load_sheets(data_fingerprint)
+    if not sheets:
+        return {}
+    return build_app_data(sheets)
 
-        # Find pool info
-        pool_info = pools_df[pools_df['Unique Key'] == pool_key]
-        if pool_info.empty:
-            st.error("Pool not found")
-            return
-        pool_info = pool_info.iloc[0]
+# ======================================================
+# Prefetch
+# ======================================================
 
-        st.header(f"👤 Borrower Analysis")
-        st.subheader(f"Address: {borrower_addr[:10]}...{borrower_addr[-6:]}")
-        st.markdown(f"**Pool**: {pool_info['Pool']}")
+# Drill-down caches are warmed in the background while the list page is open, for the
+# pages users usually open next: the top pools by supply, the top vaults by TVL and the
+# session's recently visited pages. MORPHO_PREFETCH_TOP_N=0 turns prefetching off.
+PREFETCH_TOP_N = int(os.environ.get('MORPHO_PREFETCH_TOP_N', '5'))
+PREFETCH_WORKERS = int(os.environ.get('MORPHO_PREFETCH_WORKERS', '2'))
+PREFETCH_MAX_PENDING = 32
+PREFETCH_RECENT = 5
+
+class Prefetcher:
+    """Bounded thread pool warming drill-down caches; queued and running work is dropped when the data changes"""
+
+    def __init__(self, max_workers: int, max_pending: int = PREFETCH_MAX_PENDING):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix='prefetch')
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.data_version = None
+        self.generation = 0
+        self.pending: Dict[Tuple[str, str], concurrent.futures.Future] = {}
+        self.done = set()  # targets already warmed (or failed) for the current data version
+        self.counts = {'Submitted': 0, 'Completed': 0, 'Cancelled': 0, 'Failed': 0}
+
+    def submit(self, data_version: str, target: Tuple[str, str], steps: List[Callable[[], object]]) -> bool:
+        """Queue the steps warming one page unless it is already queued or warm"""
+        with self.lock:
+            if data_version != self.data_version:
+                self._cancel_locked()
+                self.data_version = data_version
+            if target in self.pending or target in self.done or len(self.pending) >= self.max_pending:
+                return False
+            self.pending[target] = self.executor.submit(self._run, self.generation, target, steps)
+            self.counts['Submitted'] += 1
+            return True
+
+    def cancel(self):
+        """Drop queued work; running work stops before its next step"""
+        with self.lock:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        for future in self.pending.values():
+            if future.cancel():
+                self.counts['Cancelled'] += 1
+        self.pending.clear()
+        self.done.clear()
+        self.generation += 1
+
+    def _run(self, generation: int, target: Tuple[str, str], steps: List[Callable[[], object]]):
+        outcome = 'Completed'
+        try:
+            for step in steps:
+                if generation != self.generation:
+                    outcome = 'Cancelled'
+                    break
+                step()
+        except Exception:
+            outcome = 'Failed'
+        with self.lock:
+            self.counts[outcome] += 1
+            if generation == self.generation:
+                self.pending.pop(target, None)
+                if outcome != 'Cancelled':
+                    self.done.add(target)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counts, Pending=len(self.pending), Warm=len(self.done))
+
+@st.cache_resource(show_spinner=False)
+def get_prefetcher() -> Prefetcher:
+    """Process-wide prefetcher shared by every session"""
+    return Prefetcher(PREFETCH_WORKERS)
+
+def remember_visit(kind: str, key: str):
+    """Record a visited pool or vault page so it is kept warm for this session"""
+    recent = [visit for visit in st.session_state.get('recent_visits', []) if visit != (kind, key)]
+    st.session_state['recent_visits'] = [(kind, key)] + recent[:PREFETCH_RECENT - 1]
+
+def pool_prefetch_steps(sheets: Dict[str, pd.DataFrame], data_version: str, pool_key: str,
+                        pool_info: pd.Series) -> List[Callable[[], object]]:
+    """Cached computations of a pool page, called with the same arguments the page uses"""
+    info = pool_info.to_dict()
+
+    def borrowers():
+        borrowers_df = get_borrowers_with_pnl(sheets, data_version, pool_key, info)
+        if len(borrowers_df) > 1:
+            create_pnl_comparison_chart(borrowers_df, sheets, data_version, pool_key, info)
+
+    def transactions():
+        tx_df = get_user_transactions(sheets, data_version, pool_key)
+        if not tx_df.empty:
+            create_sankey_diagram(tx_df, data_version, info)
+
+    return [borrowers, lambda: create_pool_performance_chart(sheets, data_version, pool_key), transactions]
+
+def vault_prefetch_steps(sheets: Dict[str, pd.DataFrame], data_version: str, vault_addr: str, vault_info: pd.Series,
+                         depositor_transactions: Optional[List[object]]) -> List[Callable[[], object]]:
+    """Cached computations of a vault page, called with the same arguments the page uses"""
+    info = vault_info.to_dict()
+
+    def depositors():
+        depositors_df = get_vault_depositors(sheets, data_version, vault_addr, depositor_transactions)
+        if not depositors_df.empty:
+            if len(depositors_df) > 1:
+                create_depositor_distribution_chart(depositors_df, data_version, vault_addr)
+            create_depositor_sankey(depositors_df, data_version, vault_addr, info)
+
+    return [depositors]
+
+def schedule_prefetch(data_version: str, sheets: Dict[str, pd.DataFrame], pools_df: pd.DataFrame,
+                      vaults_df: pd.DataFrame, depositor_transactions: Optional[List[object]]):
+    """Queue cache warming for the pages this session is likeliest to open next"""
+    if PREFETCH_TOP_N <= 0:
+        return
 
-        # Links
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown(f"🔗 [View on Etherscan](https://etherscan.io/address/{borrower_addr})")
-        with col2:
-            st.markdown(f"🔗 [Morpho Activity](https://app.morpho.org/ethereum/market/{pool_key})")
+    targets = list(st.session_state.get('recent_visits', []))
+    if not pools_df.empty:
+        targets += [('pool', key) for key in pools_df.nlargest(PREFETCH_TOP_N, 'Supply Assets ($M)')['Unique Key']]
+    if not vaults_df.empty:
+        targets += [('vault', address) for address in vaults_df.nlargest(PREFETCH_TOP_N, 'TVL')['Address']]
+
+    prefetcher = get_prefetcher()
+    for kind, key in dict.fromkeys(targets):
+        if kind == 'pool':
+            info = pools_df[pools_df['Unique Key'] == key]
+            steps = pool_prefetch_steps(sheets, data_version, key, info.iloc[0]) if not info.empty else None
+        else:
+            info = vaults_df[vaults_df['Address'] == key]
+            steps = (vault_prefetch_steps(sheets, data_version, key, info.iloc[0], depositor_transactions)
+                     if not info.empty else None)
+        if steps:
+            prefetcher.submit(data_version, (kind, key), steps)
 
-        # Get borrower's transactions
-        user_tx = get_user_transactions(sheets, pool_key, borrower_addr)
-        if user_tx.empty:
-            st.info("No transaction data available for this borrower.")
-            return
+# ======================================================
+# Rerun Timing
+# ======================================================
 
-        # Get Pendle positions for this user
-        pendle_positions = get_pendle_positions(sheets, borrower_addr, pool_key)
-        if not pendle_positions.empty:
-            st.markdown("---")
-            st.subheader("📊 Pendle Position Dashboard")
+SHOW_RERUN_TIMINGS = os.environ.get('MORPHO_SHOW_TIMINGS') == '1'
+
+def record_rerun_timing(name: str, seconds: float):
+    """Store the latest run time (ms) and run count of the app or a fragment in the session"""
+    timings = st.session_state.setdefault('rerun_timings', {})
+    counts = st.session_state.setdefault('rerun_counts', {})
+    timings[name] = seconds * 1000
+    counts[name] = counts.get(name, 0) + 1
+
+def timed_fragment(name: str):
+    """Turn a page section into an independently rerunnable fragment that records its run time"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                record_rerun_timing(name, time.perf_counter() - start)
+            if SHOW_RERUN_TIMINGS:
+                st.caption(f"⏱️ {name}: {st.session_state['rerun_timings'][name]:.0f} ms")
+            return result
+        return st.fragment(wrapper)
+    return decorator
 
-            position_info = pendle_positions.iloc[0]
+# ======================================================
+# Profiling
+# ======================================================
 
-            raw_positions = position_info.get('raw.positions', '')
+# Opt-in profiles of whole reruns, saved for offline analysis. MORPHO_PROFILE=1 profiles
+# every rerun with cProfile plus the stack sampler, MORPHO_PROFILE=sample with the sampler
+# alone (low overhead), and `?profile=<MORPHO_PROFILE_TOKEN>` profiles a single rerun
+PROFILE_MODE = os.environ.get('MORPHO_PROFILE', '')
+PROFILE_TOKEN = os.environ.get('MORPHO_PROFILE_TOKEN', '')
+PROFILE_DIR = os.environ.get('MORPHO_PROFILE_DIR', '.profiles')
+PROFILE_KEEP = int(os.environ.get('MORPHO_PROFILE_KEEP', '50'))
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds
+
+# Route parameters that identify the page shown by each view
+ROUTE_PARAMS = {
+    'pool': ('key',),
+    'borrower': ('key', 'addr'),
+    'curator': ('curator',),
+    'vault': ('address',),
+    'depositor': ('vault_addr', 'addr'),
+    'portfolio': ('addr',),
+}
+
+class StackSampler:
+    """Background thread that samples another thread's Python stack into collapsed stacks"""
+
+    def __init__(self, thread_id: int, root_code, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.root_code = root_code
+        self.interval = interval
+        self.counts: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            # Walk up to the profiled function so Streamlit's runner frames are left out
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                if code is self.root_code:
+                    break
+                frame = frame.f_back
+            if stack:
+                collapsed = ';'.join(reversed(stack))
+                self.counts[collapsed] = self.counts.get(collapsed, 0) + 1
+
+    def collapsed(self) -> str:
+        """Samples in the `frame;frame;frame count` format read by flamegraph.pl and speedscope"""
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.counts.items()))
+
+def requested_profile_mode() -> Optional[str]:
+    """Profiler for this rerun: 'cprofile', 'sample', or None when profiling is off"""
+    if PROFILE_TOKEN and 'profile' in st.query_params:
+        token = st.query_params['profile']
+        # Drop the parameter so only this rerun is profiled
+        del st.query_params['profile']
+        if hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+            return 'cprofile'
+    if PROFILE_MODE in ('1', 'cprofile'):
+        return 'cprofile'
+    if PROFILE_MODE == 'sample':
+        return 'sample'
+    return None
+
+def profile_tag(route: Dict[str, List[str]], data_version: str) -> str:
+    """File name tag for a profile: the view, a hash of its route parameters and of the data version"""
+    view = route.get('view', ['list'])[0] or 'list'
+    params = [f"{name}={route.get(name, [None])[0]}" for name in ROUTE_PARAMS.get(view, ())]
+    tag = view
+    if params:
+        tag += '-' + hashlib.sha1('&'.join(params).encode()).hexdigest()[:8]
+    return f"{tag}-{hashlib.sha1(data_version.encode()).hexdigest()[:8]}"
+
+def save_profile(route: Dict[str, List[str]], data_version: str, mode: str, seconds: float,
+                 profiler: Optional[cProfile.Profile], sampler: StackSampler) -> Optional[str]:
+    """Write the pstats, collapsed stacks and metadata of a profiled rerun; returns the file stem"""
+    stamp = time.strftime('%Y%m%d-%H%M%S') + f"-{int(time.time() * 1000) % 1000:03d}"
+    stem = os.path.join(PROFILE_DIR, f"{stamp}-{profile_tag(route, data_version)}-{os.getpid()}")
+    view = route.get('view', ['list'])[0] or 'list'
+    metadata = {
+        'view': view,
+        'route': {name: route.get(name, [None])[0] for name in ROUTE_PARAMS.get(view, ())},
+        'data_version': data_version,
+        'code_version': CODE_VERSION,
+        'mode': mode,
+        'seconds': seconds,
+        'samples': sum(sampler.counts.values()),
+        'sample_interval': sampler.interval,
+    }
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if profiler is not None:
+            profiler.dump_stats(f"{stem}.pstats")
+        with open(f"{stem}.collapsed", 'w') as f:
+            f.write(sampler.collapsed())
+        # Written last: a profile is complete once its metadata exists
+        with open(f"{stem}.json", 'w') as f:
+            json.dump(metadata, f, indent=2)
+    except OSError:
+        return None
 
-            # Process the data using our new helper function
-            stats, details_df = process_positions_for_display(raw_positions)
+    evict_profiles()
+    return stem
 
-            if not details_df.empty:
-                # 1. Display Key Metrics in columns
-                col1, col2, col3 = st.columns(3)
-                col1.metric("Total Open Value", format_usd(stats['total_open_value']))
-                col2.metric("Active Positions", stats['position_count'])
-                col3.metric("LP Value", format_usd(stats['total_lp_value']))
+def evict_profiles(keep: int = PROFILE_KEEP) -> List[str]:
+    """Delete all but the newest `keep` profiles"""
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except OSError:
+        return []
+
+    # File names start with a timestamp, so sorting orders profiles by age
+    stems = sorted(name[:-len('.json')] for name in names if name.endswith('.json'))
+    expired = set(stems[:-keep] if keep > 0 else stems)
+    evicted = []
+    for name in names:
+        if os.path.splitext(name)[0] in expired:
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(PROFILE_DIR, name))
+                evicted.append(name)
+    return evicted
+
+def profile_rerun(func, mode: str):
+    """Run one rerun under the profiler and save the profile, also when the run ends in st.rerun()"""
+    route = get_route()
+    data_version = get_data_version()
+    sampler = StackSampler(threading.get_ident(), func.__code__)
+    profiler = cProfile.Profile() if mode == 'cprofile' else None
+
+    start = time.perf_counter()
+    sampler.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        return func()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        sampler.stop()
+        save_profile(route, data_version, mode, time.perf_counter() - start, profiler, sampler)
+
+# ======================================================
+# Exports
+# ======================================================
 
-                st.markdown("<br>", unsafe_allow_html=True) # Add some space
+# Tables are exported to files one chunk of rows at a time, so a sheet read from the
+# memory-mapped store is never converted whole. With server.enableStaticServing (on in
+# .streamlit/config.toml) the files are written under ./static and the server streams them
+# from disk; without it they are only written to EXPORT_DIR, never read back into the app.
+# CSV is gzipped (about 30% of its size for transaction rows) to stay under the server's
+# static file limit; a file over it is not linked, since the server would answer 404
+EXPORT_DIR = os.environ.get('MORPHO_EXPORT_DIR', os.path.join(DISK_CACHE_DIR, 'exports'))
+EXPORT_KEEP = int(os.environ.get('MORPHO_EXPORT_KEEP', '20'))
+# Exports whose link was shown this recently are kept past EXPORT_KEEP, so a link another
+# session is displaying does not start answering 404
+EXPORT_GRACE_SECONDS = float(os.environ.get('MORPHO_EXPORT_GRACE_SECONDS', '3600'))
+EXPORT_CHUNK_ROWS = int(os.environ.get('MORPHO_EXPORT_CHUNK_ROWS', '50000'))
+EXCEL_MAX_ROWS = 1_048_575  # per worksheet, below the header row
+EXCEL_CHUNK_ROWS = 5000  # rows are written one at a time, so smaller chunks only bound the object copies
+CSV_EXPORT_COMPRESSLEVEL = 1  # level 6 is only ~10% smaller and three times slower
+STATIC_FILE_MAX_BYTES = 200 * 1024 * 1024  # Streamlit's limit on app static files
+
+EXPORT_FORMATS = {
+    'CSV': ('.csv.gz', 'application/gzip'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'Excel': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
 
-                # 2. Display Pie Chart and Data Table side-by-side
-                col_chart, col_table = st.columns([2, 3]) # Give more space to the table
+# Optional: Parquet needs pyarrow, Excel needs xlsxwriter (written in constant-memory mode)
+HAS_XLSXWRITER = importlib.util.find_spec('xlsxwriter') is not None
+pa_parquet = LazyModule('pyarrow.parquet')
+xlsxwriter = LazyModule('xlsxwriter')
 
-                with col_chart:
-                    st.write("**Portfolio Composition**")
-                    labels = ['Principal Tokens (PT)', 'Yield Tokens (YT)', 'Liquidity Positions (LP)']
-                    values = [stats['total_pt_value'], stats['total_yt_value'], stats['total_lp_value']]
+def available_export_formats() -> List[str]:
+    """Export formats whose writer is installed"""
+    installed = {'CSV': True, 'Parquet': HAS_PYARROW, 'Excel': HAS_XLSXWRITER}
+    return [fmt for fmt in EXPORT_FORMATS if installed[fmt]]
 
-                    # Create pie chart only if there's value
-                    if sum(values) > 0:
-                        fig = go.Figure(data=[go.Pie(labels=labels, values=values, hole=.3, pull=[0, 0, 0.05])])
-                        fig.update_layout(margin=dict(l=20, r=20, t=30, b=20), height=350)
-                        st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.info("No assets to chart.")
+def static_export_dir() -> Optional[str]:
+    """Directory the server streams files from, if static serving is enabled"""
+    if not st.get_option('server.enableStaticServing'):
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'exports')
+
+def export_path(name: str, signature: str, fmt: str) -> str:
+    """File for an export of a named table; the signature identifies its contents (data version, filters)"""
+    digest = hashlib.sha256(f"{name}\0{signature}\0{CODE_VERSION}".encode()).hexdigest()[:16]
+    stem = re.sub(r'[^0-9A-Za-z_.-]+', '_', name).strip('_') or 'export'
+    return os.path.join(static_export_dir() or EXPORT_DIR, f"{stem}-{digest}{EXPORT_FORMATS[fmt][0]}")
+
+def exportable_columns(frame: pd.DataFrame) -> List[str]:
+    """Columns with scalar values; nested lists and records (e.g. parsed transactions) are left out"""
+    columns = []
+    for column in frame.columns:
+        if frame[column].dtype == object:
+            sample = frame[column].dropna().head(1)
+            if len(sample) and isinstance(sample.iloc[0], (list, dict, tuple)):
+                continue
+        columns.append(column)
+    return columns
+
+def iter_export_chunks(frame: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Row slices of the exportable columns; slices of a mapped sheet are views, not copies"""
+    columns = exportable_columns(frame)
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows][columns]
+
+def write_csv_export(frame: pd.DataFrame, path: str):
+    with gzip.open(path, 'wt', compresslevel=CSV_EXPORT_COMPRESSLEVEL, encoding='utf-8', newline='') as f:
+        for i, chunk in enumerate(iter_export_chunks(frame)):
+            chunk.to_csv(f, header=i == 0, index=False)
+        if len(frame) == 0:
+            frame[exportable_columns(frame)].to_csv(f, index=False)
+
+def parquet_export_schema(frame: pd.DataFrame) -> Tuple["pa.Schema", List[str]]:
+    """
+    Schema of the exportable columns over all rows, not just the first chunk: typed
+    columns map from their dtype, object columns are inferred from all their values.
+    Also returns the object columns with mixed values, which are written as strings.
+    """
+    columns = exportable_columns(frame)
+    schema = pa.Schema.from_pandas(frame[columns].iloc[:0], preserve_index=False)
+    stringified = []
+    for i, column in enumerate(columns):
+        if frame[column].dtype != object:
+            continue
+        if pd.api.types.infer_dtype(frame[column], skipna=True) in ('mixed', 'mixed-integer'):
+            value_type = pa.string()
+            stringified.append(column)
+        else:
+            value_type = pa.infer_type(frame[column], from_pandas=True)
+        schema = schema.set(i, pa.field(column, value_type))
+    return schema, stringified
+
+def write_parquet_export(frame: pd.DataFrame, path: str):
+    """One row group per chunk, all written with the schema of the whole frame"""
+    schema, stringified = parquet_export_schema(frame)
+    with pa_parquet.ParquetWriter(path, schema) as writer:
+        for chunk in iter_export_chunks(frame):
+            if stringified:
+                chunk = chunk.assign(**{column: chunk[column].map(str, na_action='ignore') for column in stringified})
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+def write_excel_export(frame: pd.DataFrame, path: str):
+    """Rows streamed to disk by xlsxwriter's constant-memory mode, continuing on new worksheets past Excel's row limit"""
+    columns = exportable_columns(frame)
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+    date_columns = [i for i, column in enumerate(columns) if pd.api.types.is_datetime64_any_dtype(frame[column])]
+    worksheet, row = None, EXCEL_MAX_ROWS
+    try:
+        for chunk in iter_export_chunks(frame, EXCEL_CHUNK_ROWS):
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for record in values.itertuples(index=False, name=None):
+                if row >= EXCEL_MAX_ROWS:
+                    worksheet = workbook.add_worksheet(f"Sheet{len(workbook.worksheets()) + 1}")
+                    worksheet.write_row(0, 0, [str(column) for column in columns])
+                    for i in date_columns:
+                        worksheet.set_column(i, i, 20, date_format)
+                    row = 0
+                row += 1
+                worksheet.write_row(row, 0, record)
+        if worksheet is None:
+            workbook.add_worksheet().write_row(0, 0, [str(column) for column in columns])
+    finally:
+        workbook.close()
+
+EXPORT_WRITERS = {'CSV': write_csv_export, 'Parquet': write_parquet_export, 'Excel': write_excel_export}
+
+def write_export(frame: pd.DataFrame, fmt: str, path: str) -> str:
+    """Write an export unless an identical one exists; returns its path"""
+    if os.path.exists(path):
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        EXPORT_WRITERS[fmt](frame, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+    evict_exports(os.path.dirname(path))
+    return path
+
+def evict_exports(directory: str, keep: int = EXPORT_KEEP, grace_seconds: float = EXPORT_GRACE_SECONDS) -> List[str]:
+    """Delete all but the `keep` most recently used exports, sparing any used within the grace period"""
+    try:
+        entries = [(entry.stat().st_mtime, entry.path, entry.name) for entry in os.scandir(directory)
+                   if not entry.name.endswith('.tmp')]
+    except OSError:
+        return []
+    entries.sort()
+    cutoff = time.time() - grace_seconds
+    evicted = []
+    for mtime, path, name in entries[:-keep] if keep > 0 else entries:
+        if mtime >= cutoff:
+            break
+        with contextlib.suppress(OSError):
+            os.remove(path)
+            evicted.append(name)
+    return evicted
+
+def render_export_controls(frame: pd.DataFrame, name: str, signature: str, key: str):
+    """Format picker and download button for a table"""
+    export_col1, export_col2 = st.columns([1, 3])
+    with export_col1:
+        fmt = st.selectbox("Export Format", available_export_formats(), key=f"export_format_{key}",
+                           label_visibility="collapsed")
+    path = export_path(name, signature, fmt)
+    with export_col2:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            if st.button(f"📤 Export {len(frame):,} rows", key=f"export_{key}"):
+                with st.spinner("Writing export..."):
+                    write_export(frame, fmt, path)
+                st.rerun()
+            return
+        if static_export_dir() is None:
+            st.caption(f"Written to `{path}`; enable server.enableStaticServing to download exports from the browser.")
+        elif size > STATIC_FILE_MAX_BYTES:
+            st.caption(f"Written to `{path}`, but at {size / 2**20:,.0f} MB it is over the "
+                       f"{STATIC_FILE_MAX_BYTES // 2**20} MB the server serves to the browser; "
+                       f"filter the table or pick a more compact format.")
+        else:
+            # Shown links count as uses, so eviction leaves their files alone for the grace period
+            with contextlib.suppress(OSError):
+                os.utime(path)
+            st.link_button(f"⬇️ Download {len(frame):,} rows ({size / 2**20:,.1f} MB)",
+                           f"app/static/exports/{os.path.basename(path)}")
 
-                with col_table:
-                    st.write("**Detailed Positions**")
-                    # Format the columns for display in the dataframe
-                    display_df = details_df.copy()
-                    for col in ["PT Value", "YT Value", "LP Value", "Total Value"]:
-                        display_df[col] = display_df[col].apply(format_usd)
+# ======================================================
+# List View Fragments
+# ======================================================
 
-                    st.dataframe(display_df, use_container_width=True, hide_index=True)
+@timed_fragment("pools")
+def render_pools_tab(pools_df: pd.DataFrame, data_version: str):
+    """Pool filters and the pools table"""
+    if pools_df.empty:
+        st.warning("No pool data available.")
+    else:
+        # Pool filters
+        with st.expander("🎛️ Pool Filters", expanded=True):
+            all_collateral = ['All'] + sorted(pools_df['Collateral Asset'].unique().tolist())
+            all_borrow = ['All'] + sorted(pools_df['Borrow Asset'].unique().tolist())
+
+            filter_col1, filter_col2, filter_col3, filter_col4 = st.columns(4)
+            with filter_col1:
+                # Asset filters
+                filter_collateral = st.selectbox("Collateral Asset", all_collateral)
+                filter_borrow = st.selectbox("Borrow Asset", all_borrow)
+            with filter_col2:
+                # Numeric filters
+                supply_filter = st.slider("Min Supply Assets ($M)", 0.0, 100.0, 0.0, 0.1)
+                min_available = st.slider("Min Available Borrow ($M)", 0.0, 50.0, 0.0, 0.1)
+            with filter_col3:
+                min_spread = st.slider("Min APY Spread (%)", -50.0, 50.0, -50.0, 0.5)
+                only_pt = st.checkbox("🎯 Only PT Markets", value=False)
+            with filter_col4:
+                # Rolling statistics window and spread stability filter
+                stats_window = st.selectbox("Stats Window (days)", ROLLING_WINDOWS, index=1)
+                max_spread_vol = st.slider(f"Max Spread Volatility {stats_window}d (%)", 0.0, 50.0, 50.0, 0.5)
+                borrow_size = st.number_input("Borrow Size ($M)", min_value=0.0, value=1.0, step=0.5,
+                                              help="Size-aware spread: the spread left after borrowing this much at the post-trade rate")
+
+            screen = render_screen_controls(pools_df, data_version)
+
+        # The widgets are clauses of the same screen language, so all filters are one cached mask
+        clauses = []
+        if filter_collateral != 'All':
+            clauses.append(f"collateral == {filter_collateral!r}")
+        if filter_borrow != 'All':
+            clauses.append(f"borrow == {filter_borrow!r}")
+        if supply_filter > 0:
+            clauses.append(f"supply >= {supply_filter}")
+        if min_available > 0:
+            clauses.append(f"available >= {min_available}")
+        if only_pt:
+            clauses.append("is_pt")
+        if min_spread > -50:
+            clauses.append(f"spread >= {min_spread}")
+        spread_vol_col = f'Spread Vol {stats_window}d (%)'
+        if max_spread_vol < 50 and spread_vol_col in pools_df.columns:
+            clauses.append(f"{filter_identifier(spread_vol_col)} <= {max_spread_vol}")
+        if screen:
+            clauses.append(screen)
+
+        filtered_pools = pools_df
+        screen_expression = ' and '.join(f"({c})" for c in clauses)
+        if clauses:
+            filtered_pools = pools_df[get_screen_mask(pools_df, data_version, screen_expression)]
+
+        # Size-aware columns are joined after screening so the cached masks do not depend on the size
+        size_aware = get_size_aware_spread(pools_df, data_version, float(borrow_size) * 1_000_000)
+        filtered_pools = filtered_pools.join(size_aware)
+
+        # Sort by descending supply assets
+        filtered_pools = filtered_pools.sort_values('Supply Assets ($M)', ascending=False)
+
+        # Display table
+        st.subheader(f"📋 Pool Details ({len(filtered_pools)} pools)")
+
+        if filtered_pools.empty:
+            st.info("No pools match the current filters.")
+        else:
+            render_export_controls(filtered_pools, "pools", f"{data_version}\0{screen_expression}\0{borrow_size}", "pools")
+
+            # Format display columns
+            display_cols = ['Pool', 'Supply Assets ($M)', 'Available Borrow ($M)',
+                          'Morpho Borrow APY (%)', 'PT/External APY (%)', 'Net APY Spread (%)',
+                          'Status', 'Utilization (%)', 'LLTV (%)', 'Post-Trade Borrow APY (%)', 'Size-Aware Spread (%)']
+            display_cols += [c for c in ['Borrower PT Exposure ($M)'] if c in filtered_pools.columns]
+            stats_cols = [f'Spread Mean {stats_window}d (%)', f'Spread Vol {stats_window}d (%)',
+                          f'Spread P5 {stats_window}d (%)', f'Borrow APY Vol {stats_window}d (%)']
+            display_cols += [c for c in stats_cols if c in filtered_pools.columns]
+
+            # Create dataframe with color styling based on status
+            def style_rows(df):
+                def color_status(row):
+                    if '🟢' in str(row['Status']):
+                        return ['background-color: #d4edda'] * len(row)  # Light green
+                    elif '🟡' in str(row['Status']):
+                        return ['background-color: #fff3cd'] * len(row)  # Light yellow
+                    elif '🔴' in str(row['Status']):
+                        return ['background-color: #f8d7da'] * len(row)  # Light red
+                    else:
+                        return [''] * len(row)
+                return df.style.apply(color_status, axis=1)
 
+            # Interactive table
+            selected = st.dataframe(
+                filtered_pools[display_cols],
+                use_container_width=True,
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row"
+            )
 
-            else:
-                st.info("No open positions with value were found for this user.")
-
-        # Borrower metrics
-        borrow_mask = user_tx['type'].astype(str).str.contains('borrow', case=False, na=False)
-        supply_mask = user_tx['type'].astype(str).str.contains('supply', case=False, na=False)
-        repay_mask = user_tx['type'].astype(str).str.contains('repay', case=False, na=False)
-
-        total_borrowed = user_tx[borrow_mask]['USD Value'].sum()
-        total_supplied = user_tx[supply_mask]['USD Value'].sum()
-        total_repaid = user_tx[repay_mask]['USD Value'].sum()
-        net_position = total_supplied - total_borrowed + total_repaid
-
-        met_col1, met_col2, met_col3, met_col4 = st.columns(4)
-        with met_col1:
-            st.metric("Total Borrowed", format_usd(abs(total_borrowed)))
-        with met_col2:
-            st.metric("Total Supplied", format_usd(total_supplied))
-        with met_col3:
-            st.metric("Total Repaid", format_usd(abs(total_repaid)))
-        with met_col4:
-            st.metric("Net Position", format_usd(net_position))
-
-        # Transaction frequency chart for this user
-        freq_chart = create_transaction_frequency_chart(user_tx)
-        st.plotly_chart(freq_chart, use_container_width=True)
+            # Handle pool selection
+            if hasattr(selected, 'selection') and selected.selection and selected.selection.rows:
+                selected_idx = selected.selection.rows[0]
+                selected_pool = filtered_pools.iloc[selected_idx]
+                set_route(view='pool', key=selected_pool['Unique Key'])
+                st.rerun()
 
-        # Cumulative net position chart for this user
-        cumulative_chart = create_cumulative_net_position_chart(user_tx)
-        st.plotly_chart(cumulative_chart, use_container_width=True)
+CONCENTRATION_COLUMN_CONFIG = {
+    "Depositors": st.column_config.NumberColumn("Depositors", help="Top depositors tracked"),
+    "Top 1 Share": st.column_config.NumberColumn("Top 1 (%)", format="%.1f", help="Largest depositor's share of tracked deposits"),
+    "Top 5 Share": st.column_config.NumberColumn("Top 5 (%)", format="%.1f", help="Five largest depositors' share of tracked deposits"),
+    "HHI": st.column_config.NumberColumn("HHI", format="%d", help="Herfindahl–Hirschman index of depositor shares (0–10,000)"),
+    "Gini": st.column_config.NumberColumn("Gini", format="%.2f", help="Gini coefficient of depositor sizes"),
+}
 
-        # Individual user flow analysis
-        st.subheader("🌊 Personal Flow Analysis")
-        personal_sankey = create_sankey_diagram(user_tx, pool_info.to_dict(), borrower_addr)
-        if personal_sankey:
-            st.plotly_chart(personal_sankey, use_container_width=True)
+def render_screen_controls(pools_df: pd.DataFrame, data_version: str) -> str:
+    """Screen expression input with saved screens; returns the valid screen in effect, or ''"""
+    if 'pool_screen' not in st.session_state:
+        # A shared link carries its screen in the URL
+        st.session_state.pool_screen = st.query_params.get('screen', '')
+    screens = load_saved_screens()
+
+    def apply_saved_screen():
+        name = st.session_state.saved_screen
+        if name in screens:
+            st.session_state.pool_screen = screens[name]
+
+    screen_col1, screen_col2 = st.columns([3, 1])
+    with screen_col2:
+        st.selectbox("Saved Screens", ['—'] + sorted(screens), key="saved_screen", on_change=apply_saved_screen)
+    with screen_col1:
+        screen = st.text_input(
+            "Screen", key="pool_screen", placeholder="spread > 3 and utilization < 90 and is_pt",
+            help="Fields: " + ', '.join(pool_filter_fields(list(pools_df.columns))) +
+                 ". Combine comparisons with and / or / not; lists with in, e.g. collateral in ('WSTETH', 'RETH')."
+        ).strip()
+
+    if screen:
+        try:
+            get_screen_mask(pools_df, data_version, screen)
+        except ValueError as e:
+            st.error(str(e))
+            return ''
+        st.query_params['screen'] = screen
+        st.caption(f"🔗 Share this screen: `?{urllib.parse.urlencode({'screen': screen})}`")
+
+        save_col1, save_col2 = st.columns([3, 1])
+        with save_col1:
+            screen_name = st.text_input("Screen Name", key="screen_name", placeholder="Name to save this screen as")
+        with save_col2:
+            if st.button("💾 Save Screen", disabled=not screen_name.strip()):
+                screens[screen_name.strip()] = screen
+                if not store_saved_screens(screens):
+                    st.error(f"Could not write '{SCREENS_FILE}'")
+    elif 'screen' in st.query_params:
+        del st.query_params['screen']
+
+    if screens:
+        # Saved screens are cached masks, so counting all of them per refresh is cheap
+        counts = []
+        for name, expression in sorted(screens.items()):
+            try:
+                counts.append((name, expression, int(get_screen_mask(pools_df, data_version, expression).sum())))
+            except ValueError:
+                counts.append((name, expression, None))
+        with st.expander(f"📌 Saved Screens ({len(screens)})"):
+            st.dataframe(pd.DataFrame(counts, columns=['Screen', 'Expression', 'Matching Pools']),
+                         use_container_width=True, hide_index=True)
+    return screen
+
+@timed_fragment("curators")
+def render_curators_tab(curators_df: pd.DataFrame):
+    """Curators table"""
+    if curators_df.empty:
+        st.warning("No curator data available.")
+    else:
+        st.subheader("🧑‍🏫 Curators")
+
+        selected_curator = st.dataframe(
+            curators_df,
+            column_order=['Curator', 'Total AUM', 'Vault Count'] + CONCENTRATION_COLUMNS,
+            column_config={
+                "Total AUM": st.column_config.NumberColumn(
+                    "Total AUM", format="$%d"
+                ),
+                **CONCENTRATION_COLUMN_CONFIG,
+                "Address": None,
+                "Managed Vaults": None,
+                "Morpho URL": None,
+                "twitter": None,
+                "main": None,
+            },
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row"
+        )
 
-    elif view == 'curator':
-        # Curator detail page
-        curator_name = route.get('curator', [None])[0]
-        if not curator_name:
-            set_route(view='list')
+        # Handle curator selection
+        if hasattr(selected_curator, 'selection') and selected_curator.selection and selected_curator.selection.rows:
+            selected_idx = selected_curator.selection.rows[0]
+            curator_info = curators_df.iloc[selected_idx]
+            set_route(view='curator', curator=curator_info['Curator'])
             st.rerun()
-            return
 
-        if st.button("← Back to Curators"):
-            set_route(view='list')
+@timed_fragment("vaults")
+def render_vaults_tab(vaults_df: pd.DataFrame):
+    """Vaults table"""
+    if vaults_df.empty:
+        st.warning("No vault data available.")
+    else:
+        st.subheader("🏦 All Vaults")
+
+        selected_vault = st.dataframe(
+            vaults_df,
+            column_order=['Vault', 'Symbol', 'TVL', 'APY', 'Fee', 'Asset'] + CONCENTRATION_COLUMNS,
+            column_config={
+                "TVL": st.column_config.NumberColumn("TVL", format="$%d"),
+                "APY": st.column_config.NumberColumn("APY (%)", format="%.2f"),
+                "Fee": st.column_config.NumberColumn("Fee (%)", format="%.2f"),
+                **CONCENTRATION_COLUMN_CONFIG,
+                "Address": None,
+                "Curator": None,
+                "Curator Name": None,
+                "Curator Names List": None,
+                "Whitelisted": None,
+            },
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row"
+        )
+
+        # Handle vault selection
+        if hasattr(selected_vault, 'selection') and selected_vault.selection and selected_vault.selection.rows:
+            selected_idx = selected_vault.selection.rows[0]
+            vault_info = vaults_df.iloc[selected_idx]
+            set_route(view='vault', address=vault_info['Address'])
             st.rerun()
 
-        curator_info = curators_df[curators_df['Curator'] == curator_name]
-        if curator_info.empty:
-            st.error("Curator not found")
+@timed_fragment("liquidation_risk")
+def render_risk_tab(risk: Dict[str, np.ndarray], data_version: str):
+    """Liquidation stress test controls and heatmap"""
+    if not risk:
+        st.warning("No borrower data available.")
+    else:
+        st.subheader("⚠️ Liquidation Stress Test")
+
+        risk_col1, risk_col2, risk_col3 = st.columns(3)
+        with risk_col1:
+            max_shock = st.slider("Max Collateral Price Shock (%)", 1, 50, 30, 1)
+        with risk_col2:
+            shock_step = st.slider("Shock Step (%)", 1, 10, 1, 1)
+        with risk_col3:
+            pt_only_shock = st.checkbox("Shock PT collateral only", value=True)
+
+        # The grid always ends at the max shock, whatever the step
+        shocks = tuple(-s / 100 for s in sorted({*range(shock_step, max_shock, shock_step), max_shock}))
+        stress_df = get_liquidation_stress(risk, data_version, shocks, pt_only_shock)
+        if stress_df.empty:
+            st.info("No borrowers to stress test.")
             return
 
-        curator_info = curator_info.iloc[0]
-        st.header(f"🧑‍🏫 {curator_name}")
+        worst_shock = min(shocks) * 100
+        worst = stress_df[stress_df['Price Shock (%)'] == worst_shock]
+        m_col1, m_col2, m_col3 = st.columns(3)
+        with m_col1:
+            st.metric(f"Liquidatable at {worst_shock:.0f}%", format_usd(worst['Liquidatable USD'].sum()))
+        with m_col2:
+            st.metric("Borrowers Liquidated", int(worst['Liquidatable Borrowers'].sum()))
+        with m_col3:
+            st.metric("Markets Affected", int((worst['Liquidatable USD'] > 0).sum()))
+
+        heatmap = create_liquidation_heatmap(stress_df, data_version, shocks, pt_only_shock)
+        if heatmap.data:
+            st.plotly_chart(heatmap, use_container_width=True)
+        else:
+            st.info("No borrowers become liquidatable within this shock range.")
 
-        # Curator metrics
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Total AUM", format_usd(curator_info['Total AUM']))
-        with col2:
-            st.metric("Number of Vaults", curator_info['Vault Count'])
-        with col3:
-            if curator_info['Morpho URL']:
-                st.markdown(f"🔗 [Website]({curator_info['main']}) [Morphoforum]({curator_info['Morpho URL']}) [X]({curator_info['twitter']}) ")
-                url_name = curator_name.replace(' ', '-')
-                st.markdown(f"🔗 [Morpho link](https://app.morpho.org/ethereum/curator/{url_name})")
-
-        # Managed Vaults
-        st.subheader("🏦 Managed Vaults")
-        managed_vaults_list = curator_info['Managed Vaults']
-        if managed_vaults_list:
-            managed_vaults_df = pd.DataFrame(managed_vaults_list)
-            
-            # Use a dataframe with selection to navigate
-            selected_vault = st.dataframe(
-                managed_vaults_df,
-                column_order=['Vault', 'TVL', 'APY'],
+@timed_fragment("best_loops")
+def render_loops_tab(pools_df: pd.DataFrame, data_version: str):
+    """Leverage loop optimizer controls and table"""
+    if pools_df.empty:
+        st.warning("No pool data available.")
+    else:
+        st.subheader("🔁 Best Leverage Loops")
+
+        loop_col1, loop_col2, loop_col3 = st.columns(3)
+        with loop_col1:
+            loop_equity = st.number_input("Equity ($)", min_value=0.0, value=1_000_000.0, step=100_000.0,
+                                          help="Set to 0 to size each loop by the pool's full available liquidity")
+        with loop_col2:
+            target_health = st.slider("Target Health Factor", 1.01, 2.0, 1.10, 0.01)
+        with loop_col3:
+            loops_pt_only = st.checkbox("Only PT Markets", value=False, key="loops_only_pt")
+
+        loops_df = get_leverage_loops(pools_df, data_version, float(loop_equity), float(target_health))
+        loops_df = loops_df.dropna(subset=['Loop Net APY (%)'])
+        if loops_pt_only:
+            loops_df = loops_df[loops_df['Is PT Market']]
+        loops_df = loops_df.sort_values('Loop Net APY (%)', ascending=False)
+
+        if loops_df.empty:
+            st.info("No pools have yield data to evaluate loops.")
+        else:
+            selected_loop = st.dataframe(
+                loops_df,
+                column_order=['Pool', 'Optimal Leverage', 'Loop Net APY (%)', 'Net APY Spread (%)',
+                              'Equity ($M)', 'Position Size ($M)', 'Annual Profit ($)',
+                              'Max Leverage', 'Available Borrow ($M)', 'LLTV (%)'],
                 column_config={
-                    "Vault": "Vault Name",
-                    "TVL": st.column_config.NumberColumn("TVL", format="$%d"),
-                    "APY": st.column_config.NumberColumn("APY (%)", format="%.2f"),
-                    "Address": None  # Hide address from view
+                    "Optimal Leverage": st.column_config.NumberColumn("Optimal Leverage", format="%.2fx"),
+                    "Max Leverage": st.column_config.NumberColumn("Max Leverage", format="%.2fx"),
+                    "Loop Net APY (%)": st.column_config.NumberColumn("Loop Net APY (%)", format="%.2f"),
+                    "Annual Profit ($)": st.column_config.NumberColumn("Annual Profit ($)", format="$%d"),
                 },
                 use_container_width=True,
                 hide_index=True,
@@ -1678,215 +4457,1058 @@ def main():
                 selection_mode="single-row"
             )
 
-            if hasattr(selected_vault, 'selection') and selected_vault.selection and selected_vault.selection.rows:
-                selected_idx = selected_vault.selection.rows[0]
-                vault_address = managed_vaults_df.iloc[selected_idx]['Address']
-                set_route(view='vault', address=vault_address)
+            if hasattr(selected_loop, 'selection') and selected_loop.selection and selected_loop.selection.rows:
+                selected_idx = selected_loop.selection.rows[0]
+                set_route(view='pool', key=loops_df.iloc[selected_idx]['Unique Key'])
                 st.rerun()
-        else:
-            st.info("No vault data available for this curator")
 
+            # How each loop's spread erodes as its own borrow pushes the market up the rate curve
+            st.subheader("📉 Size-Aware Spread")
+            pool_names = dict(zip(loops_df['Unique Key'], loops_df['Pool']))
+            curve_keys = st.multiselect("Pools", list(pool_names), default=list(pool_names)[:5],
+                                        format_func=lambda key: f"{pool_names[key]} ({key[:8]})",
+                                        key="size_aware_pools")
+            if curve_keys:
+                selected_pools = loops_df[loops_df['Unique Key'].isin(curve_keys)]
+                max_size = st.number_input("Max Borrow Size ($M)", min_value=0.1,
+                                           value=max(float(selected_pools['Available Borrow ($M)'].max()), 0.1),
+                                           step=1.0, key="size_aware_max")
+                curves = get_size_aware_spread_curves(pools_df, data_version, tuple(curve_keys),
+                                                      float(max_size) * 1_000_000)
+                st.plotly_chart(create_size_aware_spread_chart(curves), use_container_width=True)
+                st.caption("Post-trade borrow APY from Morpho's adaptive curve IRM at the current rate at target; "
+                           "sizes beyond a pool's available liquidity are not shown.")
+
+@timed_fragment("changes")
+def render_changes_tab(changes: Dict[str, object]):
+    """What changed since the previous data version, and the alert rules it triggers"""
+    st.subheader("🔔 What Changed")
+    if not changes:
+        st.info("No earlier data version has been loaded yet; changes show up after the next data refresh.")
+        return
+    st.caption(f"Compared with the previous data version ({changes['previous_fingerprint'][:12]})")
+    entity_changes = changes['changes']
+
+    # Alert rules, editable in place
+    metrics = sorted({metric for _, entity_metrics in CHANGE_ENTITIES.values() for metric in entity_metrics})
+    rules = st.data_editor(
+        pd.DataFrame(DEFAULT_ALERT_RULES),
+        column_config={
+            "Entity": st.column_config.SelectboxColumn("Entity", options=list(CHANGE_ENTITIES), required=True),
+            "Metric": st.column_config.SelectboxColumn("Metric", options=metrics, required=True),
+            "Condition": st.column_config.SelectboxColumn("Condition", options=ALERT_CONDITIONS, required=True),
+            "Threshold": st.column_config.NumberColumn("Threshold", required=True),
+        },
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        key="alert_rules",
+    )
+    alerts = evaluate_alert_rules(entity_changes, rules.dropna())
+    if alerts.empty:
+        st.success("No alert rules triggered.")
+    else:
+        st.warning(f"{len(alerts)} alert(s) triggered")
+        st.dataframe(alerts, use_container_width=True, hide_index=True)
+
+    # Per-entity change summary and changed rows, largest move first
+    for entity, frame in entity_changes.items():
+        status_counts = frame['Status'].value_counts()
+        st.markdown(f"**{entity.title()}s**: {status_counts.get('changed', 0)} changed, "
+                    f"{status_counts.get('new', 0)} new, {status_counts.get('removed', 0)} removed")
+        if not frame.empty:
+            first_delta = next(column for column in frame.columns if column.endswith(' Δ'))
+            ordered = frame.iloc[np.argsort(-frame[first_delta].abs().fillna(-np.inf).to_numpy(), kind='stable')]
+            with st.expander(f"{entity.title()} changes"):
+                st.dataframe(ordered.reset_index(), use_container_width=True, hide_index=True)
 
-    elif view == 'vault':
-        # Vault detail page
-        vault_addr = route.get('address', [None])[0]
-        if not vault_addr:
-            set_route(view='list')
-            st.rerun()
-            return
+# ======================================================
+# Detail View Fragments
+# ======================================================
 
-        if st.button("← Back to Vaults"):
-            set_route(view='list')
-            st.rerun()
+@timed_fragment("pool_borrowers")
+def render_pool_borrowers(sheets: Dict[str, pd.DataFrame], data_version: str, pool_key: str, pool_info: pd.Series):
+    """Top borrowers tab of the pool page"""
+    borrowers_df = get_borrowers_with_pnl(sheets, data_version, pool_key, pool_info.to_dict())
+    if borrowers_df.empty:
+        st.info("No borrower data available for this pool.")
+    else:
+        st.subheader("🏆 Top 5 Borrowers")
+
+        # Format borrowers data for display with Etherscan links
+        display_borrowers = borrowers_df.copy()
+        display_borrowers['Collateral'] = [format_usd(x) for x in display_borrowers['Collateral USD']]
+        display_borrowers['Borrowed'] = [format_usd(x) for x in display_borrowers['Borrow USD']]
+        display_borrowers['Health'] = [f"{x:.2f}" if not pd.isna(x) else "—" for x in display_borrowers['Health Factor']]
+        display_borrowers['Est. PnL'] = [format_usd(x) if not pd.isna(x) else "—" for x in display_borrowers['Estimated PnL']]
+        display_borrowers['Morpho PnL'] = [format_usd(x) if not pd.isna(x) else "—" for x in display_borrowers['Morpho PnL']]
+        display_borrowers['Address'] = [f"{addr[:10]}...{addr[-6:]}" for addr in display_borrowers['userAddress']]
+
+        # Create proper table with headers
+        header_cols = st.columns([2, 1, 1, 1, 1, 1, 1])
+        with header_cols[0]:
+            st.write("**Address**")
+        with header_cols[1]:
+            st.write("**Collateral**")
+        with header_cols[2]:
+            st.write("**Borrowed**")
+        with header_cols[3]:
+            st.write("**Health Factor**")
+        with header_cols[4]:
+            st.write("**Est. PnL**")
+        with header_cols[5]:
+            st.write("**Morpho PnL**")
+        with header_cols[6]:
+            st.write("**Action**")
+
+        # Create table with etherscan links
+        for idx, row in display_borrowers.iterrows():
+            cols = st.columns([2, 1, 1, 1, 1, 1, 1])
+            with cols[0]:
+                st.write(f"[{row['Address']}](https://etherscan.io/address/{row['userAddress']})")
+            with cols[1]:
+                st.write(row['Collateral'])
+            with cols[2]:
+                st.write(row['Borrowed'])
+            with cols[3]:
+                st.write(row['Health'])
+            with cols[4]:
+                st.write(row['Est. PnL'])
+            with cols[5]:
+                st.write(row['Morpho PnL'])
+            with cols[6]:
+                if st.button("Analyze", key=f"analyze_{pool_key}_{idx}"):
+                    set_route(view='borrower', key=pool_key, addr=row['userAddress'])
+                    st.rerun()
 
-        vault_info = vaults_df[vaults_df['Address'] == vault_addr]
-        if vault_info.empty:
-            st.error("Vault not found")
-            return
+        # PnL comparison chart
+        if len(borrowers_df) > 1:
+            st.subheader("📊 PnL Comparison")
+            pnl_chart = create_pnl_comparison_chart(borrowers_df, sheets, data_version, pool_key, pool_info.to_dict())
+            st.plotly_chart(pnl_chart, use_container_width=True)
+
+@timed_fragment("pool_transactions")
+def render_pool_transactions(sheets: Dict[str, pd.DataFrame], data_version: str, pool_key: str,
+                             activity_cube: Dict[str, object]):
+    """Transactions tab of the pool page"""
+    tx_df = get_user_transactions(sheets, data_version, pool_key)
+    if tx_df.empty:
+        st.info("No transaction data available for this pool.")
+    else:
+        st.subheader("📈 Transaction Analysis")
+
+        # Transaction summary metrics
+        total_volume = tx_df['USD Value'].sum()
+        unique_users = tx_df['userAddress'].nunique()
+        avg_tx_size = tx_df['USD Value'].mean()
+
+        tx_col1, tx_col2, tx_col3 = st.columns(3)
+        with tx_col1:
+            st.metric("Total Volume", format_usd(total_volume))
+        with tx_col2:
+            st.metric("Unique Users", unique_users)
+        with tx_col3:
+            st.metric("Avg Transaction", format_usd(avg_tx_size))
+        render_export_controls(tx_df, f"transactions-{pool_key[:10]}", f"{data_version}\0{pool_key}",
+                               "pool_transactions")
+
+        # Activity charts, answered from the pre-aggregated cube
+        resolution = st.selectbox("Resolution", list(ACTIVITY_RESOLUTIONS), index=1, key="pool_activity_resolution")
+        activity = query_activity(activity_cube, pool_key, resolution=resolution)
+
+        # Transaction frequency chart
+        freq_chart = create_transaction_frequency_chart(activity, data_version, pool_key, resolution=resolution)
+        st.plotly_chart(freq_chart, use_container_width=True)
+
+        # Cumulative net position chart
+        cumulative_chart = create_cumulative_net_position_chart(activity, data_version, pool_key, resolution=resolution)
+        st.plotly_chart(cumulative_chart, use_container_width=True)
+
+@timed_fragment("pool_flows")
+def render_pool_flows(sheets: Dict[str, pd.DataFrame], data_version: str, pool_key: str, pool_info: pd.Series):
+    """Flow analysis tab of the pool page"""
+    tx_df = get_user_transactions(sheets, data_version, pool_key)
+    if tx_df.empty:
+        st.info("No transaction data available for flow analysis.")
+    else:
+        st.subheader("🌊 Transaction Flow Analysis")
 
-        vault_info = vault_info.iloc[0]
-        st.header(f"🏦 {vault_info['Vault']}")
-        # Curator information
-        if vault_info['Curator Name']:
-            st.info(f"👨‍🏫 Managed by: {vault_info['Curator Name']}")
-        # Vault metrics
-        col1, col2, col3, col4 = st.columns(4)
+        # Sankey diagram positioned on the left
+        col1, col2 = st.columns([2, 1])
         with col1:
-            st.metric("Total TVL", format_usd(vault_info['TVL']))
-        with col2:
-            st.metric("APY", f"{vault_info['APY']:.2f}%")
-        with col3:
-            st.metric("Fee", f"{vault_info['Fee']:.2f}%")
-        with col4:
-            st.metric("Asset", vault_info['Asset'])
-
-        # Additional info
-        st.markdown(f"**Symbol**: {vault_info['Symbol']}")
-        st.markdown(f"**Whitelisted**: {'Yes' if vault_info['Whitelisted'] else 'No'}")
-        name = vault_info['Vault']
-        url_name = name.replace(' ', '-')
-        st.markdown(f"🔗 [View on Morpho](https://app.morpho.org/ethereum/vault/{vault_addr}/{url_name})")
-
-        # Get depositors data
-        vault_depositors = get_vault_depositors(sheets, vault_addr)
-        if not vault_depositors.empty:
-            st.subheader("👥 Top Depositors")
-
-            # Similar analysis as borrowers - user distribution, sankey flow, line charts
-            display_depositors = vault_depositors.copy()
-            display_depositors['Amount'] = [format_usd(x) for x in display_depositors['Assets USD']]
-            display_depositors['Address'] = [f"{addr[:10]}...{addr[-6:]}" for addr in display_depositors['userAddress']]
-
-            # Create proper table headers for depositors
-            header_cols = st.columns([3, 2, 2])
-            with header_cols[0]:
-                st.write("**Address**")
-            with header_cols[1]:
-                st.write("**Amount**")
-            with header_cols[2]:
-                st.write("**Action**")
-
-            # Create table with etherscan links for depositors
-            for idx, row in display_depositors.iterrows():
-                cols = st.columns([3, 2, 2])
-                with cols[0]:
-                    st.write(f"[{row['Address']}](https://etherscan.io/address/{row['userAddress']})")
-                with cols[1]:
-                    col_text = f"{row['Amount']} (Raw: {format_usd(row.get('Raw Amount', 0))}, Calc: {format_usd(row.get('Calculated Amount', 0))})"
-                    st.write(col_text)
-                with cols[2]:
-                    if st.button("Analyze", key=f"analyze_depositor_{vault_addr}_{idx}"):
-                        set_route(view='depositor', vault_addr=vault_addr, addr=row['userAddress'])
-                        st.rerun()
-
-            # Enhanced depositor analytics
-            st.subheader("📊 Depositor Analytics")
-
-            # User distribution pie chart
-            if len(vault_depositors) > 1:
-                dist_chart = create_depositor_distribution_chart(vault_depositors)
-                st.plotly_chart(dist_chart, use_container_width=True)
-
-            # Depositor sankey flow
-            sankey_chart = create_depositor_sankey(vault_depositors, vault_info.to_dict())
-            if sankey_chart:
-                st.plotly_chart(sankey_chart, use_container_width=True)
-
-            # Depositor metrics
-            total_deposited = vault_depositors['Assets USD'].sum()
-            avg_deposit = vault_depositors['Assets USD'].mean()
-            largest_deposit = vault_depositors['Assets USD'].max()
-
-            dep_col1, dep_col2, dep_col3 = st.columns(3)
-            with dep_col1:
-                st.metric("Total Deposited", format_usd(total_deposited))
-            with dep_col2:
-                st.metric("Average Deposit", format_usd(avg_deposit))
-            with dep_col3:
-                st.metric("Largest Deposit", format_usd(largest_deposit))
+            sankey_fig = create_sankey_diagram(tx_df, data_version, pool_info.to_dict())
+            if sankey_fig:
+                st.plotly_chart(sankey_fig, use_container_width=True)
+            else:
+                st.info("Not enough transaction data to create flow diagram.")
+
+@timed_fragment("borrower_panel")
+def render_borrower_panel(sheets: Dict[str, pd.DataFrame], data_version: str, pool_key: str, borrower_addr: str,
+                          pool_info: pd.Series, activity_cube: Dict[str, object], pendle_positions: pd.DataFrame):
+    """Borrower analysis panel"""
+    st.header(f"👤 Borrower Analysis")
+    st.subheader(f"Address: {borrower_addr[:10]}...{borrower_addr[-6:]}")
+    st.markdown(f"**Pool**: {pool_info['Pool']}")
+
+    # Links
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown(f"🔗 [View on Etherscan](https://etherscan.io/address/{borrower_addr})")
+    with col2:
+        st.markdown(f"🔗 [Morpho Activity](https://app.morpho.org/ethereum/market/{pool_key})")
+    if st.button("👛 View Full Portfolio"):
+        set_route(view='portfolio', addr=borrower_addr)
+        st.rerun()
+
+    # Get borrower's transactions
+    user_tx = get_user_transactions(sheets, data_version, pool_key, borrower_addr)
+    if user_tx.empty:
+        st.info("No transaction data available for this borrower.")
+        return
 
-    elif view == 'depositor':
-        # Depositor detail page
-        vault_addr = route.get('vault_addr', [None])[0]
-        depositor_addr = route.get('addr', [None])[0]
+    # Get Pendle positions for this user
+    user_positions = get_user_pendle_positions(pendle_positions, borrower_addr, pool_key)
+    # Pendle dashboards are only collected for borrowers of PT markets
+    if pool_info['Is PT Market']:
+        st.markdown("---")
+        st.subheader("📊 Pendle Position Dashboard")
 
-        if not vault_addr or not depositor_addr:
-            set_route(view='list')
-            st.rerun()
-            return
+        if not user_positions.empty:
+            totals = user_positions[[*PENDLE_VALUE_COLUMNS, 'Total Value']].sum()
 
-        if st.button("← Back to Vault"):
-            set_route(view='vault', address=vault_addr)
-            st.rerun()
+            # 1. Display Key Metrics in columns
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total Open Value", format_usd(totals['Total Value']))
+            col2.metric("Active Positions", len(user_positions))
+            col3.metric("LP Value", format_usd(totals['LP Value']))
 
-        # Find vault info
-        vault_info = vaults_df[vaults_df['Address'] == vault_addr]
-        if vault_info.empty:
-            st.error("Vault not found")
-            return
-        vault_info = vault_info.iloc[0]
+            st.markdown("<br>", unsafe_allow_html=True) # Add some space
+
+            # 2. Display Pie Chart and Data Table side-by-side
+            col_chart, col_table = st.columns([2, 3]) # Give more space to the table
+
+            with col_chart:
+                st.write("**Portfolio Composition**")
+                labels = ['Principal Tokens (PT)', 'Yield Tokens (YT)', 'Liquidity Positions (LP)']
+                values = totals[PENDLE_VALUE_COLUMNS].tolist()
+
+                # Create pie chart only if there's value
+                if sum(values) > 0:
+                    fig = go.Figure(data=[go.Pie(labels=labels, values=values, hole=.3, pull=[0, 0, 0.05])])
+                    fig.update_layout(margin=dict(l=20, r=20, t=30, b=20), height=350)
+                    st.plotly_chart(fig, use_container_width=True)
+                else:
+                    st.info("No assets to chart.")
+
+            with col_table:
+                st.write("**Detailed Positions**")
+                # Format the columns for display in the dataframe
+                display_df = user_positions[['Market ID', *PENDLE_VALUE_COLUMNS, 'Total Value']].copy()
+                for col in ["PT Value", "YT Value", "LP Value", "Total Value"]:
+                    display_df[col] = display_df[col].apply(format_usd)
 
-        st.header(f"👤 Depositor Analysis")
-        st.subheader(f"Address: {depositor_addr[:10]}...{depositor_addr[-6:]}")
-        st.markdown(f"**Vault**: {vault_info['Vault']}")
+                st.dataframe(display_df, use_container_width=True, hide_index=True)
 
-        # Links
-        col1, col2 = st.columns(2)
+
+        else:
+            st.info("No open positions with value were found for this user.")
+
+    # Borrower metrics
+    borrow_mask = user_tx['type'].astype(str).str.contains('borrow', case=False, na=False)
+    supply_mask = user_tx['type'].astype(str).str.contains('supply', case=False, na=False)
+    repay_mask = user_tx['type'].astype(str).str.contains('repay', case=False, na=False)
+
+    total_borrowed = user_tx[borrow_mask]['USD Value'].sum()
+    total_supplied = user_tx[supply_mask]['USD Value'].sum()
+    total_repaid = user_tx[repay_mask]['USD Value'].sum()
+    net_position = total_supplied - total_borrowed + total_repaid
+
+    met_col1, met_col2, met_col3, met_col4 = st.columns(4)
+    with met_col1:
+        st.metric("Total Borrowed", format_usd(abs(total_borrowed)))
+    with met_col2:
+        st.metric("Total Supplied", format_usd(total_supplied))
+    with met_col3:
+        st.metric("Total Repaid", format_usd(abs(total_repaid)))
+    with met_col4:
+        st.metric("Net Position", format_usd(net_position))
+
+    # Activity charts for this user, answered from the pre-aggregated cube
+    resolution = st.selectbox("Resolution", list(ACTIVITY_RESOLUTIONS), index=1, key="borrower_activity_resolution")
+    activity = query_activity(activity_cube, pool_key, borrower_addr, resolution)
+
+    # Transaction frequency chart for this user
+    freq_chart = create_transaction_frequency_chart(activity, data_version, pool_key, borrower_addr, resolution)
+    st.plotly_chart(freq_chart, use_container_width=True)
+
+    # Cumulative net position chart for this user
+    cumulative_chart = create_cumulative_net_position_chart(activity, data_version, pool_key, borrower_addr, resolution)
+    st.plotly_chart(cumulative_chart, use_container_width=True)
+
+    # Individual user flow analysis
+    st.subheader("🌊 Personal Flow Analysis")
+    personal_sankey = create_sankey_diagram(user_tx, data_version, pool_info.to_dict(), borrower_addr)
+    if personal_sankey:
+        st.plotly_chart(personal_sankey, use_container_width=True)
+
+@timed_fragment("vault_depositors")
+def render_vault_depositors(sheets: Dict[str, pd.DataFrame], data_version: str, vault_addr: str, vault_info: pd.Series,
+                            depositor_transactions: Optional[List[object]]):
+    """Top depositors list and depositor analytics of the vault page"""
+    # Get depositors data
+    vault_depositors = get_vault_depositors(sheets, data_version, vault_addr, depositor_transactions)
+    if not vault_depositors.empty:
+        st.subheader("👥 Top Depositors")
+        render_export_controls(vault_depositors, f"depositors-{vault_addr[:10]}", f"{data_version}\0{vault_addr}",
+                               "vault_depositors")
+
+        # Similar analysis as borrowers - user distribution, sankey flow, line charts
+        display_depositors = vault_depositors.copy()
+        display_depositors['Amount'] = [format_usd(x) for x in display_depositors['Assets USD']]
+        display_depositors['Address'] = [f"{addr[:10]}...{addr[-6:]}" for addr in display_depositors['userAddress']]
+
+        # Create proper table headers for depositors
+        header_cols = st.columns([3, 2, 2])
+        with header_cols[0]:
+            st.write("**Address**")
+        with header_cols[1]:
+            st.write("**Amount**")
+        with header_cols[2]:
+            st.write("**Action**")
+
+        # Create table with etherscan links for depositors
+        for idx, row in display_depositors.iterrows():
+            cols = st.columns([3, 2, 2])
+            with cols[0]:
+                st.write(f"[{row['Address']}](https://etherscan.io/address/{row['userAddress']})")
+            with cols[1]:
+                col_text = f"{row['Amount']} (Raw: {format_usd(row.get('Raw Amount', 0))}, Calc: {format_usd(row.get('Calculated Amount', 0))})"
+                st.write(col_text)
+            with cols[2]:
+                if st.button("Analyze", key=f"analyze_depositor_{vault_addr}_{idx}"):
+                    set_route(view='depositor', vault_addr=vault_addr, addr=row['userAddress'])
+                    st.rerun()
+
+        # Enhanced depositor analytics
+        st.subheader("📊 Depositor Analytics")
+
+        # User distribution pie chart
+        if len(vault_depositors) > 1:
+            dist_chart = create_depositor_distribution_chart(vault_depositors, data_version, vault_addr)
+            st.plotly_chart(dist_chart, use_container_width=True)
+
+        # Depositor sankey flow
+        sankey_chart = create_depositor_sankey(vault_depositors, data_version, vault_addr, vault_info.to_dict())
+        if sankey_chart:
+            st.plotly_chart(sankey_chart, use_container_width=True)
+
+        # Depositor metrics
+        total_deposited = vault_depositors['Assets USD'].sum()
+        avg_deposit = vault_depositors['Assets USD'].mean()
+        largest_deposit = vault_depositors['Assets USD'].max()
+
+        dep_col1, dep_col2, dep_col3 = st.columns(3)
+        with dep_col1:
+            st.metric("Total Deposited", format_usd(total_deposited))
+        with dep_col2:
+            st.metric("Average Deposit", format_usd(avg_deposit))
+        with dep_col3:
+            st.metric("Largest Deposit", format_usd(largest_deposit))
+
+@timed_fragment("depositor_panel")
+def render_depositor_panel(sheets: Dict[str, pd.DataFrame], data_version: str, vault_addr: str, depositor_addr: str,
+                           vault_info: pd.Series, depositor_transactions: Optional[List[object]]):
+    """Depositor analysis panel"""
+    st.header(f"👤 Depositor Analysis")
+    st.subheader(f"Address: {depositor_addr[:10]}...{depositor_addr[-6:]}")
+    st.markdown(f"**Vault**: {vault_info['Vault']}")
+
+    # Links
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown(f"🔗 [View on Etherscan](https://etherscan.io/address/{depositor_addr})")
+    with col2:
+        st.markdown(f"🔗 [Morpho Activity](https://app.morpho.org/ethereum/vault/{vault_addr})")
+    if st.button("👛 View Full Portfolio"):
+        set_route(view='portfolio', addr=depositor_addr)
+        st.rerun()
+
+    # Get depositor data
+    vault_depositors = get_vault_depositors(sheets, data_version, vault_addr, depositor_transactions)
+    depositor_data = vault_depositors[vault_depositors['userAddress'] == depositor_addr]
+
+    if not depositor_data.empty:
+        depositor_info = depositor_data.iloc[0]
+
+        # Depositor metrics
+        col1, col2, col3 = st.columns(3)
         with col1:
-            st.markdown(f"🔗 [View on Etherscan](https://etherscan.io/address/{depositor_addr})")
+            st.metric("Deposited Amount", format_usd(depositor_info['Assets USD']))
         with col2:
-            st.markdown(f"🔗 [Morpho Activity](https://app.morpho.org/ethereum/vault/{vault_addr})")
+            st.metric("Raw Amount", format_usd(depositor_info.get('Raw Amount', 0)))
+        with col3:
+            transaction_count = depositor_info.get('Transaction Count', 0)
+            st.metric("Transaction Count", transaction_count)
+
+        # Show transaction details
+        transactions = depositor_info.get('Transactions', [])
+        if transactions:
+            tx_df = pd.DataFrame(transactions)
+            tx_df['timestamp'] = pd.to_datetime(tx_df['timestamp'], unit='s')
+            tx_df['amount_usd'] = pd.to_numeric(tx_df['amount_usd'])
+
+            st.subheader("📊 Transaction Visuals")
+
+            # Cumulative deposits chart
+            tx_df_sorted = tx_df.sort_values('timestamp')
+            tx_df_sorted['Cumulative Amount'] = tx_df_sorted['amount_usd'].cumsum()
+            cumulative_fig = px.line(
+                tx_df_sorted, x='timestamp', y='Cumulative Amount', 
+                title="Cumulative Deposit Value Over Time", markers=True
+            )
+            st.plotly_chart(cumulative_fig, use_container_width=True)
+
+            # Frequency chart
+            tx_df_sorted['Date'] = tx_df_sorted['timestamp'].dt.date
+            freq_data = tx_df_sorted.groupby('Date').size().reset_index(name='Transaction Count')
+            freq_fig = px.bar(
+                freq_data, x='Date', y='Transaction Count', 
+                title="Transaction Frequency"
+            )
+            st.plotly_chart(freq_fig, use_container_width=True)
+
+            # Show transaction details in expanders
+            st.subheader("💼 Transaction History")
+
+            for i, tx in enumerate(transactions):
+                with st.expander(f"Transaction {i+1} - {tx.get('type', 'Unknown')}"):
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.write(f"**Hash**: [{tx.get('hash', '')[:10]}...](https://etherscan.io/tx/{tx.get('hash', '')})")
+                    with col2:
+                        st.write(f"**Type**: {tx.get('type', 'Unknown')}")
+                    with col3:
+                        st.write(f"**Amount**: {format_usd(tx.get('amount_usd', 0))}")
+                    with col4:
+                        import datetime
+                        timestamp = tx.get('timestamp', 0)
+                        if timestamp:
+                            date_str = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
+                            st.write(f"**Date**: {date_str}")
+
+        # Individual depositor flow analysis
+        st.subheader("🌊 Personal Flow Analysis")
+        individual_sankey = create_depositor_sankey(depositor_data, data_version, vault_addr, vault_info.to_dict(),
+                                                    depositor_addr)
+        if individual_sankey:
+            st.plotly_chart(individual_sankey, use_container_width=True)
+    else:
+        st.info("No detailed data available for this depositor.")
+
+# ======================================================
+# Page Views
+# ======================================================
 
-        # Get depositor data
-        vault_depositors = get_vault_depositors(sheets, vault_addr)
-        depositor_data = vault_depositors[vault_depositors['userAddress'] == depositor_addr]
+def render_list_view(data_version: str, pools_df: pd.DataFrame, curators_df: pd.DataFrame,
+                     vaults_df: pd.DataFrame, borrower_risk: Dict[str, np.ndarray], changes: Dict[str, object]):
+    """Main tabs of the list page, each rerunning independently"""
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📊 Pools", "🧑‍🏫 Curators", "🏦 Vaults", "⚠️ Liquidation Risk",
+                                                  "🔁 Best Loops", "🔔 What Changed"])
+    with tab1:
+        render_pools_tab(pools_df, data_version)
+    with tab2:
+        render_curators_tab(curators_df)
+    with tab3:
+        render_vaults_tab(vaults_df)
+    with tab4:
+        render_risk_tab(borrower_risk, data_version)
+    with tab5:
+        render_loops_tab(pools_df, data_version)
+    with tab6:
+        render_changes_tab(changes)
+
+def render_pool_view(sheets: Dict[str, pd.DataFrame], data_version: str, pools_df: pd.DataFrame,
+                     apy_history: pd.DataFrame, loop_backtest: pd.DataFrame, activity_cube: Dict[str, object],
+                     pendle_positions: pd.DataFrame, route: Dict[str, List[str]]):
+    """Pool detail page"""
+    pool_key = route.get('key', [None])[0]
+    if not pool_key:
+        set_route(view='list')
+        st.rerun()
+        return
+
+    if st.button("← Back to Pools"):
+        set_route(view='list')
+        st.rerun()
+
+    # Find the pool
+    pool_info = pools_df[pools_df['Unique Key'] == pool_key]
+    if pool_info.empty:
+        st.error("Pool not found")
+        return
 
-        if not depositor_data.empty:
-            depositor_info = depositor_data.iloc[0]
+    pool_info = pool_info.iloc[0]
+    remember_visit('pool', pool_key)
+    st.header(f"📊 {pool_info['Pool']}")
+
+    # Pool metrics (removed Pool Size)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Morpho Borrow APY", format_percentage(pool_info['Morpho Borrow APY (%)']))
+    with col2:
+        st.metric("PT/External APY", format_percentage(pool_info['PT/External APY (%)']))
+    with col3:
+        spread = pool_info['Net APY Spread (%)']
+        st.metric("Net Spread", format_percentage(spread),
+                 delta=None if pd.isna(spread) else f"{spread:.2f}% opportunity")
+
+    # Additional metrics
+    col4, col5, col6 = st.columns(3)
+    with col4:
+        st.metric("Supply Assets", format_usd(pool_info['Supply Assets ($M)'] * 1_000_000))
+    with col5:
+        st.metric("Available Borrow", format_usd(pool_info['Available Borrow ($M)'] * 1_000_000))
+    with col6:
+        st.metric("Utilization", format_percentage(pool_info['Utilization (%)']))
+
+    # Links
+    link_col1, link_col2 = st.columns(2)
+    with link_col1:
+        if pool_info['Morpho Link']:
+            st.markdown(f"🔗 [View on Morpho]({pool_info['Morpho Link']})")
+    with link_col2:
+        if pool_info['Pendle Link']:
+            st.markdown(f"🔗 [View on Pendle]({pool_info['Pendle Link']})")
+
+    # Historical APY Performance Chart
+    st.subheader("📈 Historical APY Performance")
+    performance_chart = create_pool_performance_chart(sheets, data_version, pool_key)
+    st.plotly_chart(performance_chart, use_container_width=True)
+
+    # Show summary statistics if historical data exists
+    if 'morpho_markets' in sheets:
+        markets_df = sheets['morpho_markets']
+        market_data = markets_df[markets_df['uniqueKey'] == pool_key]
+        if not market_data.empty:
+            market = market_data.iloc[0]
+            historical_df = get_history_series(apy_history, 'borrow', pool_key)
+
+            if not historical_df.empty:
+                col1, col2, col3, col4 = st.columns(4)
+                current_apy = safe_float(market.get('state.netBorrowApy', 0)) * 100
+                avg_apy = historical_df['apy'].mean()
+                max_apy = historical_df['apy'].max()
+                min_apy = historical_df['apy'].min()
 
-            # Depositor metrics
+                with col1:
+                    st.metric("Current APY", f"{current_apy:.2f}%")
+                with col2:
+                    st.metric("Average APY", f"{avg_apy:.2f}%")
+                with col3:
+                    st.metric("Maximum APY", f"{max_apy:.2f}%")
+                with col4:
+                    st.metric("Minimum APY", f"{min_apy:.2f}%")
+
+    # Loop backtest against Pendle history (PT markets only)
+    if pool_info['Is PT Market']:
+        pool_backtest = loop_backtest[loop_backtest['Unique Key'] == pool_key] if not loop_backtest.empty else loop_backtest
+        if not pool_backtest.empty:
+            st.subheader("🧪 Loop Backtest")
+            st.caption("Realized carry of a looped position over rolling windows of the aligned Morpho borrow and Pendle implied APY history.")
+            st.dataframe(
+                pool_backtest.drop(columns=['Unique Key']),
+                column_config={
+                    "Leverage": st.column_config.NumberColumn("Leverage", format="%.1fx"),
+                    "Mean Return (%)": st.column_config.NumberColumn("Mean Return (%)", format="%.2f"),
+                    "P5 Return (%)": st.column_config.NumberColumn("P5 Return (%)", format="%.2f"),
+                    "Max Drawdown (%)": st.column_config.NumberColumn("Max Drawdown (%)", format="%.2f"),
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+
+    # PT held in this pool's Pendle market across the tracked borrowers of every market
+    pendle_market = pool_info.get('Pendle Market', '')
+    if pool_info['Is PT Market'] and pendle_market:
+        holders = distinct_pendle_positions(pendle_positions[pendle_positions['Pendle Market'] == pendle_market])
+        if not holders.empty:
+            st.subheader("🧩 Borrowers' Pendle Exposure")
+            st.caption("Positions in this pool's Pendle market held by the tracked borrowers of all Morpho markets.")
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Deposited Amount", format_usd(depositor_info['Assets USD']))
+                st.metric("PT Held", format_usd(holders['PT Value'].sum()))
             with col2:
-                st.metric("Raw Amount", format_usd(depositor_info.get('Raw Amount', 0)))
+                st.metric("Holders", holders['userAddress'].nunique())
             with col3:
-                transaction_count = depositor_info.get('Transaction Count', 0)
-                st.metric("Transaction Count", transaction_count)
-
-            # Show transaction details
-            transactions = depositor_info.get('Transactions', [])
-            if transactions:
-                tx_df = pd.DataFrame(transactions)
-                tx_df['timestamp'] = pd.to_datetime(tx_df['timestamp'], unit='s')
-                tx_df['amount_usd'] = pd.to_numeric(tx_df['amount_usd'])
-                
-                st.subheader("📊 Transaction Visuals")
-
-                # Cumulative deposits chart
-                tx_df_sorted = tx_df.sort_values('timestamp')
-                tx_df_sorted['Cumulative Amount'] = tx_df_sorted['amount_usd'].cumsum()
-                cumulative_fig = px.line(
-                    tx_df_sorted, x='timestamp', y='Cumulative Amount', 
-                    title="Cumulative Deposit Value Over Time", markers=True
-                )
-                st.plotly_chart(cumulative_fig, use_container_width=True)
-
-                # Frequency chart
-                tx_df_sorted['Date'] = tx_df_sorted['timestamp'].dt.date
-                freq_data = tx_df_sorted.groupby('Date').size().reset_index(name='Transaction Count')
-                freq_fig = px.bar(
-                    freq_data, x='Date', y='Transaction Count', 
-                    title="Transaction Frequency"
-                )
-                st.plotly_chart(freq_fig, use_container_width=True)
-
-                # Show transaction details in expanders
-                st.subheader("💼 Transaction History")
-
-                for i, tx in enumerate(transactions):
-                    with st.expander(f"Transaction {i+1} - {tx.get('type', 'Unknown')}"):
-                        col1, col2, col3, col4 = st.columns(4)
-                        with col1:
-                            st.write(f"**Hash**: [{tx.get('hash', '')[:10]}...](https://etherscan.io/tx/{tx.get('hash', '')})")
-                        with col2:
-                            st.write(f"**Type**: {tx.get('type', 'Unknown')}")
-                        with col3:
-                            st.write(f"**Amount**: {format_usd(tx.get('amount_usd', 0))}")
-                        with col4:
-                            import datetime
-                            timestamp = tx.get('timestamp', 0)
-                            if timestamp:
-                                date_str = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
-                                st.write(f"**Date**: {date_str}")
-
-            # Individual depositor flow analysis
-            st.subheader("🌊 Personal Flow Analysis")
-            individual_sankey = create_depositor_sankey(depositor_data, vault_info.to_dict())
-            if individual_sankey:
-                st.plotly_chart(individual_sankey, use_container_width=True)
+                st.metric("YT + LP Held", format_usd(holders['YT Value'].sum() + holders['LP Value'].sum()))
+            st.dataframe(
+                holders.sort_values('PT Value', ascending=False)[['userAddress', *PENDLE_VALUE_COLUMNS]],
+                column_config={
+                    "userAddress": st.column_config.TextColumn("Holder"),
+                    **{column: st.column_config.NumberColumn(column, format="$%d") for column in PENDLE_VALUE_COLUMNS},
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+
+    # Sub-tabs for detailed analysis
+    pool_tabs = st.tabs(["👥 Top Borrowers", "📈 Transactions", "🕸️ Flow Analysis"])
+    with pool_tabs[0]:
+        render_pool_borrowers(sheets, data_version, pool_key, pool_info)
+    with pool_tabs[1]:
+        render_pool_transactions(sheets, data_version, pool_key, activity_cube)
+    with pool_tabs[2]:
+        render_pool_flows(sheets, data_version, pool_key, pool_info)
+
+def render_borrower_view(sheets: Dict[str, pd.DataFrame], data_version: str, pools_df: pd.DataFrame,
+                         activity_cube: Dict[str, object], pendle_positions: pd.DataFrame, route: Dict[str, List[str]]):
+    """Borrower detail page"""
+    pool_key = route.get('key', [None])[0]
+    borrower_addr = route.get('addr', [None])[0]
+
+    if not pool_key or not borrower_addr:
+        set_route(view='list')
+        st.rerun()
+        return
+
+    if st.button("← Back to Pool"):
+        set_route(view='pool', key=pool_key)
+        st.rerun()
+
+    # Find pool info
+    pool_info = pools_df[pools_df['Unique Key'] == pool_key]
+    if pool_info.empty:
+        st.error("Pool not found")
+        return
+    pool_info = pool_info.iloc[0]
+
+    render_borrower_panel(sheets, data_version, pool_key, borrower_addr, pool_info, activity_cube, pendle_positions)
+
+def render_curator_view(curators_df: pd.DataFrame, curator_depositors: Dict[str, pd.DataFrame],
+                        route: Dict[str, List[str]]):
+    """Curator detail page"""
+    curator_name = route.get('curator', [None])[0]
+    if not curator_name:
+        set_route(view='list')
+        st.rerun()
+        return
+
+    if st.button("← Back to Curators"):
+        set_route(view='list')
+        st.rerun()
+
+    curator_info = curators_df[curators_df['Curator'] == curator_name]
+    if curator_info.empty:
+        st.error("Curator not found")
+        return
+
+    curator_info = curator_info.iloc[0]
+    st.header(f"🧑‍🏫 {curator_name}")
+
+    # Curator metrics
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total AUM", format_usd(curator_info['Total AUM']))
+    with col2:
+        st.metric("Number of Vaults", curator_info['Vault Count'])
+    with col3:
+        if curator_info['Morpho URL']:
+            st.markdown(f"🔗 [Website]({curator_info['main']}) [Morphoforum]({curator_info['Morpho URL']}) [X]({curator_info['twitter']}) ")
+            url_name = curator_name.replace(' ', '-')
+            st.markdown(f"🔗 [Morpho link](https://app.morpho.org/ethereum/curator/{url_name})")
+
+    # Managed Vaults
+    st.subheader("🏦 Managed Vaults")
+    managed_vaults_list = curator_info['Managed Vaults']
+    if managed_vaults_list:
+        managed_vaults_df = pd.DataFrame(managed_vaults_list)
+
+        # Use a dataframe with selection to navigate
+        selected_vault = st.dataframe(
+            managed_vaults_df,
+            column_order=['Vault', 'TVL', 'APY'],
+            column_config={
+                "Vault": "Vault Name",
+                "TVL": st.column_config.NumberColumn("TVL", format="$%d"),
+                "APY": st.column_config.NumberColumn("APY (%)", format="%.2f"),
+                "Address": None  # Hide address from view
+            },
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row"
+        )
+
+        if hasattr(selected_vault, 'selection') and selected_vault.selection and selected_vault.selection.rows:
+            selected_idx = selected_vault.selection.rows[0]
+            vault_address = managed_vaults_df.iloc[selected_idx]['Address']
+            set_route(view='vault', address=vault_address)
+            st.rerun()
+    else:
+        st.info("No vault data available for this curator")
+
+    # Depositors across all managed vaults
+    summary = curator_depositors['summary']
+    if curator_name in summary.index:
+        st.subheader("👥 Depositors")
+        rollup = summary.loc[curator_name]
+        dep_col1, dep_col2, dep_col3 = st.columns(3)
+        with dep_col1:
+            st.metric("Unique Depositors", int(rollup['Unique Depositors']))
+        with dep_col2:
+            st.metric("Total Deposited", format_usd(rollup['Total Deposited']))
+        with dep_col3:
+            st.metric("Cross-Vault Depositors", int(rollup['Cross-Vault Depositors']),
+                      help="Depositors in more than one of this curator's vaults")
+
+        top_depositors = get_vault_depositors_by_curator(curator_depositors, curator_name)
+        selected_depositor = st.dataframe(
+            top_depositors,
+            column_order=['userAddress', 'Vault Name', 'Assets USD'],
+            column_config={
+                "userAddress": "Address",
+                "Assets USD": st.column_config.NumberColumn("Assets USD", format="$%d"),
+                "vaultAddress": None,
+            },
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row"
+        )
+
+        if hasattr(selected_depositor, 'selection') and selected_depositor.selection and selected_depositor.selection.rows:
+            depositor = top_depositors.iloc[selected_depositor.selection.rows[0]]
+            set_route(view='depositor', vault_addr=depositor['vaultAddress'], addr=depositor['userAddress'])
+            st.rerun()
+
+def render_vault_view(sheets: Dict[str, pd.DataFrame], data_version: str, vaults_df: pd.DataFrame,
+                      depositor_transactions: Optional[List[object]], route: Dict[str, List[str]]):
+    """Vault detail page"""
+    vault_addr = route.get('address', [None])[0]
+    if not vault_addr:
+        set_route(view='list')
+        st.rerun()
+        return
+
+    if st.button("← Back to Vaults"):
+        set_route(view='list')
+        st.rerun()
+
+    vault_info = vaults_df[vaults_df['Address'] == vault_addr]
+    if vault_info.empty:
+        st.error("Vault not found")
+        return
+
+    vault_info = vault_info.iloc[0]
+    remember_visit('vault', vault_addr)
+    st.header(f"🏦 {vault_info['Vault']}")
+    # Curator information
+    if vault_info['Curator Name']:
+        st.info(f"👨‍🏫 Managed by: {vault_info['Curator Name']}")
+    # Vault metrics
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total TVL", format_usd(vault_info['TVL']))
+    with col2:
+        st.metric("APY", f"{vault_info['APY']:.2f}%")
+    with col3:
+        st.metric("Fee", f"{vault_info['Fee']:.2f}%")
+    with col4:
+        st.metric("Asset", vault_info['Asset'])
+
+    # Additional info
+    st.markdown(f"**Symbol**: {vault_info['Symbol']}")
+    st.markdown(f"**Whitelisted**: {'Yes' if vault_info['Whitelisted'] else 'No'}")
+    name = vault_info['Vault']
+    url_name = name.replace(' ', '-')
+    st.markdown(f"🔗 [View on Morpho](https://app.morpho.org/ethereum/vault/{vault_addr}/{url_name})")
+
+    render_vault_depositors(sheets, data_version, vault_addr, vault_info, depositor_transactions)
+
+def render_depositor_view(sheets: Dict[str, pd.DataFrame], data_version: str, vaults_df: pd.DataFrame,
+                          depositor_transactions: Optional[List[object]], route: Dict[str, List[str]]):
+    """Depositor detail page"""
+    vault_addr = route.get('vault_addr', [None])[0]
+    depositor_addr = route.get('addr', [None])[0]
+
+    if not vault_addr or not depositor_addr:
+        set_route(view='list')
+        st.rerun()
+        return
+
+    if st.button("← Back to Vault"):
+        set_route(view='vault', address=vault_addr)
+        st.rerun()
+
+    # Find vault info
+    vault_info = vaults_df[vaults_df['Address'] == vault_addr]
+    if vault_info.empty:
+        st.error("Vault not found")
+        return
+    vault_info = vault_info.iloc[0]
+
+    render_depositor_panel(sheets, data_version, vault_addr, depositor_addr, vault_info, depositor_transactions)
+
+def render_portfolio_view(sheets: Dict[str, pd.DataFrame], user_index: Dict[str, object], pendle_positions: pd.DataFrame,
+                          pools_df: pd.DataFrame, vaults_df: pd.DataFrame, route: Dict[str, List[str]]):
+    """Cross-market portfolio page"""
+    portfolio_addr = route.get('addr', [None])[0]
+    if not portfolio_addr:
+        set_route(view='list')
+        st.rerun()
+        return
+
+    if st.button("← Back to Pools"):
+        set_route(view='list')
+        st.rerun()
+
+    st.header("👛 Portfolio")
+    st.subheader(f"Address: {portfolio_addr[:10]}...{portfolio_addr[-6:]}")
+    st.markdown(f"🔗 [View on Etherscan](https://etherscan.io/address/{portfolio_addr})")
+
+    portfolio = build_user_portfolio(sheets, user_index, pendle_positions, portfolio_addr, pools_df, vaults_df)
+    borrows, flows = portfolio['borrows'], portfolio['flows']
+    pendle, deposits = portfolio['pendle'], portfolio['deposits']
+
+    if borrows.empty and flows.empty and pendle.empty and deposits.empty:
+        st.info("No positions found for this address.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Collateral", format_usd(borrows['Collateral USD'].sum() if not borrows.empty else 0))
+    with col2:
+        st.metric("Total Borrowed", format_usd(borrows['Borrow USD'].sum() if not borrows.empty else 0))
+    with col3:
+        st.metric("Vault Deposits", format_usd(deposits['Assets USD'].sum() if not deposits.empty else 0))
+    with col4:
+        st.metric("Pendle Open Value", format_usd(pendle['Total Value'].sum() if not pendle.empty else 0))
+
+    if not borrows.empty:
+        st.subheader("🏦 Borrow Positions")
+        selected_position = st.dataframe(
+            borrows,
+            column_config={
+                "Collateral USD": st.column_config.NumberColumn("Collateral", format="$%d"),
+                "Borrow USD": st.column_config.NumberColumn("Borrowed", format="$%d"),
+                "Health Factor": st.column_config.NumberColumn("Health Factor", format="%.2f"),
+                "Morpho PnL": st.column_config.NumberColumn("Morpho PnL", format="$%d"),
+                "Unique Key": None,
+                "userAddress": None,
+            },
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row"
+        )
+        if hasattr(selected_position, 'selection') and selected_position.selection and selected_position.selection.rows:
+            selected_idx = selected_position.selection.rows[0]
+            position = borrows.iloc[selected_idx]
+            # Per-market pages match the address as stored in the sheets
+            set_route(view='borrower', key=position['Unique Key'], addr=position['userAddress'])
+            st.rerun()
+
+    if not flows.empty:
+        st.subheader("💸 Flows by Market (USD)")
+        st.dataframe(flows.drop(columns=['Unique Key']), use_container_width=True, hide_index=True)
+
+    if not pendle.empty:
+        st.subheader("📊 Pendle Positions")
+        st.dataframe(pendle, use_container_width=True, hide_index=True)
+
+    if not deposits.empty:
+        st.subheader("🏛️ Vault Deposits")
+        selected_deposit = st.dataframe(
+            deposits,
+            column_config={
+                "Assets USD": st.column_config.NumberColumn("Assets", format="$%d"),
+                "Vault Address": None,
+                "userAddress": None,
+            },
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row"
+        )
+        if hasattr(selected_deposit, 'selection') and selected_deposit.selection and selected_deposit.selection.rows:
+            selected_idx = selected_deposit.selection.rows[0]
+            deposit = deposits.iloc[selected_idx]
+            set_route(view='depositor', vault_addr=deposit['Vault Address'], addr=deposit['userAddress'])
+            st.rerun()
+
+# ======================================================
+# Main Application
+# ======================================================
+
+def render_app():
+    st.title(APP_TITLE)
+    st.markdown(APP_SUBTITLE)
+
+    # Startup timings for the first run of each session, measured from the top of the script
+    first_run = 'first_paint' not in st.session_state.get('rerun_timings', {})
+    if first_run:
+        record_rerun_timing('imports', IMPORT_SECONDS)
+        record_rerun_timing('first_paint', time.perf_counter() - SCRIPT_START)
+
+    # Load data (sheets and derived frames are cached per data version)
+    with st.spinner("Loading data from CSV file..."):
+        data_version = get_data_version()
+        data = load_app_data(data_version)
+    if first_run:
+        record_rerun_timing('data_ready', time.perf_counter() - SCRIPT_START)
+
+    if not data:
+        st.error("Failed to load data. Please ensure morpho_pendle.csv exists and is accessible.")
+        return
+
+    sheets = data['sheets']
+    pools_df = data['pools_df']
+    curators_df = data['curators_df']
+    vaults_df = data['vaults_df']
+    user_index = data['user_index']
+
+    # Initialize routing if not exists
+    if 'route_view' not in st.session_state:
+        st.session_state.route_view = 'list'
+
+    # Routing
+    route = get_route()
+    view = route.get('view', ['list'])[0] if route.get('view') else 'list'
+
+    # Sidebar
+    with st.sidebar:
+        # Jump to any pool, vault, curator or address
+        search_query = st.text_input("🔍 Search", placeholder="Asset, pool, vault, curator, market key or 0x...")
+        if search_query:
+            search_results = search_index(data['search_index'], user_index, search_query)
+            for i, (kind, label, detail, route_params) in enumerate(search_results):
+                if st.button(f"{SEARCH_KINDS[kind]} {label}", key=f"search_{i}", help=detail,
+                             use_container_width=True):
+                    set_route(**route_params)
+                    st.rerun()
+            if not search_results:
+                st.caption("No matches.")
+
+        # Whole sheets, exported chunk by chunk from the store
+        with st.expander("📤 Export Sheet"):
+            export_sheet = st.selectbox("Sheet", list(sheets), key="export_sheet_name")
+            render_export_controls(sheets[export_sheet], export_sheet, data_version, "sheet")
+
+        if SHOW_MEMORY_REPORT:
+            with st.expander("🧠 Memory"):
+                memory_summary, memory_frames = build_memory_report(data)
+                st.dataframe(pd.Series(memory_summary, name='Value'), use_container_width=True)
+                st.dataframe(memory_frames, use_container_width=True, hide_index=True)
+                st.dataframe(view_cache_stats(), use_container_width=True)
+                st.dataframe(pd.Series(get_prefetcher().stats(), name='Prefetch'), use_container_width=True)
+
+        if SHOW_RERUN_TIMINGS and st.session_state.get('rerun_timings'):
+            with st.expander("⏱️ Rerun Timing"):
+                st.dataframe(pd.DataFrame({
+                    'Last Run (ms)': st.session_state['rerun_timings'],
+                    'Runs': st.session_state['rerun_counts'],
+                }), use_container_width=True)
+                st.caption("Startup build stages")
+                st.dataframe(data['build_report'], use_container_width=True)
+
+    # Main content based on view
+    if view == 'list':
+        render_list_view(data_version, pools_df, curators_df, vaults_df, data['borrower_risk'], data.get('changes', {}))
+        # Warm the likely next pages once the list has been drawn
+        schedule_prefetch(data_version, sheets, pools_df, vaults_df, data['depositor_transactions'])
+    elif view == 'pool':
+        render_pool_view(sheets, data_version, pools_df, data['apy_history'], data['loop_backtest'], data['activity_cube'],
+                         data['pendle_positions'], route)
+    elif view == 'borrower':
+        render_borrower_view(sheets, data_version, pools_df, data['activity_cube'], data['pendle_positions'], route)
+    elif view == 'curator':
+        render_curator_view(curators_df, data['curator_depositors'], route)
+    elif view == 'vault':
+        render_vault_view(sheets, data_version, vaults_df, data['depositor_transactions'], route)
+    elif view == 'depositor':
+        render_depositor_view(sheets, data_version, vaults_df, data['depositor_transactions'], route)
+    elif view == 'portfolio':
+        render_portfolio_view(sheets, user_index, data['pendle_positions'], pools_df, vaults_df, route)
+
+def main():
+    st.set_page_config(
+        page_title=APP_TITLE,
+        page_icon="🔵",
+        layout="wide"
+    )
+
+    run_start = time.perf_counter()
+    try:
+        profile_mode = requested_profile_mode()
+        if profile_mode:
+            profile_rerun(render_app, profile_mode)
         else:
-            st.info("No detailed data available for this depositor.")
+            render_app()
+    finally:
+        record_rerun_timing('app', time.perf_counter() - run_start)
+
+# ======================================================
+# Precompute CLI
+# ======================================================
+
+def run_precompute(argv: Optional[List[str]] = None) -> int:
+    """Parse the data file, build every derived frame and index, and write them to the disk cache"""
+    global CSV_FILE, JSON_FILE, DISK_CACHE_DIR
+
+    parser = argparse.ArgumentParser(
+        prog="python morpho_dashboard_final.py precompute",
+        description="Warm the on-disk cache before starting the Streamlit server."
+    )
+    parser.add_argument("--csv", default=CSV_FILE, help="multi-section CSV written by data_collector.js")
+    parser.add_argument("--json", default=JSON_FILE,
+                        help="JSON written by data_collector.js --output, read instead of --csv (MORPHO_JSON_FILE)")
+    parser.add_argument("--cache-dir", default=DISK_CACHE_DIR, help="disk cache directory (MORPHO_CACHE_DIR)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the cache is already warm")
+    args = parser.parse_args(argv)
+    CSV_FILE, JSON_FILE, DISK_CACHE_DIR = args.csv, args.json, args.cache_dir
+
+    data_mtime = get_data_mtime()
+    fingerprint = get_data_fingerprint()
+    if fingerprint is None:
+        print(f"Failed to read '{data_file()}'", file=sys.stderr)
+        return 1
+
+    key = disk_cache_key('app_data', fingerprint)
+    with disk_cache_lock(key):
+        cached = None if args.force else disk_cache_load(key)
+        if cached is not None and attach_app_data(cached, fingerprint):
+            print(f"Disk cache already warm: {disk_cache_path(key)}")
+            return 0
+
+        start = time.perf_counter()
+        sheets = load_sheets(fingerprint)
+        if not sheets:
+            print(f"Failed to load '{data_file()}'", file=sys.stderr)
+            return 1
+
+        stage_seconds = {'imports': IMPORT_SECONDS, 'load_json' if JSON_FILE else 'load_csv': time.perf_counter() - start}
+        data = build_app_data(sheets, stage_seconds)
+
+        start = time.perf_counter()
+        store_app_data(key, fingerprint, data)
+        stage_seconds['write_cache'] = time.perf_counter() - start
+        detect_changes(fingerprint, data_mtime, data['change_snapshot'])
+        path = disk_cache_path(key) if os.path.exists(disk_cache_path(key)) else None
+
+    for stage, seconds in stage_seconds.items():
+        print(f"{stage:>22}: {seconds * 1000:9.1f} ms")
+    build_report = data['build_report']
+    critical_stages = build_report.index[build_report['Critical Path']]
+    print(f"Critical path: {' -> '.join(critical_stages)} "
+          f"({build_report.loc[critical_stages, 'Duration (ms)'].sum():.1f} ms of "
+          f"{build_report['Duration (ms)'].sum():.1f} ms total stage time)")
+    if path is None:
+        print(f"Could not write to the disk cache in '{DISK_CACHE_DIR}'", file=sys.stderr)
+        return 1
+    print(f"Disk cache written to {path}")
+    return 0
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["precompute"]:
+        sys.exit(run_precompute(sys.argv[2:]))
     main()
\ No newline at end of file